@@ -15,12 +15,12 @@ from dotenv import load_dotenv
 # Import CSS utilities
 from static.css_utils import load_css
 
+# Import logging setup
+from utils.logging_utils import configure_logging
+
 # Configure logging
 logging.getLogger('streamlit').setLevel(logging.ERROR)
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+configure_logging(logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Add the current directory to the path if needed
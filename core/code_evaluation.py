@@ -7,17 +7,187 @@ Incorporates enhanced evaluation methods for more accurate analysis.
 """
 
 import re
+import copy
+import asyncio
+import hashlib
 import logging
-import json
+from types import MappingProxyType
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional, Tuple
 from langchain_core.language_models import BaseLanguageModel
 
-from utils.llm_logger import LLMInteractionLogger
-from utils.code_utils import create_evaluation_prompt, create_regeneration_prompt, process_llm_response
+# orjson parses several times faster and releases the GIL; fall back to the stdlib
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+from utils.llm_cache import InMemoryCache
+from utils.code_utils import (
+    create_evaluation_messages, create_evaluate_and_fix_prompt, create_regeneration_prompt,
+    count_lines, extract_both_code_versions, iter_json_spans, process_llm_response
+)
+
+# Library module: the application configures logging handlers
 logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# Trailing commas which are invalid in JSON
+_TRAIL_COMMA_OBJ = re.compile(r',\s*}')
+_TRAIL_COMMA_ARR = re.compile(r',\s*]')
+
+# Plain-text sections used when the model does not answer in JSON
+_FOUND_SECTION_RE = re.compile(r'found_errors:?\s*\n(.*?)(?:missing_errors|\n\n)', re.DOTALL)
+_MISSING_SECTION_RE = re.compile(r'missing_errors:?\s*\n(.*?)(?:\n\n|$)', re.DOTALL)
+
+# "TYPE - Name" error keys given as plain strings
+_ERROR_KEY_RE = re.compile(r'([A-Z]+)\s*-\s*([^:]+)')
+
+# Responses longer than this are narrowed to their outermost braces before scanning
+_MAX_SCAN_CHARS = 200_000
+
+# Threads used to post-process batched evaluation responses
+_POSTPROCESS_WORKERS = 4
+
+# Keys identifying an evaluation object among other JSON in a response
+_EVALUATION_KEYS = ("found_errors", "missing_errors", "valid")
+
+
+class _EvaluationStreamTracker:
+    """
+    Follows a streamed response and reports when an evaluation object is complete.
+    
+    Uses the same brace/string state machine as iter_json_spans, carried
+    across chunks so each character is scanned only once.
+    """
+    
+    __slots__ = ("parts", "_length", "_depth", "_start", "_in_string", "_escape")
+    
+    def __init__(self):
+        self.parts = []
+        self._length = 0
+        self._depth = 0
+        self._start = -1
+        self._in_string = False
+        self._escape = False
+    
+    def feed(self, text: str) -> bool:
+        """
+        Add a chunk of the response.
+        
+        Args:
+            text: Next chunk of response text
+            
+        Returns:
+            True once a top-level object holding evaluation keys has closed
+        """
+        offset = self._length
+        self.parts.append(text)
+        self._length += len(text)
+        for i, char in enumerate(text):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = self._depth > 0
+            elif char == '{':
+                if self._depth == 0:
+                    self._start = offset + i
+                self._depth += 1
+            elif char == '}' and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    candidate = "".join(self.parts)[self._start:offset + i + 1]
+                    if any(f'"{key}"' in candidate for key in _EVALUATION_KEYS):
+                        return True
+        return False
+    
+    @property
+    def text(self) -> str:
+        """Response text received so far."""
+        return "".join(self.parts)
+
+
+# Common domains and the terms that suggest them (read-only, shared by all agents)
+_DOMAIN_TERMS = MappingProxyType({
+    "student_management": ("student", "course", "enroll", "grade", "academic"),
+    "file_processing": ("file", "read", "write", "path", "directory"),
+    "data_validation": ("validate", "input", "check", "valid", "sanitize"),
+    "calculation": ("calculate", "compute", "math", "formula", "result"),
+    "inventory_system": ("inventory", "product", "stock", "item", "quantity"),
+    "notification_service": ("notify", "message", "alert", "notification", "send"),
+    "banking": ("account", "bank", "transaction", "balance", "deposit"),
+    "e-commerce": ("cart", "product", "order", "payment", "customer")
+})
+
+# One alternation over all terms, longest first, matched at every position via
+# lookahead so overlapping terms are all seen (e.g. "valid" inside "validate")
+_DOMAIN_KEYWORD_RE = re.compile(
+    "(?=(" + "|".join(re.escape(term) for term in sorted(
+        {term for terms in _DOMAIN_TERMS.values() for term in terms}, key=len, reverse=True
+    )) + "))"
+)
+
+# Domain credits for a matched term. Any shorter term the match starts with occurs
+# at the same position, so it is credited too, mirroring a per-term str.count.
+_TERM_DOMAIN_CREDITS = {
+    term: Counter(domain for domain, terms in _DOMAIN_TERMS.items()
+                  for other in terms if term.startswith(other))
+    for terms in _DOMAIN_TERMS.values() for term in terms
+}
+
+
+def _key_of(error: Dict[str, Any], type_field: str = "type", name_field: str = "name") -> str:
+    """
+    Build the "TYPE - Name" key identifying an error.
+    
+    Args:
+        error: Error dictionary
+        type_field: Field holding the error type ("error_type" for evaluation results)
+        name_field: Field holding the error name ("error_name" for evaluation results)
+        
+    Returns:
+        Error key
+    """
+    return f"{error.get(type_field, '').upper()} - {error.get(name_field, '')}"
+
+
+def _keys_of(errors: List[Dict[str, Any]]) -> List[str]:
+    """
+    Build the keys of a list of requested errors.
+    
+    Args:
+        errors: List of requested errors
+        
+    Returns:
+        List of error keys
+    """
+    return [_key_of(error) for error in errors]
+
+
+def _index_requested(requested_errors: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Index requested errors by their "TYPE - Name" key.
+    
+    Args:
+        requested_errors: List of requested errors
+        
+    Returns:
+        Dictionary mapping error keys to the requested errors
+    """
+    requested_keys = {}
+    for error in requested_errors:
+        if not isinstance(error, dict):
+            logger.warning(f"Skipping non-dict error in requested_errors: {error}")
+            continue
+        requested_keys[_key_of(error)] = error
+    return requested_keys
+
 
 class CodeEvaluationAgent:
     """
@@ -38,6 +208,10 @@ class CodeEvaluationAgent:
         """
         self.llm = llm
         self.llm_logger = llm_logger
+        # Processed results of previous evaluations, keyed by code and requested errors
+        self._eval_cache = InMemoryCache(maxsize=128)
+        # Inferred domains, keyed by code digest, for repeated regeneration rounds
+        self._domain_cache = InMemoryCache(maxsize=64)
     
     def evaluate_code(self, code: str, requested_errors: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
@@ -50,54 +224,399 @@ class CodeEvaluationAgent:
         Returns:
             Evaluation results with found and missing errors
         """
-        # Default result if no evaluation can be performed
-        default_result = {
-            "found_errors": [],
-            "missing_errors": [f"{error.get('type', '').upper()} - {error.get('name', '')}" 
-                            for error in requested_errors],
-            "valid": False,
-            "feedback": f"Could not evaluate code. Please ensure the code contains all {len(requested_errors)} requested errors."
+        request = self._prepare_evaluation(code, requested_errors)
+        if request["result"] is not None:
+            return request["result"]
+        
+        try:
+            # Generate the evaluation using the LLM
+            logger.info("Sending code to LLM for evaluation")
+            response = self._stream_evaluation(request["messages"])
+            return self._finish_evaluation(request, response)
+            
+        except Exception as e:
+            logger.error(f"Error evaluating code: {str(e)}")
+            return self._default_result(requested_errors)
+    
+    async def aevaluate_code(self, code: str, requested_errors: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Asynchronously evaluate Java code to check for requested errors.
+        
+        Args:
+            code: The Java code to evaluate
+            requested_errors: List of errors that should be included in the code
+            
+        Returns:
+            Evaluation results with found and missing errors
+        """
+        request = self._prepare_evaluation(code, requested_errors)
+        if request["result"] is not None:
+            return request["result"]
+        
+        try:
+            logger.info("Sending code to LLM for evaluation")
+            response = await self.llm.ainvoke(request["messages"])
+            return self._finish_evaluation(request, response)
+            
+        except Exception as e:
+            logger.error(f"Error evaluating code: {str(e)}")
+            return self._default_result(requested_errors)
+    
+    def batch_evaluate(self, items: List[Tuple[str, List[Dict[str, Any]]]],
+                       max_concurrency: int = 10) -> List[Dict[str, Any]]:
+        """
+        Evaluate several code samples with concurrent LLM calls.
+        
+        Responses are post-processed on a small thread pool as they arrive,
+        so parsing one sample overlaps with the calls still in flight.
+        
+        Args:
+            items: List of (code, requested_errors) pairs
+            max_concurrency: Maximum number of LLM calls in flight at once
+            
+        Returns:
+            Evaluation results in the same order as items
+        """
+        requests = [self._prepare_evaluation(code, errors) for code, errors in items]
+        results = [request["result"] for request in requests]
+        pending = [i for i, result in enumerate(results) if result is None]
+        if not pending:
+            return results
+        
+        futures = {}
+        with ThreadPoolExecutor(max_workers=min(_POSTPROCESS_WORKERS, len(pending))) as executor:
+            try:
+                # Providers default to one call at a time unless max_concurrency is set
+                logger.info(f"Sending {len(pending)} code samples to LLM for evaluation")
+                for position, response in self.llm.batch_as_completed(
+                    [requests[i]["messages"] for i in pending],
+                    config={"max_concurrency": max_concurrency},
+                    return_exceptions=True
+                ):
+                    i = pending[position]
+                    futures[i] = executor.submit(self._finish_evaluation_safely, requests[i], response)
+            except Exception as e:
+                logger.error(f"Error batch evaluating code: {str(e)}")
+            
+            for i in pending:
+                future = futures.get(i)
+                results[i] = future.result() if future else self._default_result(requests[i]["requested_errors"])
+        return results
+    
+    async def abatch_evaluate(self, items: List[Tuple[str, List[Dict[str, Any]]]],
+                              max_concurrency: int = 10) -> List[Dict[str, Any]]:
+        """
+        Asynchronously evaluate several code samples with concurrent LLM calls.
+        
+        Args:
+            items: List of (code, requested_errors) pairs
+            max_concurrency: Maximum number of LLM calls in flight at once
+            
+        Returns:
+            Evaluation results in the same order as items
+        """
+        requests = [self._prepare_evaluation(code, errors) for code, errors in items]
+        results = [request["result"] for request in requests]
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def evaluate(i: int) -> Tuple[int, Dict[str, Any]]:
+            async with semaphore:
+                try:
+                    response = await self.llm.ainvoke(requests[i]["messages"])
+                except Exception as e:
+                    response = e
+            # Parse off the event loop so other responses keep arriving meanwhile
+            return i, await asyncio.to_thread(self._finish_evaluation_safely, requests[i], response)
+        
+        pending = [evaluate(i) for i, result in enumerate(results) if result is None]
+        if pending:
+            logger.info(f"Sending {len(pending)} code samples to LLM for evaluation")
+        for next_result in asyncio.as_completed(pending):
+            i, result = await next_result
+            results[i] = result
+        return results
+    
+    def evaluate_errors_parallel(self, code: str, requested_errors: List[Dict[str, Any]],
+                                 max_concurrency: int = 10) -> Dict[str, Any]:
+        """
+        Evaluate Java code with one concurrent LLM call per requested error.
+        
+        Each call only has to look for a single error, so the evaluation takes
+        about as long as the slowest call instead of one long answer covering
+        every error.
+        
+        Args:
+            code: The Java code to evaluate
+            requested_errors: List of errors that should be included in the code
+            max_concurrency: Maximum number of LLM calls in flight at once
+            
+        Returns:
+            Evaluation results with found and missing errors
+        """
+        results = self.batch_evaluate([(code, [error]) for error in requested_errors], max_concurrency)
+        return self._merge_evaluations(requested_errors, results)
+    
+    async def aevaluate_errors_parallel(self, code: str, requested_errors: List[Dict[str, Any]],
+                                        max_concurrency: int = 10) -> Dict[str, Any]:
+        """
+        Asynchronously evaluate Java code with one concurrent LLM call per requested error.
+        
+        Args:
+            code: The Java code to evaluate
+            requested_errors: List of errors that should be included in the code
+            max_concurrency: Maximum number of LLM calls in flight at once
+            
+        Returns:
+            Evaluation results with found and missing errors
+        """
+        results = await self.abatch_evaluate([(code, [error]) for error in requested_errors], max_concurrency)
+        return self._merge_evaluations(requested_errors, results)
+    
+    @staticmethod
+    def _merge_evaluations(requested_errors: List[Dict[str, Any]],
+                           results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Combine the single-error evaluations of one code sample.
+        
+        Args:
+            requested_errors: List of errors that should be included in the code
+            results: Evaluation result of each requested error, in the same order
+            
+        Returns:
+            Evaluation results with found and missing errors
+        """
+        found_errors, missing_errors, extra_errors = [], [], []
+        for result in results:
+            found_errors += result.get("found_errors", [])
+            missing_errors += result.get("missing_errors", [])
+            extra_errors += result.get("extra_errors", [])
+        
+        valid = not missing_errors
+        if valid:
+            feedback = f"All {len(requested_errors)} requested errors are properly implemented."
+        else:
+            feedback = (f"Found {len(found_errors)} out of {len(requested_errors)} "
+                        f"requested errors. Missing {len(missing_errors)} errors.")
+        return {
+            "found_errors": found_errors,
+            "missing_errors": missing_errors,
+            "extra_errors": extra_errors,
+            "valid": valid,
+            "original_error_count": len(requested_errors),
+            "feedback": feedback
         }
+    
+    def _finish_evaluation_safely(self, request: Dict[str, Any], response: Any) -> Dict[str, Any]:
+        """
+        Finish an evaluation, falling back to the default result on any error.
+        
+        Args:
+            request: Evaluation request built by _prepare_evaluation
+            response: Raw LLM response, or the exception raised by the call
+            
+        Returns:
+            Evaluation results with found and missing errors
+        """
+        try:
+            if isinstance(response, Exception):
+                raise response
+            return self._finish_evaluation(request, response)
+        except Exception as e:
+            logger.error(f"Error evaluating code: {str(e)}")
+            return self._default_result(request["requested_errors"])
+    
+    def _stream_evaluation(self, prompt: Any) -> Any:
+        """
+        Stream an evaluation response, stopping once the evaluation JSON is complete.
+        
+        Trailing prose after the JSON object is never generated, which saves
+        output tokens and returns control to the caller earlier.
+        
+        Args:
+            prompt: Evaluation prompt or messages
+            
+        Returns:
+            Response text, or the invoke() response if streaming is unavailable
+        """
+        tracker = _EvaluationStreamTracker()
+        try:
+            for chunk in self.llm.stream(prompt):
+                content = chunk.content if hasattr(chunk, "content") else chunk
+                if isinstance(content, str) and tracker.feed(content):
+                    logger.debug("Evaluation JSON complete, closing stream early")
+                    break
+        except Exception as e:
+            # Nothing received yet: the model may simply not support streaming
+            if not tracker.parts:
+                logger.warning(f"Streaming evaluation failed ({str(e)}), falling back to invoke")
+                return self.llm.invoke(prompt)
+            raise
+        return tracker.text
+    
+    def _prepare_evaluation(self, code: str, requested_errors: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Resolve an evaluation from the cache or build the prompt for the LLM call.
+        
+        Args:
+            code: The Java code to evaluate
+            requested_errors: List of errors that should be included in the code
+            
+        Returns:
+            Evaluation request; its "result" is set when no LLM call is needed
+        """
+        request = {"code": code, "requested_errors": requested_errors, "result": None}
         
         # Check if LLM is available for evaluation
         if not self.llm:
             logger.warning("No LLM available for code evaluation")
-            return default_result
+            request["result"] = self._default_result(requested_errors)
+            return request
+        
+        request["requested_keys"] = _index_requested(requested_errors)
+        
+        # Identical re-evaluations return the stored result without an LLM call
+        request["cache_key"] = self._evaluation_cache_key(code, request["requested_keys"])
+        cached_result = self._eval_cache.get(request["cache_key"])
+        if cached_result is not None:
+            logger.info("Using cached code evaluation")
+            request["result"] = copy.deepcopy(cached_result)
+            return request
+        
+        # Create evaluation messages; the joined text is kept for the interaction log
+        request["messages"] = create_evaluation_messages(code, requested_errors)
+        request["prompt"] = "\n\n".join(message.content for message in request["messages"])
+        return request
+    
+    def _finish_evaluation(self, request: Dict[str, Any], response: Any) -> Dict[str, Any]:
+        """
+        Turn an LLM evaluation response into the processed evaluation result.
         
-        # Create evaluation prompt
-        prompt = create_evaluation_prompt(code, requested_errors)
+        Args:
+            request: Evaluation request built by _prepare_evaluation
+            response: Raw LLM response
+            
+        Returns:
+            Evaluation results with found and missing errors
+        """
+        requested_errors = request["requested_errors"]
+        
+        # Process response to ensure it's properly formatted
+        processed_response = process_llm_response(response)
+        
+        # Log the evaluation
+        if self.llm_logger:
+            metadata = {
+                "code_length": count_lines(request["code"]),
+                "requested_errors_count": len(requested_errors)
+            }
+            self.llm_logger.log_code_evaluation(request["prompt"], processed_response, metadata)
+        
+        # Extract JSON from the response
+        evaluation_result = self._extract_json_from_response(processed_response)
+        
+        # IMPORTANT: Check if extraction failed and return default result if it did
+        if not evaluation_result or not isinstance(evaluation_result, dict):
+            logger.warning("Failed to extract JSON from evaluation response or result is not a dictionary")
+            return self._default_result(requested_errors)
+        
+        # Only cache evaluations the model actually produced
+        extracted = evaluation_result.get("missing_errors") != ["EXTRACTION_FAILED"]
+        
+        # Process the evaluation result
+        processed_result = self._process_evaluation_result(
+            evaluation_result, requested_errors, request["requested_keys"]
+        )
+        
+        if extracted:
+            self._eval_cache.set(request["cache_key"], copy.deepcopy(processed_result))
+        
+        return processed_result
+    
+    @staticmethod
+    def _evaluation_cache_key(code: str, requested_keys: Dict[str, Any]) -> str:
+        """
+        Build the cache key for an evaluation request.
+        
+        Args:
+            code: The Java code to evaluate
+            requested_keys: Requested errors indexed by their key
+            
+        Returns:
+            Digest of the code followed by the sorted requested error keys
+        """
+        code_digest = hashlib.blake2b(code.encode("utf-8"), digest_size=16).hexdigest()
+        return code_digest + ":" + ",".join(sorted(requested_keys))
+    
+    def evaluate_and_fix(self, code: str, requested_errors: List[Dict[str, Any]],
+                         domain: str = None) -> Tuple[Dict[str, Any], Optional[str], Optional[str]]:
+        """
+        Evaluate Java code and get corrected code from the same LLM call.
+        
+        Args:
+            code: The Java code to evaluate
+            requested_errors: List of errors that should be included in the code
+            domain: Domain context of the code
+            
+        Returns:
+            Tuple of (evaluation result, annotated code, clean code). The code
+            versions are None when the code is valid or no correction was returned.
+        """
+        default_result = self._default_result(requested_errors)
+        
+        if not self.llm:
+            logger.warning("No LLM available for code evaluation")
+            return default_result, None, None
+        
+        prompt = create_evaluate_and_fix_prompt(code, requested_errors, domain)
+        requested_keys = _index_requested(requested_errors)
         
         try:
-            # Generate the evaluation using the LLM
-            logger.info("Sending code to LLM for evaluation")
+            logger.info("Sending code to LLM for combined evaluation and correction")
             response = self.llm.invoke(prompt)
-            # Process response to ensure it's properly formatted
             processed_response = process_llm_response(response)
             
-            # Log the evaluation
             if self.llm_logger:
                 metadata = {
-                    "code_length": len(code.splitlines()),
-                    "requested_errors_count": len(requested_errors)
+                    "code_length": count_lines(code),
+                    "requested_errors_count": len(requested_errors),
+                    "fused_regeneration": True
                 }
                 self.llm_logger.log_code_evaluation(prompt, processed_response, metadata)
             
-            # Extract JSON from the response
             evaluation_result = self._extract_json_from_response(processed_response)
-            
-            # IMPORTANT: Check if extraction failed and return default result if it did
             if not evaluation_result or not isinstance(evaluation_result, dict):
                 logger.warning("Failed to extract JSON from evaluation response or result is not a dictionary")
-                return default_result
+                return default_result, None, None
             
-            # Process the evaluation result
-            processed_result = self._process_evaluation_result(evaluation_result, requested_errors)
+            processed_result = self._process_evaluation_result(evaluation_result, requested_errors, requested_keys)
             
-            return processed_result
+            # Only take code from the explicit correction blocks, never from the JSON block
+            if processed_result.get("valid") or "```java-annotated" not in processed_response:
+                return processed_result, None, None
+            
+            annotated_code, clean_code = extract_both_code_versions(processed_response)
+            return processed_result, annotated_code or None, clean_code or None
             
         except Exception as e:
             logger.error(f"Error evaluating code: {str(e)}")
-            return default_result
+            return default_result, None, None
+    
+    def _default_result(self, requested_errors: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Build the result used when no evaluation can be performed.
+        
+        Args:
+            requested_errors: List of errors that should be included in the code
+            
+        Returns:
+            Evaluation result marking all requested errors as missing
+        """
+        return {
+            "found_errors": [],
+            "missing_errors": _keys_of(requested_errors),
+            "valid": False,
+            "feedback": f"Could not evaluate code. Please ensure the code contains all {len(requested_errors)} requested errors."
+        }
     
     def generate_improved_prompt(self, code: str, requested_errors: List[Dict[str, Any]], 
                           evaluation: Dict[str, Any]) -> str:
@@ -116,33 +635,11 @@ class CodeEvaluationAgent:
         # Determine domain from existing code
         domain = self._infer_domain_from_code(code)
         
-        # Extract missing and found errors
-        missing_errors = []
-        found_errors = []
-        
-        # Process missing errors - handle both string and dictionary formats
-        if "missing_errors" in evaluation:
-            for error in evaluation["missing_errors"]:
-                if isinstance(error, dict):
-                    error_type = error.get("error_type", "").upper()
-                    error_name = error.get("error_name", "")
-                    missing_errors.append(f"{error_type} - {error_name}")
-                elif isinstance(error, str):
-                    missing_errors.append(error)
-        
-        # Process found errors - handle both string and dictionary formats
-        if "found_errors" in evaluation:
-            for error in evaluation["found_errors"]:
-                if isinstance(error, dict):
-                    error_type = error.get("error_type", "").upper()
-                    error_name = error.get("error_name", "")
-                    found_errors.append(f"{error_type} - {error_name}")
-                elif isinstance(error, str):
-                    found_errors.append(error)
+        # Extract missing and found errors - handle both string and dictionary formats
+        missing_errors = self._error_keys(evaluation.get("missing_errors", []))
+        found_errors = self._error_keys(evaluation.get("found_errors", []))
         
         # Use the optimized prompt function
-
-        
         prompt = create_regeneration_prompt(
             code=code,
             domain=domain,
@@ -151,19 +648,61 @@ class CodeEvaluationAgent:
             requested_errors=requested_errors
         )
         
-        # Log the regeneration prompt
-        metadata = {
-            "requested_errors": [f"{error.get('type', '').upper()} - {error.get('name', '')}" for error in requested_errors],
-            "missing_errors": missing_errors,
-            "found_errors": found_errors,
-            "domain": domain,
-            "attempt": self.llm_logger.get_attempt_count("code_generation") + 1
-        }
-        
-        self.llm_logger.log_interaction("regeneration_prompt", prompt, "N/A - Prompt Only", metadata)
+        # Log the regeneration prompt (the logger is optional, as in evaluate_code)
+        if self.llm_logger:
+            metadata = {
+                "requested_errors": _keys_of(requested_errors),
+                "missing_errors": missing_errors,
+                "found_errors": found_errors,
+                "domain": domain,
+                "attempt": self.llm_logger.get_attempt_count("code_generation") + 1
+            }
+            self.llm_logger.log_regeneration_prompt(prompt, metadata)
         
         return prompt
 
+    @staticmethod
+    def _error_keys(errors: List[Any]) -> List[str]:
+        """
+        Convert evaluation errors to "TYPE - Name" keys.
+        
+        Args:
+            errors: Errors as dictionaries with error_type/error_name or as key strings
+            
+        Returns:
+            List of error keys
+        """
+        keys = []
+        for error in errors:
+            if isinstance(error, dict):
+                keys.append(_key_of(error, "error_type", "error_name"))
+            elif isinstance(error, str):
+                keys.append(error)
+        return keys
+    
+    @staticmethod
+    def _reported_error_key(error: Any) -> Optional[str]:
+        """
+        Convert an error reported by the model to a "TYPE - Name" key.
+        
+        Args:
+            error: Error as a dictionary with error_type/error_name or as a string
+            
+        Returns:
+            Error key, or None if the error cannot be interpreted
+        """
+        if isinstance(error, dict):
+            if error.get("error_type") and error.get("error_name"):
+                return _key_of(error, "error_type", "error_name")
+            return None
+        
+        # Try to extract error type and name from string
+        match = _ERROR_KEY_RE.search(str(error))
+        if match:
+            return f"{match.group(1).strip()} - {match.group(2).strip()}"
+        logger.warning(f"Could not process non-dict error: {error}")
+        return None
+    
     def _infer_domain_from_code(self, code: str) -> str:
         """
         Infer the domain of the code based on class and variable names.
@@ -174,31 +713,33 @@ class CodeEvaluationAgent:
         Returns:
             Inferred domain string
         """
-        code_lower = code.lower()
-        
-        # Check for common domains
-        domains = {
-            "student_management": ["student", "course", "enroll", "grade", "academic"],
-            "file_processing": ["file", "read", "write", "path", "directory"],
-            "data_validation": ["validate", "input", "check", "valid", "sanitize"],
-            "calculation": ["calculate", "compute", "math", "formula", "result"],
-            "inventory_system": ["inventory", "product", "stock", "item", "quantity"],
-            "notification_service": ["notify", "message", "alert", "notification", "send"],
-            "banking": ["account", "bank", "transaction", "balance", "deposit"],
-            "e-commerce": ["cart", "product", "order", "payment", "customer"]
-        }
+        digest = hashlib.blake2b(code.encode("utf-8"), digest_size=8).hexdigest()
+        domain = self._domain_cache.get(digest)
+        if domain is None:
+            domain = self._score_domain(code)
+            self._domain_cache.set(digest, domain)
+        return domain
+    
+    @staticmethod
+    def _score_domain(code: str) -> str:
+        """
+        Pick the domain whose terms occur most often in the code.
         
-        # Count domain-related terms
-        domain_scores = {}
-        for domain, terms in domains.items():
-            score = sum(code_lower.count(term) for term in terms)
-            domain_scores[domain] = score
+        Args:
+            code: The Java code
+            
+        Returns:
+            Best matching domain, or "general_application" if none matches
+        """
+        # Count domain-related terms in a single scan of the code
+        domain_scores = Counter()
+        for match in _DOMAIN_KEYWORD_RE.finditer(code.lower()):
+            domain_scores.update(_TERM_DOMAIN_CREDITS[match.group(1)])
         
         # Return the highest scoring domain, or a default
-        if domain_scores:
-            max_domain = max(domain_scores.items(), key=lambda x: x[1])
-            if max_domain[1] > 0:
-                return max_domain[0]
+        max_domain = max(_DOMAIN_TERMS, key=lambda domain: domain_scores[domain])
+        if domain_scores[max_domain] > 0:
+            return max_domain
         
         return "general_application"  # Default domain
     
@@ -227,57 +768,20 @@ class CodeEvaluationAgent:
         # Log first part of response for debugging
         logger.debug(f"Extracting JSON from response: {response[:200]}...")
         
-        # First try direct JSON parsing if the response looks like JSON
-        if response.strip().startswith('{') and response.strip().endswith('}'):
-            try:
-                # Clean the response to fix common JSON issues
-                json_str = response.strip()
-                # Fix trailing commas which are invalid in JSON
-                json_str = re.sub(r',\s*}', '}', json_str)
-                json_str = re.sub(r',\s*]', ']', json_str)
-                # Try to parse as JSON directly
-                return json.loads(json_str)
-            except json.JSONDecodeError:
-                # If direct parsing fails, continue with regex extraction
-                pass
-        
-        # Try to find JSON block with various patterns
-        patterns = [
-            r'```json\s*([\s\S]*?)```',  # JSON in code block
-            r'```\s*({[\s\S]*?})\s*```',  # Any JSON in code block
-            r'({[\s\S]*?"found_errors"[\s\S]*?})',  # JSON with found_errors field
-            r'({[\s\S]*?"valid"[\s\S]*?})',  # JSON with valid field
-            r'({[\s\S]*?"missing_errors"[\s\S]*?})',  # JSON with missing_errors field
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, response, re.DOTALL)
-            for match in matches:
-                try:
-                    # Clean the match to fix common JSON issues
-                    json_str = match.strip()
-                    # Fix trailing commas which are invalid in JSON
-                    json_str = re.sub(r',\s*}', '}', json_str)
-                    json_str = re.sub(r',\s*]', ']', json_str)
-                    # Try to parse as JSON
-                    return json.loads(json_str)
-                except json.JSONDecodeError:
-                    continue
-        
-        # If regex extraction fails, try to find JSON-like structure with looser matching
-        try:
-            opening_bracket = response.find('{')
-            closing_bracket = response.rfind('}')
-            
-            if opening_bracket != -1 and closing_bracket != -1 and opening_bracket < closing_bracket:
-                json_str = response[opening_bracket:closing_bracket + 1]
-                # Fix trailing commas
-                json_str = re.sub(r',\s*}', '}', json_str)
-                json_str = re.sub(r',\s*]', ']', json_str)
-                # Try to parse as JSON
-                return json.loads(json_str)
-        except:
-            pass
+        # Skip any prose before a ```json fence
+        fence = response.find("```json")
+        text = response[fence + 7:] if fence != -1 else response
+        
+        # Without any braces only the plain-text sections below can match
+        opening_bracket = text.find('{')
+        closing_bracket = text.rfind('}')
+        if opening_bracket != -1 and opening_bracket < closing_bracket:
+            # Bound the scan of very long responses to the outermost braces
+            if len(text) > _MAX_SCAN_CHARS:
+                text = text[opening_bracket:closing_bracket + 1]
+            parsed = self._parse_json_candidates(text)
+            if parsed is not None:
+                return parsed
         
         # For Groq responses, if all extraction methods fail, try a more aggressive approach
         # to build a structured result manually
@@ -285,7 +789,7 @@ class CodeEvaluationAgent:
         found_errors = []
         
         # Try to extract found_errors section
-        found_match = re.search(r'found_errors:?\s*\n(.*?)(?:missing_errors|\n\n)', response, re.DOTALL)
+        found_match = _FOUND_SECTION_RE.search(response)
         if found_match:
             found_section = found_match.group(1)
             # Extract individual errors
@@ -294,7 +798,7 @@ class CodeEvaluationAgent:
                     found_errors.append(line.strip())
         
         # Try to extract missing_errors section
-        missing_match = re.search(r'missing_errors:?\s*\n(.*?)(?:\n\n|$)', response, re.DOTALL)
+        missing_match = _MISSING_SECTION_RE.search(response)
         if missing_match:
             missing_section = missing_match.group(1)
             # Extract individual errors
@@ -322,14 +826,55 @@ class CodeEvaluationAgent:
             "feedback": "Could not extract proper analysis from model response."
         }
     
+    @staticmethod
+    def _parse_json_candidates(text: str) -> Optional[Dict[str, Any]]:
+        """
+        Parse the JSON object of a response containing at least one brace pair.
+        
+        Args:
+            text: Response text
+            
+        Returns:
+            Parsed JSON data or None if no object parses
+        """
+        # Scan balanced objects once, preferring the one holding the evaluation
+        first_parsed = None
+        for candidate in iter_json_spans(text):
+            try:
+                # Fix trailing commas which are invalid in JSON
+                json_str = _TRAIL_COMMA_OBJ.sub('}', candidate)
+                json_str = _TRAIL_COMMA_ARR.sub(']', json_str)
+                parsed = _json_loads(json_str)
+            except ValueError:
+                continue
+            if any(key in parsed for key in _EVALUATION_KEYS):
+                return parsed
+            if first_parsed is None:
+                first_parsed = parsed
+        if first_parsed is not None:
+            return first_parsed
+        
+        # If no balanced object parses, try the outermost braces with looser matching
+        try:
+            json_str = text[text.find('{'):text.rfind('}') + 1]
+            # Fix trailing commas
+            json_str = _TRAIL_COMMA_OBJ.sub('}', json_str)
+            json_str = _TRAIL_COMMA_ARR.sub(']', json_str)
+            # Try to parse as JSON
+            return _json_loads(json_str)
+        except ValueError:
+            return None
+    
     def _process_evaluation_result(self, result: Dict[str, Any], 
-                        requested_errors: List[Dict[str, Any]]) -> Dict[str, Any]:
+                        requested_errors: List[Dict[str, Any]],
+                        requested_keys: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
         """
         Process and enhance the evaluation result with improved type safety.
         
         Args:
             result: Raw evaluation result from LLM
             requested_errors: List of requested errors
+            requested_keys: Optional index of requested errors from _index_requested
             
         Returns:
             Processed evaluation result
@@ -373,75 +918,35 @@ class CodeEvaluationAgent:
             result["missing_errors"] = []
         
         # Convert requested errors to keys for easier lookup
-        requested_keys = {}
-        for error in requested_errors:
-            if not isinstance(error, dict):
-                logger.warning(f"Skipping non-dict error in requested_errors: {error}")
-                continue
-                
-            error_type = error.get("type", "").upper()
-            error_name = error.get("name", "")
-            key = f"{error_type} - {error_name}"
-            requested_keys[key] = error
+        if requested_keys is None:
+            requested_keys = _index_requested(requested_errors)
         
-        # Process found errors to make sure they're in the right format for regeneration
+        # Match each reported error to a requested one; case differences in the
+        # model's answer are tolerated, errors that were not requested are dropped
+        folded_keys = {key.casefold(): key for key in requested_keys}
         processed_found_errors = []
+        found_keys = set()
         
         for error in result["found_errors"]:
-            # Skip non-dict errors with warning
-            if not isinstance(error, dict):
-                try:
-                    error_str = str(error)
-                    # Try to extract error type and name from string
-                    match = re.search(r'([A-Z]+)\s*-\s*([^:]+)', error_str)
-                    if match:
-                        error_type = match.group(1).strip()
-                        error_name = match.group(2).strip()
-                        processed_found_errors.append(f"{error_type} - {error_name}")
-                    else:
-                        logger.warning(f"Could not process non-dict error: {error_str}")
-                except:
-                    logger.warning(f"Could not process non-dict error: {error}")
+            key = self._reported_error_key(error)
+            if key is None:
                 continue
-                
-            error_type = error.get("error_type", "").upper()
-            error_name = error.get("error_name", "")
-            
-            if error_type and error_name:
-                processed_found_errors.append(f"{error_type} - {error_name}")
+            requested_key = key if key in requested_keys else folded_keys.get(key.casefold())
+            if requested_key is None:
+                logger.debug(f"Ignoring reported error that was not requested: {key}")
+            elif requested_key not in found_keys:
+                found_keys.add(requested_key)
+                processed_found_errors.append(requested_key)
         
-        # Process missing errors to ensure they're in the right format for regeneration
-        processed_missing_errors = []
-        
-        for error in result["missing_errors"]:
-            # Skip non-dict errors with warning
-            if not isinstance(error, dict):
-                try:
-                    error_str = str(error)
-                    # Try to extract error type and name from string
-                    match = re.search(r'([A-Z]+)\s*-\s*([^:]+)', error_str)
-                    if match:
-                        error_type = match.group(1).strip()
-                        error_name = match.group(2).strip()
-                        processed_missing_errors.append(f"{error_type} - {error_name}")
-                    else:
-                        logger.warning(f"Could not process non-dict error: {error_str}")
-                except:
-                    logger.warning(f"Could not process non-dict error: {error}")
-                continue
-                
-            error_type = error.get("error_type", "").upper()
-            error_name = error.get("error_name", "")
-            
-            if error_type and error_name:
-                processed_missing_errors.append(f"{error_type} - {error_name}")
+        # Every requested error the model did not find is missing
+        processed_missing_errors = [key for key in requested_keys if key not in found_keys]
         
         # Update the result with processed data
         result["found_errors"] = processed_found_errors
         result["missing_errors"] = processed_missing_errors
         
         # Validate the "valid" field based on found vs requested errors
-        result["valid"] = len(processed_missing_errors) == 0 and len(processed_found_errors) == len(requested_errors)
+        result["valid"] = not processed_missing_errors
         
         # Store the original requested error count
         result["original_error_count"] = len(requested_errors)
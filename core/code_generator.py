@@ -6,24 +6,67 @@ Java code snippets based on the selected difficulty level and code length,
 eliminating the reliance on predefined templates.
 """
 
+import re
+import copy
 import random
 import logging
+from types import MappingProxyType
 from langchain_core.language_models import BaseLanguageModel
 from utils.code_utils import create_code_generation_prompt
+from utils.llm_cache import CACHE_TTL, InMemoryCache, make_cache_key
 from utils.llm_logger import LLMInteractionLogger
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Library module: the application configures logging handlers
 logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# Runs of whitespace, collapsed so cosmetically different prompts share a cache entry
+_WHITESPACE = re.compile(r"\s+")
 
 class CodeGenerator:
     """
     Generates Java code snippets dynamically without relying on predefined templates.
     This class creates realistic Java code based on specified complexity and length.
     """
+    # Complexity profiles for different code lengths (read-only, shared by all instances)
+    _COMPLEXITY_PROFILES = MappingProxyType({
+        "short": {
+            "class_count": 1,
+            "method_count_range": (1, 2),  # Reduced to 1-2 methods for beginners
+            "field_count_range": (1, 3),   # Fewer fields
+            "imports_count_range": (0, 1), # Minimal imports
+            "nested_class_prob": 0.0,      # No nested classes for beginners
+            "interface_prob": 0.0          # No interfaces for beginners
+        },
+        "medium": {
+            "class_count": 1,
+            "method_count_range": (3, 5),  # Reduced from 3-6 to 3-5
+            "field_count_range": (2, 5),   # Reduced field count
+            "imports_count_range": (0, 3), # Fewer imports
+            "nested_class_prob": 0.1,      # Reduced probability of nested classes
+            "interface_prob": 0.1          # Reduced probability of interfaces
+        },
+        "long": {
+            "class_count": 1,              # Changed from 2 to 1 (with possibility of 2)
+            "method_count_range": (4, 8),  # Reduced from 5-10 to 4-8
+            "field_count_range": (3, 6),   # Reduced from 4-8 to 3-6
+            "imports_count_range": (1, 4), # Reduced from 2-6 to 1-4
+            "nested_class_prob": 0.3,      # Reduced from 0.5 to 0.3
+            "interface_prob": 0.2          # Reduced from 0.4 to 0.2
+        }
+    })
+
+    # Common Java domains to make code more realistic
+    _DOMAINS = (
+        "user_management", "file_processing", "data_validation", 
+        "calculation", "inventory_system", "notification_service",
+        "logging", "banking", "e-commerce", "student_management"
+    )
+
+    # Public names kept for existing callers
+    complexity_profiles = _COMPLEXITY_PROFILES
+    domains = _DOMAINS
+
     def __init__(self, llm: BaseLanguageModel = None, llm_logger: LLMInteractionLogger = None):
         """
         Initialize the CodeGenerator with an optional language model.
@@ -34,47 +77,59 @@ class CodeGenerator:
         """
         self.llm = llm
         self.llm_logger = llm_logger or LLMInteractionLogger()
+        # Per-instance generator so concurrent generators do not share random state
+        self._rng = random.Random()
+        # Responses to identical prompts; only used for deterministic (temperature 0) models
+        self._response_cache = InMemoryCache(maxsize=64, ttl=CACHE_TTL)
+     
+    def with_temperature(self, temperature: float) -> "CodeGenerator":
+        """
+        Get a generator that samples with a different temperature.
         
-        # Define complexity profiles for different code lengths
-        self.complexity_profiles = {
-            "short": {
-                "class_count": 1,
-                "method_count_range": (1, 2),  # Reduced to 1-2 methods for beginners
-                "field_count_range": (1, 3),   # Fewer fields
-                "imports_count_range": (0, 1), # Minimal imports
-                "nested_class_prob": 0.0,      # No nested classes for beginners
-                "interface_prob": 0.0          # No interfaces for beginners
-            },
-            "medium": {
-                "class_count": 1,
-                "method_count_range": (3, 5),  # Reduced from 3-6 to 3-5
-                "field_count_range": (2, 5),   # Reduced field count
-                "imports_count_range": (0, 3), # Fewer imports
-                "nested_class_prob": 0.1,      # Reduced probability of nested classes
-                "interface_prob": 0.1          # Reduced probability of interfaces
-            },
-            "long": {
-                "class_count": 1,              # Changed from 2 to 1 (with possibility of 2)
-                "method_count_range": (4, 8),  # Reduced from 5-10 to 4-8
-                "field_count_range": (3, 6),   # Reduced from 4-8 to 3-6
-                "imports_count_range": (1, 4), # Reduced from 2-6 to 1-4
-                "nested_class_prob": 0.3,      # Reduced from 0.5 to 0.3
-                "interface_prob": 0.2          # Reduced from 0.4 to 0.2
-            }
-        }
+        Args:
+            temperature: Sampling temperature of the returned generator
+            
+        Returns:
+            Copy of this generator using a copy of its model and its own random
+            state and response cache, or this generator if the model cannot be copied
+        """
+        copy_model = getattr(self.llm, "model_copy", None) or getattr(self.llm, "copy", None)
+        if copy_model is None:
+            return self
+        try:
+            llm = copy_model(update={"temperature": temperature})
+        except Exception as e:
+            logger.warning(f"Could not copy model with temperature {temperature}: {str(e)}")
+            return self
+        generator = copy.copy(self)
+        generator.llm = llm
+        # Copies may run concurrently, so they must not share mutable state
+        generator._rng = random.Random()
+        generator._response_cache = InMemoryCache(maxsize=64, ttl=CACHE_TTL)
+        return generator
+     
+    def _response_cache_key(self, prompt: str):
+        """
+        Build the response cache key for a prompt.
         
-        # Common Java domains to make code more realistic
-        self.domains = [
-            "user_management", "file_processing", "data_validation", 
-            "calculation", "inventory_system", "notification_service",
-            "logging", "banking", "e-commerce", "student_management"
-        ]
+        Args:
+            prompt: Prompt sent to the LLM
+            
+        Returns:
+            Cache key, or None if the model samples and responses must not be reused
+        """
+        if getattr(self.llm, "temperature", None) != 0:
+            return None
+        return make_cache_key({
+            "model": getattr(self.llm, "model_name", None) or getattr(self.llm, "model", None),
+            "temperature": 0,
+            "prompt": _WHITESPACE.sub(" ", prompt).strip()
+        })
      
-    def _generate_with_llm(self, code_length: str, difficulty_level: str, domain: str = None, 
-                       selected_errors=None) -> str:
+    def _generation_request(self, code_length: str, difficulty_level: str, domain: str = None,
+                            selected_errors=None):
         """
-        Generate Java code using the language model.
-        Handles both Ollama and Groq API responses.
+        Build the prompt and logging metadata for a code generation call.
         
         Args:
             code_length: Desired code length (short, medium, long)
@@ -83,11 +138,11 @@ class CodeGenerator:
             selected_errors: Optional list of errors to include
             
         Returns:
-            Generated Java code as a string or AIMessage object
+            Tuple of (prompt, metadata)
         """
         # Select a domain if not provided
         if not domain:
-            domain = random.choice(self.domains)
+            domain = self._rng.choice(self._DOMAINS)
         
         # Create a detailed prompt for the LLM using shared utility
         prompt = create_code_generation_prompt(
@@ -97,26 +152,51 @@ class CodeGenerator:
             domain=domain,
             include_error_annotations=False if selected_errors is None else True
         )
+        
+        # Metadata for logging
+        metadata = {
+            "code_length": code_length,
+            "difficulty_level": difficulty_level,
+            "domain": domain,
+            "selected_errors": selected_errors or []
+        }
+        
+        # Add provider info to metadata if available
+        if hasattr(self.llm, 'provider'):
+            metadata["provider"] = self.llm.provider
+            logger.info(f"Generating Java code with provider: {self.llm.provider}")
+        elif hasattr(self.llm, 'model_name') and 'groq' in type(self.llm).__name__.lower():
+            metadata["provider"] = "groq"
+            logger.info(f"Generating Java code with Groq model: {self.llm.model_name}")
+        else:
+            logger.info(f"Generating Java code with LLM: {code_length} length, {difficulty_level} difficulty, {domain} domain")
+        
+        return prompt, metadata
+     
+    def _generate_with_llm(self, code_length: str, difficulty_level: str, domain: str = None, 
+                       selected_errors=None) -> str:
+        """
+        Generate Java code using the language model.
+        Handles both Ollama and Groq API responses.
+        
+        Args:
+            code_length: Desired code length (short, medium, long)
+            difficulty_level: Difficulty level (easy, medium, hard)
+            domain: Optional domain for the code context
+            selected_errors: Optional list of errors to include
             
-        try:
-            # Metadata for logging
-            metadata = {
-                "code_length": code_length,
-                "difficulty_level": difficulty_level,
-                "domain": domain,
-                "selected_errors": selected_errors or []
-            }
-            
-            # Add provider info to metadata if available
-            if hasattr(self.llm, 'provider'):
-                metadata["provider"] = self.llm.provider
-                logger.info(f"Generating Java code with provider: {self.llm.provider}")
-            elif hasattr(self.llm, 'model_name') and 'groq' in type(self.llm).__name__.lower():
-                metadata["provider"] = "groq"
-                logger.info(f"Generating Java code with Groq model: {self.llm.model_name}")
-            else:
-                logger.info(f"Generating Java code with LLM: {code_length} length, {difficulty_level} difficulty, {domain} domain")
+        Returns:
+            Generated Java code as a string or AIMessage object
+        """
+        prompt, metadata = self._generation_request(code_length, difficulty_level, domain, selected_errors)
+        cache_key = self._response_cache_key(prompt)
+        if cache_key is not None:
+            cached = self._response_cache.get(cache_key)
+            if cached is not None:
+                logger.info("Using cached code generation response")
+                return cached
             
+        try:
             # Generate the code using the LLM
             response = self.llm.invoke(prompt)
             
@@ -126,6 +206,9 @@ class CodeGenerator:
             # Log to the LLM logger
             self.llm_logger.log_code_generation(prompt, response, metadata)
             
+            if cache_key is not None:
+                self._response_cache.set(cache_key, response)
+            
             # Return the response (can be string or AIMessage depending on provider)
             return response
             
@@ -133,5 +216,40 @@ class CodeGenerator:
             logger.error(f"Error generating code with LLM: {str(e)}")          
             return """
     """
+    
+    async def _agenerate_with_llm(self, code_length: str, difficulty_level: str, domain: str = None,
+                                  selected_errors=None) -> str:
+        """
+        Asynchronously generate Java code using the language model.
+        
+        Args:
+            code_length: Desired code length (short, medium, long)
+            difficulty_level: Difficulty level (easy, medium, hard)
+            domain: Optional domain for the code context
+            selected_errors: Optional list of errors to include
+            
+        Returns:
+            Generated Java code as a string or AIMessage object
+        """
+        prompt, metadata = self._generation_request(code_length, difficulty_level, domain, selected_errors)
+        cache_key = self._response_cache_key(prompt)
+        if cache_key is not None:
+            cached = self._response_cache.get(cache_key)
+            if cached is not None:
+                logger.info("Using cached code generation response")
+                return cached
+        
+        try:
+            response = await self.llm.ainvoke(prompt)
+            logger.info(f"LLM response type: {type(response).__name__}")
+            self.llm_logger.log_code_generation(prompt, response, metadata)
+            if cache_key is not None:
+                self._response_cache.set(cache_key, response)
+            return response
+            
+        except Exception as e:
+            logger.error(f"Error generating code with LLM: {str(e)}")
+            return """
+    """
            
-    
\ No newline at end of file
+    
@@ -10,14 +10,11 @@ import datetime
 from typing import List, Dict, Any, Optional, Tuple
 from .student_response_evaluator import StudentResponseEvaluator
 from langchain_core.language_models import BaseLanguageModel
-from utils.code_utils import process_llm_response
+from utils.code_utils import KnownProblems, process_llm_response
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Library module: the application configures logging handlers
 logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
 
 class ReviewIteration:
     """Class for storing a single review iteration."""
@@ -96,8 +93,8 @@ class FeedbackManager:
             evaluation_result: Evaluation results containing found errors
         """
         self.code_snippet = code_snippet
-        # Extract found problems from evaluation result
-        self.known_problems = evaluation_result.get('found_errors', [])
+        # Extract found problems from evaluation result, normalized once for every review iteration
+        self.known_problems = KnownProblems.of(evaluation_result.get('found_errors', []))
         self.review_history = []
         self.current_iteration = 1
         self.review_sufficient = False
@@ -1,18 +1,53 @@
 import re
+import atexit
 import logging
-import json
-from typing import List, Dict, Any
+from collections import ChainMap
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from typing import List, Dict, Any, AsyncIterator, Callable, Optional, Tuple, Union
 from langchain_core.language_models import BaseLanguageModel
 
-from utils.code_utils import create_review_analysis_prompt, create_feedback_prompt, process_llm_response
-from utils.llm_logger import LLMInteractionLogger
+# orjson parses several times faster; fall back to the stdlib
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+from utils.code_utils import (
+    KnownProblems, count_lines, create_batched_review_analysis_prompt, create_review_analysis_prompt,
+    create_feedback_prompt, iter_json_spans, process_llm_response
 )
+from utils.llm_logger import LLMInteractionLogger
+
+# Interaction logs are written off the request path; a single worker keeps
+# log files in order and attempt counters consistent
+_LOG_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm-log")
+atexit.register(_LOG_EXECUTOR.shutdown)
+
+# Combined length of student reviews above which a batch is evaluated one by one
+REVIEW_BATCH_MAX_CHARS = 24000
+
+# Fields recovered one by one when the response holds no parseable JSON object
+_IDENTIFIED_FIELD = re.compile(r'"identified_problems"\s*:\s*(\[.*?\])', re.DOTALL)
+_MISSED_FIELD = re.compile(r'"missed_problems"\s*:\s*(\[.*?\])', re.DOTALL)
+_FALSE_POS_FIELD = re.compile(r'"false_positives"\s*:\s*(\[.*?\])', re.DOTALL)
+_ACCURACY_FIELD = re.compile(r'"accuracy_percentage"\s*:\s*([0-9.]+)')
+_SUFFICIENT_FIELD = re.compile(r'"review_sufficient"\s*:\s*(true|false)')
+_FEEDBACK_FIELD = re.compile(r'"feedback"\s*:\s*"(.*?)"')
+
+# Sentence boundaries used to trim long guidance
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+# Library module: the application configures logging handlers
 logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+def _report_log_failure(future) -> None:
+    """Report an exception raised by a background log write."""
+    error = future.exception()
+    if error is not None:
+        logger.error(f"Error writing LLM interaction log: {str(error)}")
+
 
 class StudentResponseEvaluator:
     """
@@ -20,7 +55,21 @@ class StudentResponseEvaluator:
     
     This class analyzes how thoroughly and accurately a student identified 
     issues in a code snippet, providing detailed feedback and metrics.
-    """    
+    """
+    # Shape of the evaluation returned when the LLM cannot be used; the
+    # problem lists and count are filled in per call
+    _FALLBACK_TEMPLATE = MappingProxyType({
+        "identified_problems": (),
+        "missed_problems": (),
+        "false_positives": (),
+        "accuracy_percentage": 0.0,
+        "identified_percentage": 0.0,
+        "identified_count": 0,
+        "total_problems": 0,
+        "review_sufficient": False,
+        "feedback": "Your review needs improvement. Try to identify more issues in the code."
+    })
+    
     def __init__(self, llm: BaseLanguageModel = None,
                  min_identified_percentage: float = 60.0,
                  llm_logger: LLMInteractionLogger = None):
@@ -36,15 +85,17 @@ class StudentResponseEvaluator:
         self.llm = llm
         self.min_identified_percentage = min_identified_percentage
         self.llm_logger = llm_logger or LLMInteractionLogger()
+        # Review model with JSON output enforced, resolved on first use
+        self._json_llm = None
     
-    def evaluate_review(self, code_snippet: str, known_problems: List[str], student_review: str) -> Dict[str, Any]:
+    def evaluate_review(self, code_snippet: str, known_problems: Union[KnownProblems, List[str]], student_review: str) -> Dict[str, Any]:
         """
         Evaluate a student's review against known problems.
         Uses the create_review_analysis_prompt function from code_utils.
         
         Args:
             code_snippet: The original code snippet with injected errors
-            known_problems: List of known problems in the code
+            known_problems: Known problems in the code, as a list or a shared KnownProblems
             student_review: The student's review comments
             
         Returns:
@@ -53,63 +104,361 @@ class StudentResponseEvaluator:
         try:
             logger.info("Evaluating student review with code_utils prompt")
             
+            # Normalize once; a shared KnownProblems is reused as is
+            known_problems = KnownProblems.of(known_problems)
+            
             if not self.llm:
                 logger.warning("No LLM provided for evaluation, falling back to basic evaluation")
                 return self._fallback_evaluation(known_problems)
             
-            # Create a review analysis prompt using the utility function
-            prompt = create_review_analysis_prompt(
-                code=code_snippet,
-                known_problems=known_problems,
-                student_review=student_review
-            )
+            prompt, metadata = self._review_request(code_snippet, known_problems, student_review)
             
             try:
-                # Metadata for logging
-                metadata = {
-                    "code_length": len(code_snippet.splitlines()),
-                    "known_problems_count": len(known_problems),
-                    "student_review_length": len(student_review.splitlines())
-                }
                 # Get the evaluation from the LLM
                 logger.info("Sending student review to LLM for evaluation")
-                response = self.llm.invoke(prompt)
-                processed_response = process_llm_response(response)
-
-                # Log the interaction
-                self.llm_logger.log_review_analysis(prompt, processed_response, metadata)
-                
-                # Make sure we have a response
-                if not response:
-                    logger.error("LLM returned None or empty response for review evaluation")
-                    return self._fallback_evaluation(known_problems)
-                
-                # Extract JSON data from the response
-                analysis_data = self._extract_json_from_text(processed_response)
-                
-                # Make sure we have analysis data
-                if not analysis_data or "error" in analysis_data:
-                    logger.error(f"Failed to extract valid analysis data: {analysis_data.get('error', 'Unknown error')}")
-                    return self._fallback_evaluation(known_problems)
-                
-                # Process the analysis data
-                enhanced_analysis = self._process_enhanced_analysis(analysis_data, known_problems)
-                
-                # Add the original response for debugging
-                enhanced_analysis["raw_llm_response"] = processed_response
-                
-                return enhanced_analysis
+                response = self._invoke_review(prompt)
+                return self._finish_review(prompt, response, metadata, known_problems)
                 
             except Exception as e:
-                logger.error(f"Error evaluating review with LLM: {str(e)}")                
-                # Log the error
-                error_metadata = {**metadata, "error": str(e)}
-                self.llm_logger.log_review_analysis(prompt, f"ERROR: {str(e)}", error_metadata)                
-                return self._fallback_evaluation(known_problems)
+                return self._review_error(prompt, metadata, known_problems, e)
             
         except Exception as e:
             logger.error(f"Exception in evaluate_review: {str(e)}")
             return self._fallback_evaluation(known_problems)
+    
+    async def aevaluate_review(self, code_snippet: str, known_problems: Union[KnownProblems, List[str]], student_review: str) -> Dict[str, Any]:
+        """
+        Asynchronously evaluate a student's review against known problems.
+        
+        Grading several reviews concurrently with asyncio.gather overlaps their
+        LLM round-trips. With Ollama, the server only runs requests in parallel
+        up to OLLAMA_NUM_PARALLEL, so raise it to match the expected load.
+        
+        Args:
+            code_snippet: The original code snippet with injected errors
+            known_problems: Known problems in the code, as a list or a shared KnownProblems
+            student_review: The student's review comments
+            
+        Returns:
+            Dictionary with detailed analysis results
+        """
+        try:
+            known_problems = KnownProblems.of(known_problems)
+            
+            if not self.llm:
+                logger.warning("No LLM provided for evaluation, falling back to basic evaluation")
+                return self._fallback_evaluation(known_problems)
+            
+            prompt, metadata = self._review_request(code_snippet, known_problems, student_review)
+            
+            try:
+                logger.info("Sending student review to LLM for evaluation")
+                response = await self._ainvoke_review(prompt)
+                return self._finish_review(prompt, response, metadata, known_problems)
+                
+            except Exception as e:
+                return self._review_error(prompt, metadata, known_problems, e)
+            
+        except Exception as e:
+            logger.error(f"Exception in aevaluate_review: {str(e)}")
+            return self._fallback_evaluation(known_problems)
+    
+    def evaluate_reviews_batch(self, code_snippet: str, known_problems: Union[KnownProblems, List[str]],
+                               student_reviews: List[str]) -> List[Dict[str, Any]]:
+        """
+        Evaluate several students' reviews of the same code with one LLM call.
+        
+        The code and known problems are sent once for the whole batch. Reviews
+        that are too long to batch or missing from the batched answer are
+        evaluated individually.
+        
+        Args:
+            code_snippet: The original code snippet with injected errors
+            known_problems: Known problems in the code, as a list or a shared KnownProblems
+            student_reviews: The students' review comments
+            
+        Returns:
+            Analysis results in the same order as student_reviews
+        """
+        known_problems = KnownProblems.of(known_problems)
+        if not self.llm:
+            logger.warning("No LLM provided for evaluation, falling back to basic evaluation")
+            return [self._fallback_evaluation(known_problems) for _ in student_reviews]
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(student_reviews)
+        pending = list(range(len(student_reviews)))
+        
+        # Batch only while the reviews fit comfortably in one prompt
+        if len(pending) > 1 and sum(len(student_reviews[i]) for i in pending) <= REVIEW_BATCH_MAX_CHARS:
+            analyses = self._analyze_review_batch(code_snippet, known_problems,
+                                                  [student_reviews[i] for i in pending])
+            for position, analysis_data in analyses.items():
+                i = pending[position]
+                results[i] = self._process_enhanced_analysis(analysis_data, known_problems)
+        
+        for i, result in enumerate(results):
+            if result is None:
+                results[i] = self.evaluate_review(code_snippet, known_problems, student_reviews[i])
+        return results
+    
+    def _analyze_review_batch(self, code_snippet: str, known_problems: List[str],
+                              student_reviews: List[str]) -> Dict[int, Dict[str, Any]]:
+        """
+        Send a batch of reviews to the LLM and split the answer per review.
+        
+        Args:
+            code_snippet: The original code snippet with injected errors
+            known_problems: List of known problems in the code
+            student_reviews: The students' review comments
+            
+        Returns:
+            Raw analysis data by position in student_reviews; positions the
+            model did not answer are absent
+        """
+        prompt = create_batched_review_analysis_prompt(code_snippet, known_problems, student_reviews)
+        metadata = {
+            "code_length": count_lines(code_snippet),
+            "known_problems_count": len(known_problems),
+            "batch_size": len(student_reviews)
+        }
+        try:
+            logger.info(f"Sending {len(student_reviews)} student reviews to LLM for batched evaluation")
+            response = self._invoke_review(prompt)
+            processed_response = process_llm_response(response)
+            self._log(self.llm_logger.log_review_analysis, prompt, processed_response, metadata)
+        except Exception as e:
+            logger.error(f"Error evaluating review batch with LLM: {str(e)}")
+            self._log(self.llm_logger.log_review_analysis, prompt, f"ERROR: {str(e)}", {**metadata, "error": str(e)})
+            return {}
+        
+        content = response.get("content") if isinstance(response, dict) else getattr(response, "content", response)
+        analyses = content.get("analyses") if isinstance(content, dict) else None
+        if not isinstance(analyses, list):
+            # A wrapping object, or a bare array whose elements are the analyses
+            analyses = []
+            for candidate in iter_json_spans(processed_response):
+                try:
+                    parsed = _json_loads(candidate)
+                except ValueError:
+                    continue
+                if isinstance(parsed.get("analyses"), list):
+                    analyses = parsed["analyses"]
+                    break
+                if "review_index" in parsed:
+                    analyses.append(parsed)
+        
+        by_position = {}
+        for analysis in analyses:
+            if not isinstance(analysis, dict):
+                continue
+            try:
+                position = int(analysis.get("review_index"))
+            except (TypeError, ValueError):
+                continue
+            if 0 <= position < len(student_reviews):
+                by_position.setdefault(position, analysis)
+        if len(by_position) < len(student_reviews):
+            logger.warning(f"Batched evaluation answered {len(by_position)} of {len(student_reviews)} reviews")
+        return by_position
+    
+    @staticmethod
+    def _log(log_fn: Callable[..., None], *args: Any) -> None:
+        """
+        Write an LLM interaction log entry in the background.
+        
+        Args:
+            log_fn: LLMInteractionLogger method to call
+            *args: Arguments for log_fn
+        """
+        future = _LOG_EXECUTOR.submit(log_fn, *args)
+        future.add_done_callback(_report_log_failure)
+    
+    def _review_llm(self) -> BaseLanguageModel:
+        """
+        Get the review model configured to answer in JSON where the provider supports it.
+        
+        Groq chat models take an OpenAI-style response_format and Ollama takes
+        format="json"; other models are used unchanged.
+        
+        Returns:
+            Language model for review analysis
+        """
+        if self._json_llm is None:
+            self._json_llm = self.llm
+            try:
+                # A pool applies these settings to each of its models
+                provider = type(getattr(self.llm, "primary", self.llm)).__name__.lower()
+                if "groq" in provider:
+                    self._json_llm = self.llm.bind(response_format={"type": "json_object"})
+                elif "ollama" in provider and hasattr(self.llm, "format"):
+                    copy_model = getattr(self.llm, "model_copy", None) or self.llm.copy
+                    self._json_llm = copy_model(update={"format": "json"})
+            except Exception as e:
+                logger.warning(f"Could not enable JSON output for review analysis: {str(e)}")
+        return self._json_llm
+    
+    def _disable_json_mode(self, error: Exception) -> None:
+        """
+        Fall back to the plain review model after a JSON mode failure.
+        
+        Args:
+            error: Exception raised by the JSON mode call
+        """
+        logger.warning(f"JSON mode review analysis failed ({str(error)}), retrying without it")
+        self._json_llm = self.llm
+    
+    def _invoke_review(self, prompt: str) -> Any:
+        """
+        Send a review analysis prompt, preferring JSON output.
+        
+        Args:
+            prompt: Review analysis prompt
+            
+        Returns:
+            Raw LLM response
+        """
+        llm = self._review_llm()
+        if llm is self.llm:
+            return self.llm.invoke(prompt)
+        try:
+            return llm.invoke(prompt)
+        except Exception as e:
+            self._disable_json_mode(e)
+            return self.llm.invoke(prompt)
+    
+    async def _ainvoke_review(self, prompt: str) -> Any:
+        """
+        Asynchronously send a review analysis prompt, preferring JSON output.
+        
+        Args:
+            prompt: Review analysis prompt
+            
+        Returns:
+            Raw LLM response
+        """
+        llm = self._review_llm()
+        if llm is self.llm:
+            return await self.llm.ainvoke(prompt)
+        try:
+            return await llm.ainvoke(prompt)
+        except Exception as e:
+            self._disable_json_mode(e)
+            return await self.llm.ainvoke(prompt)
+    
+    def _review_request(self, code_snippet: str, known_problems: List[str],
+                        student_review: str) -> Tuple[str, Dict[str, Any]]:
+        """
+        Build the review analysis prompt and its logging metadata.
+        
+        Args:
+            code_snippet: The original code snippet with injected errors
+            known_problems: List of known problems in the code
+            student_review: The student's review comments
+            
+        Returns:
+            Tuple of (prompt, metadata)
+        """
+        # Create a review analysis prompt using the utility function
+        prompt = create_review_analysis_prompt(
+            code=code_snippet,
+            known_problems=known_problems,
+            student_review=student_review
+        )
+        
+        # Metadata for logging
+        metadata = {
+            "code_length": count_lines(code_snippet),
+            "known_problems_count": len(known_problems),
+            "student_review_length": count_lines(student_review)
+        }
+        return prompt, metadata
+    
+    def _finish_review(self, prompt: str, response: Any, metadata: Dict[str, Any],
+                       known_problems: List[str]) -> Dict[str, Any]:
+        """
+        Turn an LLM review analysis response into the enhanced analysis.
+        
+        Args:
+            prompt: Prompt sent to the LLM
+            response: Raw LLM response
+            metadata: Logging metadata
+            known_problems: List of known problems in the code
+            
+        Returns:
+            Dictionary with detailed analysis results
+        """
+        processed_response = process_llm_response(response)
+
+        # Log the interaction, with prompt cache usage when the provider reports it
+        metadata = {**metadata, **self._prompt_cache_usage(response)}
+        self._log(self.llm_logger.log_review_analysis, prompt, processed_response, metadata)
+        
+        # Make sure we have a response
+        if not response:
+            logger.error("LLM returned None or empty response for review evaluation")
+            return self._fallback_evaluation(known_problems)
+        
+        # Extract JSON data from the response, using structured content as is
+        # (a single-item list is unwrapped unless it is a text content block)
+        content = response.get("content") if isinstance(response, dict) else getattr(response, "content", response)
+        if (isinstance(content, (list, tuple)) and len(content) == 1
+                and isinstance(content[0], dict) and "type" not in content[0]):
+            content = content[0]
+        analysis_data = self._extract_json_from_text(content if isinstance(content, dict) else processed_response)
+        
+        # Make sure we have analysis data
+        if not analysis_data or "error" in analysis_data:
+            logger.error(f"Failed to extract valid analysis data: {analysis_data.get('error', 'Unknown error')}")
+            return self._fallback_evaluation(known_problems)
+        
+        # Process the analysis data
+        enhanced_analysis = self._process_enhanced_analysis(analysis_data, known_problems)
+        
+        # Keep the original response only when debugging; llm_logger already has it
+        if logger.isEnabledFor(logging.DEBUG):
+            enhanced_analysis["raw_llm_response"] = processed_response
+        
+        return enhanced_analysis
+    
+    @staticmethod
+    def _prompt_cache_usage(response: Any) -> Dict[str, int]:
+        """
+        Read provider-side prompt cache statistics from an LLM response.
+        
+        Args:
+            response: Raw LLM response
+            
+        Returns:
+            Cached and cache-creating input token counts, empty if not reported
+        """
+        usage = getattr(response, "usage_metadata", None) or {}
+        details = usage.get("input_token_details") or {}
+        cache_usage = {}
+        if "cache_read" in details:
+            cache_usage["cache_read_input_tokens"] = details["cache_read"]
+        if "cache_creation" in details:
+            cache_usage["cache_creation_input_tokens"] = details["cache_creation"]
+        return cache_usage
+    
+    def _review_error(self, prompt: str, metadata: Dict[str, Any], known_problems: List[str],
+                      error: Exception) -> Dict[str, Any]:
+        """
+        Log a failed review analysis call and return the fallback evaluation.
+        
+        Args:
+            prompt: Prompt sent to the LLM
+            metadata: Logging metadata
+            known_problems: List of known problems in the code
+            error: Exception raised by the call
+            
+        Returns:
+            Basic evaluation dictionary
+        """
+        logger.error(f"Error evaluating review with LLM: {str(error)}")                
+        # Log the error
+        error_metadata = {**metadata, "error": str(error)}
+        self._log(self.llm_logger.log_review_analysis, prompt, f"ERROR: {str(error)}", error_metadata)                
+        return self._fallback_evaluation(known_problems)
             
     def _process_enhanced_analysis(self, analysis_data: Dict[str, Any], known_problems: List[str]) -> Dict[str, Any]:
         """
@@ -130,7 +479,8 @@ class StudentResponseEvaluator:
         identified_count = analysis_data.get("identified_count", 0)
         missed_count = analysis_data.get("missed_count", 0)
         false_positive_count = analysis_data.get("false_positive_count", 0)
-        total_problems = analysis_data.get("total_problems", len(known_problems))
+        # The known problems are authoritative; the model may copy the prompt's example count
+        total_problems = len(known_problems)
         
         # Calculate percentages
         if total_problems > 0:
@@ -158,29 +508,10 @@ class StudentResponseEvaluator:
         missed_problems = analysis_data.get("missed_problems", [])
         false_positives = analysis_data.get("false_positives", [])
         
-        # Simplify the identified problems list if needed
-        simple_identified = []
-        for problem in identified_problems:
-            if isinstance(problem, dict) and "problem" in problem:
-                simple_identified.append(problem["problem"])
-            elif isinstance(problem, str):
-                simple_identified.append(problem)
-        
-        # Simplify the missed problems list if needed
-        simple_missed = []
-        for problem in missed_problems:
-            if isinstance(problem, dict) and "problem" in problem:
-                simple_missed.append(problem["problem"])
-            elif isinstance(problem, str):
-                simple_missed.append(problem)
-        
-        # Simplify the false positives list if needed
-        simple_false_positives = []
-        for false_positive in false_positives:
-            if isinstance(false_positive, dict) and "student_comment" in false_positive:
-                simple_false_positives.append(false_positive["student_comment"])
-            elif isinstance(false_positive, str):
-                simple_false_positives.append(false_positive)
+        # Simplify the problem lists to plain text
+        simple_identified = self._simplify(identified_problems, "problem")
+        simple_missed = self._simplify(missed_problems, "problem")
+        simple_false_positives = self._simplify(false_positives, "student_comment")
         
         # Get overall feedback
         feedback = analysis_data.get("feedback", "")
@@ -216,6 +547,22 @@ class StudentResponseEvaluator:
         
         return enhanced_result
 
+    @staticmethod
+    def _simplify(items: List[Any], key: str) -> List[str]:
+        """
+        Reduce a mixed list of problem dictionaries and strings to strings.
+        
+        Args:
+            items: Problems as dictionaries or plain strings
+            key: Dictionary field holding the problem text
+            
+        Returns:
+            Problem texts; dictionaries without the field are skipped
+        """
+        return [item if isinstance(item, str) else item[key]
+                for item in items
+                if isinstance(item, str) or (isinstance(item, dict) and key in item)]
+
     def _fallback_evaluation(self, known_problems: List[str]) -> Dict[str, Any]:
         """
         Generate a fallback evaluation when the LLM fails.
@@ -228,25 +575,21 @@ class StudentResponseEvaluator:
         """
         logger.warning("Using fallback evaluation due to LLM error")
         
-        # Create a basic fallback evaluation
+        # Fresh lists, since callers may extend the problem lists of the result
         return {
+            **self._FALLBACK_TEMPLATE,
             "identified_problems": [],
-            "missed_problems": known_problems,
+            "missed_problems": list(known_problems),
             "false_positives": [],
-            "accuracy_percentage": 0.0,
-            "identified_percentage": 0.0,
-            "identified_count": 0,
-            "total_problems": len(known_problems),
-            "review_sufficient": False,
-            "feedback": "Your review needs improvement. Try to identify more issues in the code."
+            "total_problems": len(known_problems)
         }
             
-    def _extract_json_from_text(self, text: str) -> Dict[str, Any]:
+    def _extract_json_from_text(self, text: Any) -> Dict[str, Any]:
         """
         Extract JSON data from LLM response text.
         
         Args:
-            text: Text containing JSON data
+            text: Text containing JSON data, or an already parsed payload
             
         Returns:
             Extracted JSON data
@@ -255,66 +598,70 @@ class StudentResponseEvaluator:
         if not text:
             return {"error": "Empty response from LLM"}
         
+        # Structured output needs no parsing
+        if isinstance(text, dict):
+            return text
+        if isinstance(text, (list, tuple)) and len(text) == 1 and isinstance(text[0], dict):
+            return text[0]
+        
         try:
-            # Try to find JSON block with regex
-            patterns = [
-                r'```json\s*([\s\S]*?)```',  # JSON code block
-                r'```\s*({[\s\S]*?})\s*```',  # Any JSON object in code block
-                r'({[\s\S]*"identified_problems"[\s\S]*"missed_problems"[\s\S]*})',  # Look for our expected fields
-                r'({[\s\S]*})',  # Any JSON-like structure
-            ]
-            
-            # Try each pattern
-            for pattern in patterns:
-                matches = re.findall(pattern, text, re.DOTALL)
-                for match in matches:
-                    try:
-                        # Clean up the match
-                        json_str = match.strip()
-                        # Try to parse as JSON
-                        return json.loads(json_str)
-                    except json.JSONDecodeError:
-                        continue
+            # Skip any prose before a ```json fence
+            fence = text.find("```json")
+            search_text = text[fence + 7:] if fence != -1 else text
+            
+            # Scan balanced objects once, preferring the one holding the analysis
+            first_parsed = None
+            for candidate in iter_json_spans(search_text):
+                try:
+                    parsed = _json_loads(candidate.strip())
+                except ValueError:
+                    continue
+                if "identified_problems" in parsed:
+                    return parsed
+                if first_parsed is None:
+                    first_parsed = parsed
+            if first_parsed is not None:
+                return first_parsed
             
             # If standard methods fail, try to manually extract fields
             logger.warning("Could not extract JSON, attempting manual extraction")
             analysis = {}
             
             # Try to extract identified problems
-            identified_match = re.search(r'"identified_problems"\s*:\s*(\[.*?\])', text, re.DOTALL)
+            identified_match = _IDENTIFIED_FIELD.search(text)
             if identified_match:
                 try:
                     identified_str = identified_match.group(1)
-                    analysis["identified_problems"] = json.loads(identified_str)
+                    analysis["identified_problems"] = _json_loads(identified_str)
                 except:
                     analysis["identified_problems"] = []
             else:
                 analysis["identified_problems"] = []
             
             # Try to extract missed problems
-            missed_match = re.search(r'"missed_problems"\s*:\s*(\[.*?\])', text, re.DOTALL)
+            missed_match = _MISSED_FIELD.search(text)
             if missed_match:
                 try:
                     missed_str = missed_match.group(1)
-                    analysis["missed_problems"] = json.loads(missed_str)
+                    analysis["missed_problems"] = _json_loads(missed_str)
                 except:
                     analysis["missed_problems"] = []
             else:
                 analysis["missed_problems"] = []
             
             # Try to extract false positives
-            false_pos_match = re.search(r'"false_positives"\s*:\s*(\[.*?\])', text, re.DOTALL)
+            false_pos_match = _FALSE_POS_FIELD.search(text)
             if false_pos_match:
                 try:
                     false_pos_str = false_pos_match.group(1)
-                    analysis["false_positives"] = json.loads(false_pos_str)
+                    analysis["false_positives"] = _json_loads(false_pos_str)
                 except:
                     analysis["false_positives"] = []
             else:
                 analysis["false_positives"] = []
             
             # Try to extract accuracy percentage
-            accuracy_match = re.search(r'"accuracy_percentage"\s*:\s*([0-9.]+)', text)
+            accuracy_match = _ACCURACY_FIELD.search(text)
             if accuracy_match:
                 try:
                     analysis["accuracy_percentage"] = float(accuracy_match.group(1))
@@ -324,14 +671,14 @@ class StudentResponseEvaluator:
                 analysis["accuracy_percentage"] = 0.0
             
             # Try to extract review_sufficient
-            sufficient_match = re.search(r'"review_sufficient"\s*:\s*(true|false)', text)
+            sufficient_match = _SUFFICIENT_FIELD.search(text)
             if sufficient_match:
                 analysis["review_sufficient"] = sufficient_match.group(1) == "true"
             else:
                 analysis["review_sufficient"] = False
             
             # Try to extract feedback
-            feedback_match = re.search(r'"feedback"\s*:\s*"(.*?)"', text)
+            feedback_match = _FEEDBACK_FIELD.search(text)
             if feedback_match:
                 analysis["feedback"] = feedback_match.group(1)
             else:
@@ -374,53 +721,197 @@ class StudentResponseEvaluator:
             logger.warning("No LLM provided for guidance generation, using concise fallback guidance")
             return self._generate_concise_guidance(review_analysis)
         
+        prompt = None
+        metadata = self._guidance_metadata(known_problems, review_analysis, iteration_count, max_iterations)
         try:
-            # Get iteration information to add to review_analysis for context
-            review_context = review_analysis.copy()
-            review_context.update({
-                "iteration_count": iteration_count,
-                "max_iterations": max_iterations,
-                "remaining_attempts": max_iterations - iteration_count
-            })
-
-            # Use the utility function to create the prompt
-            prompt = create_feedback_prompt(
-                code=code_snippet,
-                known_problems=known_problems,
-                review_analysis=review_context
-            )
-
-            metadata = {
-                "iteration": iteration_count,
-                "max_iterations": max_iterations,
-                "identified_count": review_analysis.get("identified_count", 0),
-                "total_problems": review_analysis.get("total_problems", len(known_problems)),
-                "identified_percentage": review_analysis.get("identified_percentage", 0)
-            }
+            prompt = self._guidance_prompt(code_snippet, known_problems, review_analysis,
+                                           iteration_count, max_iterations)
 
             # Generate the guidance using the LLM
             logger.info(f"Generating concise targeted guidance for iteration {iteration_count}")
             response = self.llm.invoke(prompt)
-            guidance = process_llm_response(response)
+            return self._finish_guidance(prompt, response, metadata)
             
-            # Ensure response is concise - trim if needed
-            if len(guidance.split()) > 100:
-                # Split into sentences and take the first 3-4
-                sentences = re.split(r'(?<=[.!?])\s+', guidance)
-                guidance = ' '.join(sentences[:4])
-                logger.info(f"Trimmed guidance from {len(guidance.split())} to {len(guidance.split())} words")
+        except Exception as e:
+            return self._guidance_error(prompt, metadata, review_analysis, e)
+    
+    async def agenerate_targeted_guidance(self, code_snippet: str, known_problems: List[str], student_review: str,
+                                          review_analysis: Dict[str, Any], iteration_count: int,
+                                          max_iterations: int) -> str:
+        """
+        Asynchronously generate targeted guidance for the student to improve their review.
+        
+        Args:
+            code_snippet: The original code snippet with injected errors
+            known_problems: List of known problems in the code
+            student_review: The student's review comments
+            review_analysis: Analysis of the student review
+            iteration_count: Current iteration number
+            max_iterations: Maximum number of iterations
             
-            # Log the interaction
-            self.llm_logger.log_summary_generation(prompt, guidance, metadata)            
-            return guidance
+        Returns:
+            Targeted guidance text
+        """
+        if not self.llm:
+            logger.warning("No LLM provided for guidance generation, using concise fallback guidance")
+            return self._generate_concise_guidance(review_analysis)
+        
+        prompt = None
+        metadata = self._guidance_metadata(known_problems, review_analysis, iteration_count, max_iterations)
+        try:
+            prompt = self._guidance_prompt(code_snippet, known_problems, review_analysis,
+                                           iteration_count, max_iterations)
+            logger.info(f"Generating concise targeted guidance for iteration {iteration_count}")
+            response = await self.llm.ainvoke(prompt)
+            return self._finish_guidance(prompt, response, metadata)
             
         except Exception as e:
-            logger.error(f"Error generating guidance with LLM: {str(e)}")            
-            # Log the error
-            error_metadata = {**metadata, "error": str(e)}
-            self.llm_logger.log_interaction("targeted_guidance", prompt, f"ERROR: {str(e)}", error_metadata)            
-            # Fallback to concise guidance
-            return self._generate_concise_guidance(review_analysis)
+            return self._guidance_error(prompt, metadata, review_analysis, e)
+    
+    async def astream_targeted_guidance(self, code_snippet: str, known_problems: List[str], student_review: str,
+                                        review_analysis: Dict[str, Any], iteration_count: int,
+                                        max_iterations: int) -> AsyncIterator[str]:
+        """
+        Stream targeted guidance as the LLM produces it.
+        
+        Chunks are yielded as they arrive, so the guidance is not trimmed; the
+        complete text is logged once the stream ends.
+        
+        Args:
+            code_snippet: The original code snippet with injected errors
+            known_problems: List of known problems in the code
+            student_review: The student's review comments
+            review_analysis: Analysis of the student review
+            iteration_count: Current iteration number
+            max_iterations: Maximum number of iterations
+            
+        Yields:
+            Pieces of guidance text
+        """
+        if not self.llm:
+            logger.warning("No LLM provided for guidance generation, using concise fallback guidance")
+            yield self._generate_concise_guidance(review_analysis)
+            return
+        
+        prompt = None
+        parts = []
+        metadata = self._guidance_metadata(known_problems, review_analysis, iteration_count, max_iterations)
+        try:
+            prompt = self._guidance_prompt(code_snippet, known_problems, review_analysis,
+                                           iteration_count, max_iterations)
+            logger.info(f"Streaming targeted guidance for iteration {iteration_count}")
+            async for chunk in self.llm.astream(prompt):
+                text = chunk.content if hasattr(chunk, "content") else str(chunk)
+                if text:
+                    parts.append(text)
+                    yield text
+        except Exception as e:
+            fallback = self._guidance_error(prompt, metadata, review_analysis, e)
+            # Only fall back if the student has not seen any guidance yet
+            if not parts:
+                yield fallback
+            return
+        
+        self._log(self.llm_logger.log_summary_generation, prompt, "".join(parts), metadata)
+    
+    def _guidance_prompt(self, code_snippet: str, known_problems: List[str], review_analysis: Dict[str, Any],
+                         iteration_count: int, max_iterations: int) -> str:
+        """
+        Build the targeted guidance prompt.
+        
+        Args:
+            code_snippet: The original code snippet with injected errors
+            known_problems: List of known problems in the code
+            review_analysis: Analysis of the student review
+            iteration_count: Current iteration number
+            max_iterations: Maximum number of iterations
+            
+        Returns:
+            Guidance prompt
+        """
+        # Layer iteration information over review_analysis without copying it;
+        # create_feedback_prompt only reads the fields it needs
+        review_context = ChainMap({
+            "iteration_count": iteration_count,
+            "max_iterations": max_iterations,
+            "remaining_attempts": max_iterations - iteration_count
+        }, review_analysis)
+
+        # Use the utility function to create the prompt
+        return create_feedback_prompt(
+            code=code_snippet,
+            known_problems=known_problems,
+            review_analysis=review_context
+        )
+    
+    @staticmethod
+    def _guidance_metadata(known_problems: List[str], review_analysis: Dict[str, Any],
+                           iteration_count: int, max_iterations: int) -> Dict[str, Any]:
+        """
+        Build the logging metadata of a guidance request.
+        
+        Args:
+            known_problems: List of known problems in the code
+            review_analysis: Analysis of the student review
+            iteration_count: Current iteration number
+            max_iterations: Maximum number of iterations
+            
+        Returns:
+            Logging metadata
+        """
+        return {
+            "iteration": iteration_count,
+            "max_iterations": max_iterations,
+            "identified_count": review_analysis.get("identified_count", 0),
+            "total_problems": review_analysis.get("total_problems", len(known_problems)),
+            "identified_percentage": review_analysis.get("identified_percentage", 0)
+        }
+    
+    def _finish_guidance(self, prompt: str, response: Any, metadata: Dict[str, Any]) -> str:
+        """
+        Trim and log the guidance returned by the LLM.
+        
+        Args:
+            prompt: Prompt sent to the LLM
+            response: Raw LLM response
+            metadata: Logging metadata
+            
+        Returns:
+            Targeted guidance text
+        """
+        guidance = process_llm_response(response)
+        
+        # Ensure response is concise - trim if needed
+        if len(guidance.split()) > 100:
+            # Split into sentences and take the first 3-4
+            sentences = _SENTENCE_END.split(guidance)
+            guidance = ' '.join(sentences[:4])
+            logger.info(f"Trimmed guidance from {len(guidance.split())} to {len(guidance.split())} words")
+        
+        # Log the interaction
+        self._log(self.llm_logger.log_summary_generation, prompt, guidance, metadata)            
+        return guidance
+    
+    def _guidance_error(self, prompt: Optional[str], metadata: Dict[str, Any],
+                        review_analysis: Dict[str, Any], error: Exception) -> str:
+        """
+        Log a failed guidance call and return the concise fallback guidance.
+        
+        Args:
+            prompt: Prompt sent to the LLM, if it was built
+            metadata: Logging metadata
+            review_analysis: Analysis of the student review
+            error: Exception raised while generating guidance
+            
+        Returns:
+            Concise guidance text
+        """
+        logger.error(f"Error generating guidance with LLM: {str(error)}")            
+        # Log the error
+        error_metadata = {**metadata, "error": str(error)}
+        self._log(self.llm_logger.log_interaction, "targeted_guidance", prompt, f"ERROR: {str(error)}", error_metadata)            
+        # Fallback to concise guidance
+        return self._generate_concise_guidance(review_analysis)
         
     def _generate_concise_guidance(self, review_analysis: Dict[str, Any]) -> str:
         """
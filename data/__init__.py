@@ -5,8 +5,9 @@ This package contains data access components for retrieving
 and managing Java error data from JSON files.
 """
 
-from data.json_error_repository import JsonErrorRepository
+from data.json_error_repository import JsonErrorRepository, get_repository
 
 __all__ = [
-    'JsonErrorRepository'
+    'JsonErrorRepository',
+    'get_repository'
 ]
\ No newline at end of file
@@ -6,17 +6,114 @@ eliminating the need for intermediate data transformation.
 """
 
 import os
-import json
+import re
+import sys
+import hashlib
 import logging
 import random
-from typing import Dict, List, Any, Optional, Set, Union, Tuple
+from functools import lru_cache
+from operator import itemgetter
+from types import MappingProxyType
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+import numpy as np
+from typing import Callable, Dict, Iterable, List, Any, Mapping, NamedTuple, Optional, Set, Union, Tuple
+
+# orjson parses several times faster; fall back to the stdlib
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
+# Aho-Corasick matches many search terms in one pass; optional
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# ijson parses large files category by category without buffering them; optional
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# msgpack stores the parsed error files; without it they are parsed on every start
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Library module: the application configures logging handlers
 logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# Validated error files are stored with msgpack in the user cache directory
+# and reused while the JSON file is unchanged; bump the format whenever the
+# stored structure changes
+ERROR_CACHE_ENABLED = msgpack is not None and os.getenv("ERROR_REPOSITORY_CACHE", "true").lower() == "true"
+ERROR_CACHE_DIR = os.getenv("ERROR_REPOSITORY_CACHE_DIR") or os.path.join(
+    os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "java-peer-review", "errors"
+)
+_CACHE_FORMAT = 5
+
+# File size from which error files are parsed incrementally with ijson
+STREAMING_PARSE_MIN_BYTES = int(os.getenv("STREAMING_PARSE_MIN_BYTES", str(8 * 1024 * 1024)))
+
+# Error count from which search_errors scans with pyarrow compute kernels
+# instead of a Python loop; below it the import and conversion cost dominates
+ARROW_SEARCH_MIN_ERRORS = int(os.getenv("ARROW_SEARCH_MIN_ERRORS", "2000"))
+
+# Problem description prefixes; any error that is not a build error is a checkstyle error
+_BUILD_PROBLEM_PREFIX = "Build Error - "
+_CHECKSTYLE_PROBLEM_PREFIX = "Checkstyle Error - "
+
+# Directory of this module and the project root, used to locate the error files
+_CURRENT_DIR = os.path.dirname(os.path.realpath(__file__))
+_PARENT_DIR = os.path.dirname(_CURRENT_DIR)
+
+class ErrorRecord(NamedTuple):
+    """An error as used for LLM error selection; converted to a dictionary when returned."""
+    type: str
+    category: str
+    name: str
+    description: str
+    implementation_guide: str
+
+@lru_cache(maxsize=1)
+def _pyarrow_modules() -> Optional[Tuple[Any, Any]]:
+    """
+    Import pyarrow on first use.
+    
+    Returns:
+        Tuple of (pyarrow, pyarrow.compute), or None if pyarrow is not installed
+    """
+    try:
+        import pyarrow
+        import pyarrow.compute
+    except ImportError:
+        return None
+    return pyarrow, pyarrow.compute
+
+@lru_cache(maxsize=32)
+def _term_matcher(terms: Tuple[str, ...]) -> Callable[[str], bool]:
+    """
+    Build a function telling whether a text contains any of the search terms.
+    
+    Args:
+        terms: Non-empty lowercase search terms
+        
+    Returns:
+        Predicate over lowercase text
+    """
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for term in terms:
+            automaton.add_word(term, term)
+        automaton.make_automaton()
+        return lambda text: next(automaton.iter(text), None) is not None
+    
+    pattern = re.compile("|".join(map(re.escape, terms)))
+    return lambda text: pattern.search(text) is not None
 
 class JsonErrorRepository:
     """
@@ -27,25 +124,90 @@ class JsonErrorRepository:
     """
     
     def __init__(self, build_errors_path: str = "build_errors.json",
-                checkstyle_errors_path: str = "checkstyle_error.json"):
+                checkstyle_errors_path: str = "checkstyle_error.json", eager: bool = False,
+                seed: Optional[int] = None):
         """
         Initialize the JSON Error Repository.
         
+        Each file is loaded on first use of its errors unless eager is set.
+        
         Args:
             build_errors_path: Path to the build errors JSON file
             checkstyle_errors_path: Path to the code quality errors JSON file
+            eager: Load both files immediately
+            seed: Optional seed making error selection reproducible
         """
         self.build_errors_path = build_errors_path
         self.checkstyle_errors_path = checkstyle_errors_path
         
         # Initialize data
-        self.build_errors = {}
-        self.checkstyle_errors = {}
-        self.build_categories = []
-        self.checkstyle_categories = []
+        self._build_errors = {}
+        self._checkstyle_errors = {}
+        self._build_categories = ()
+        self._checkstyle_categories = ()
+        self._build_loaded = False
+        self._checkstyle_loaded = False
+        
+        # Per-instance generators for error selection, so selections do not go
+        # through the locked module-level generator and can be reproduced
+        self._rng = random.Random(seed)
+        self._np_rng = np.random.default_rng(seed)
+        
+        # Error name -> (category, error) lookups, rebuilt whenever a file is loaded
+        self._build_index = {}
+        self._checkstyle_index = {}
+        
+        # Errors by category, already shaped the way they are handed to the LLM
+        self._build_flat = {}
+        self._checkstyle_flat = {}
+        
+        # (lowercase name, lowercase description, result) entries for search_errors
+        self._build_search = []
+        self._checkstyle_search = []
+        
+        # Search fields of both files as pyarrow arrays, built on the first large search
+        self._search_arrays = None
+        
+        # Read-only view returned by get_all_categories, rebuilt whenever a file is loaded
+        self._all_categories = None
         
         # Load error data from JSON files
-        self.load_error_data()
+        if eager:
+            self.load_error_data()
+    
+    @property
+    def build_errors(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Build errors by category."""
+        self._ensure_build_loaded()
+        return self._build_errors
+    
+    @property
+    def build_categories(self) -> Tuple[str, ...]:
+        """Build error categories."""
+        self._ensure_build_loaded()
+        return self._build_categories
+    
+    @property
+    def checkstyle_errors(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Code quality errors by category."""
+        self._ensure_checkstyle_loaded()
+        return self._checkstyle_errors
+    
+    @property
+    def checkstyle_categories(self) -> Tuple[str, ...]:
+        """Code quality error categories."""
+        self._ensure_checkstyle_loaded()
+        return self._checkstyle_categories
+    
+    def _ensure_build_loaded(self) -> None:
+        """Load the build errors file if it has not been loaded yet."""
+        if not self._build_loaded:
+            self._load_build_errors()
+    
+    def _ensure_checkstyle_loaded(self) -> None:
+        """Load the code quality errors file if it has not been loaded yet."""
+        if not self._checkstyle_loaded:
+            self._load_checkstyle_errors()
     
     def load_error_data(self) -> bool:
         """
@@ -68,15 +230,16 @@ class JsonErrorRepository:
         """
         try:
             # Try different paths to find the build errors file
-            file_paths = self._get_potential_file_paths(self.build_errors_path)
-            
-            for file_path in file_paths:
-                if os.path.exists(file_path):
-                    with open(file_path, 'r') as file:
-                        self.build_errors = json.load(file)
-                        self.build_categories = list(self.build_errors.keys())
-                        #logger.info(f"Loaded build errors from {file_path} with {len(self.build_categories)} categories")
-                        return True
+            loaded = self._read_error_file(self.build_errors_path, "build", "error_name")
+            if loaded is not None:
+                self._build_errors = loaded["errors"]
+                self._build_categories = tuple(self._build_errors)
+                self._build_index = loaded["index"]
+                self._build_flat = loaded["flat"]
+                self._build_search = loaded["search"]
+                self._search_arrays = None
+                self._all_categories = None
+                return True
             
             logger.warning(f"Could not find build errors file: {self.build_errors_path}")
             return False
@@ -84,6 +247,9 @@ class JsonErrorRepository:
         except Exception as e:
             logger.error(f"Error loading build errors: {str(e)}")
             return False
+        finally:
+            # Not retried on every access if the file is missing or invalid
+            self._build_loaded = True
     
     def _load_checkstyle_errors(self) -> bool:
         """
@@ -94,15 +260,16 @@ class JsonErrorRepository:
         """
         try:
             # Try different paths to find the code quality errors file
-            file_paths = self._get_potential_file_paths(self.checkstyle_errors_path)
-            
-            for file_path in file_paths:
-                if os.path.exists(file_path):
-                    with open(file_path, 'r') as file:
-                        self.checkstyle_errors = json.load(file)
-                        self.checkstyle_categories = list(self.checkstyle_errors.keys())
-                        #logger.info(f"Loaded code quality errors from {file_path} with {len(self.checkstyle_categories)} categories")
-                        return True
+            loaded = self._read_error_file(self.checkstyle_errors_path, "checkstyle", "check_name")
+            if loaded is not None:
+                self._checkstyle_errors = loaded["errors"]
+                self._checkstyle_categories = tuple(self._checkstyle_errors)
+                self._checkstyle_index = loaded["index"]
+                self._checkstyle_flat = loaded["flat"]
+                self._checkstyle_search = loaded["search"]
+                self._search_arrays = None
+                self._all_categories = None
+                return True
             
             logger.warning(f"Could not find code quality errors file: {self.checkstyle_errors_path}")
             return False
@@ -110,6 +277,238 @@ class JsonErrorRepository:
         except Exception as e:
             logger.error(f"Error loading code quality errors: {str(e)}")
             return False
+        finally:
+            self._checkstyle_loaded = True
+    
+    @staticmethod
+    def _validate_errors(errors: Dict[str, Any], name_field: str) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Check the parsed error file once so later code can index fields directly.
+        
+        Errors without a name or description are dropped. Category and error
+        names, which every derived record and lookup key refers to, are
+        interned, and optional fields are filled in.
+        
+        Args:
+            errors: Parsed errors by category
+            name_field: Field holding the error name
+            
+        Returns:
+            Validated errors by category
+        """
+        validated = {}
+        for category, category_errors in errors.items():
+            valid = []
+            for error in category_errors:
+                if not isinstance(error, dict) or name_field not in error or "description" not in error:
+                    continue
+                error[name_field] = sys.intern(error[name_field])
+                error.setdefault("implementation_guide", "")
+                valid.append(error)
+            if len(valid) != len(category_errors):
+                logger.warning(f"Skipped {len(category_errors) - len(valid)} malformed errors in category '{category}'")
+            validated[sys.intern(category)] = valid
+        return validated
+    
+    @staticmethod
+    def _index_errors(errors: Dict[str, List[Dict[str, Any]]], name_field: str) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+        """
+        Index errors by name.
+        
+        Args:
+            errors: Errors by category
+            name_field: Field holding the error name
+            
+        Returns:
+            Dictionary mapping each error name to its (category, error);
+            the first occurrence wins, as with a linear scan
+        """
+        index = {}
+        for category, category_errors in errors.items():
+            for error in category_errors:
+                index.setdefault(error[name_field], (category, error))
+        return index
+    
+    @staticmethod
+    def _flatten_errors(errors: Dict[str, List[Dict[str, Any]]], error_type: str,
+                        name_field: str) -> Dict[str, List[ErrorRecord]]:
+        """
+        Shape errors into the records used for LLM error selection.
+        
+        Args:
+            errors: Errors by category
+            error_type: Type of the errors ('build' or 'checkstyle')
+            name_field: Field holding the error name
+            
+        Returns:
+            Dictionary mapping each category to its error records
+        """
+        fields = itemgetter(name_field, "description", "implementation_guide")
+        return {
+            category: [ErrorRecord(error_type, category, *fields(error)) for error in category_errors]
+            for category, category_errors in errors.items()
+        }
+    
+    @staticmethod
+    def _search_entries(errors: Dict[str, List[Dict[str, Any]]], error_type: str,
+                        name_field: str) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """
+        Prepare errors for case-insensitive substring search.
+        
+        Args:
+            errors: Errors by category
+            error_type: Type of the errors ('build' or 'checkstyle')
+            name_field: Field holding the error name
+            
+        Returns:
+            List of (lowercase name, lowercase description, search result) tuples
+        """
+        fields = itemgetter(name_field, "description")
+        return [
+            (
+                name.lower(),
+                description.lower(),
+                {
+                    "type": error_type,
+                    "category": category,
+                    "name": name,
+                    "description": description
+                }
+            )
+            for category, category_errors in errors.items()
+            for name, description in map(fields, category_errors)
+        ]
+    
+    def _lookup(self, error_type: str, error_name: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        Find an error by name.
+        
+        Args:
+            error_type: Type of error ('build' or 'checkstyle')
+            error_name: Name of the error
+            
+        Returns:
+            Tuple of (category, error) or None if not found
+        """
+        if error_type == "build":
+            self._ensure_build_loaded()
+            return self._build_index.get(error_name)
+        elif error_type == "checkstyle":
+            self._ensure_checkstyle_loaded()
+            return self._checkstyle_index.get(error_name)
+        return None
+    
+    def _read_error_file(self, file_name: str, error_type: str, name_field: str) -> Optional[Dict[str, Any]]:
+        """
+        Load the first error file found among the potential locations.
+        
+        Args:
+            file_name: Base file name to search for
+            error_type: Type of the errors ('build' or 'checkstyle')
+            name_field: Field holding the error name
+            
+        Returns:
+            Dictionary with the errors and their derived lookups ("errors",
+            "index", "flat", "search"), or None if the file was not found
+        """
+        for file_path in self._get_potential_file_paths(file_name):
+            # Opening directly avoids a separate existence check per location
+            try:
+                file = open(file_path, 'rb')
+            except FileNotFoundError:
+                continue
+            
+            cache_path = self._cache_path(file_path)
+            with file:
+                stat = os.fstat(file.fileno())
+                signature = [stat.st_mtime_ns, stat.st_size]
+                cached = self._read_cache(cache_path, signature) if ERROR_CACHE_ENABLED else None
+                if cached is not None:
+                    errors = cached
+                elif ijson is not None and stat.st_size >= STREAMING_PARSE_MIN_BYTES:
+                    # One category at a time, without holding the whole file in memory
+                    errors = dict(ijson.kvitems(file, "", use_float=True))
+                else:
+                    errors = _json_loads(file.read())
+            
+            # Cached errors are already valid; validating them again interns their names
+            errors = self._validate_errors(errors, name_field)
+            if ERROR_CACHE_ENABLED and cached is None:
+                self._write_cache(cache_path, signature, errors)
+            
+            # The lookups share the error dictionaries, so they are always rebuilt
+            return {
+                "errors": errors,
+                "index": self._index_errors(errors, name_field),
+                "flat": self._flatten_errors(errors, error_type, name_field),
+                "search": self._search_entries(errors, error_type, name_field)
+            }
+        return None
+    
+    @staticmethod
+    def _cache_path(file_path: str) -> str:
+        """
+        Get the cache file of an error file.
+        
+        Args:
+            file_path: Path of the JSON error file
+            
+        Returns:
+            Path in the user cache directory, unique per error file
+        """
+        digest = hashlib.blake2b(os.path.realpath(file_path).encode("utf-8"), digest_size=12).hexdigest()
+        return os.path.join(ERROR_CACHE_DIR, f"{os.path.basename(file_path)}.{digest}.msgpack")
+    
+    @staticmethod
+    def _read_cache(cache_path: str, signature: List[int]) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """
+        Read cached error data if it was built from the current file.
+        
+        Args:
+            cache_path: Path of the msgpack file
+            signature: [modification time, size] of the JSON file
+            
+        Returns:
+            Cached errors by category or None if missing or stale
+        """
+        try:
+            with open(cache_path, 'rb') as file:
+                cached = msgpack.unpackb(file.read(), raw=False)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.debug(f"Ignoring unreadable error cache {cache_path}: {str(e)}")
+            return None
+        
+        if (not isinstance(cached, dict) or cached.get("format") != _CACHE_FORMAT
+                or cached.get("signature") != signature or not isinstance(cached.get("errors"), dict)):
+            return None
+        return cached["errors"]
+    
+    @staticmethod
+    def _write_cache(cache_path: str, signature: List[int], errors: Dict[str, List[Dict[str, Any]]]) -> None:
+        """
+        Store validated errors in the cache directory, ignoring write failures.
+        
+        Args:
+            cache_path: Path of the msgpack file
+            signature: [modification time, size] of the JSON file
+            errors: Validated errors by category
+        """
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(temp_path, 'wb') as file:
+                file.write(msgpack.packb({"format": _CACHE_FORMAT, "signature": signature, "errors": errors},
+                                         use_bin_type=True))
+            # Atomic so concurrent processes never read a partial cache
+            os.replace(temp_path, cache_path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.debug(f"Could not write error cache {cache_path}: {str(e)}")
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
     
     def _get_potential_file_paths(self, file_name: str) -> List[str]:
         """
@@ -121,33 +520,29 @@ class JsonErrorRepository:
         Returns:
             List of potential file paths
         """
-        # Get the current directory
-        current_dir = os.path.dirname(os.path.realpath(__file__))
-        
-        # Get the parent directory (project root)
-        parent_dir = os.path.dirname(current_dir)
-        
         # Try various potential locations
         return [
             file_name,  # Direct file name (if it's in the working directory)
-            os.path.join(current_dir, file_name),  # In the same directory as this file
-            os.path.join(parent_dir, file_name),  # In the parent directory (project root)
-            os.path.join(parent_dir, "data", file_name),  # In a data subdirectory
-            os.path.join(parent_dir, "resources", file_name),  # In a resources subdirectory
-            os.path.join(parent_dir, "assets", file_name)  # In an assets subdirectory
+            os.path.join(_CURRENT_DIR, file_name),  # In the same directory as this file
+            os.path.join(_PARENT_DIR, file_name),  # In the parent directory (project root)
+            os.path.join(_PARENT_DIR, "data", file_name),  # In a data subdirectory
+            os.path.join(_PARENT_DIR, "resources", file_name),  # In a resources subdirectory
+            os.path.join(_PARENT_DIR, "assets", file_name)  # In an assets subdirectory
         ]
     
-    def get_all_categories(self) -> Dict[str, List[str]]:
+    def get_all_categories(self) -> Mapping[str, Tuple[str, ...]]:
         """
         Get all error categories.
         
         Returns:
-            Dictionary with 'build' and 'checkstyle' categories
+            Read-only mapping with 'build' and 'checkstyle' category tuples
         """
-        return {
-            "build": self.build_categories,
-            "checkstyle": self.checkstyle_categories
-        }
+        if self._all_categories is None:
+            self._all_categories = MappingProxyType({
+                "build": self.build_categories,
+                "checkstyle": self.checkstyle_categories
+            })
+        return self._all_categories
     
     def get_category_errors(self, category_type: str, category_name: str) -> List[Dict[str, str]]:
         """
@@ -160,10 +555,10 @@ class JsonErrorRepository:
         Returns:
             List of error dictionaries for the category
         """
-        if category_type == "build" and category_name in self.build_errors:
-            return self.build_errors[category_name]
-        elif category_type == "checkstyle" and category_name in self.checkstyle_errors:
-            return self.checkstyle_errors[category_name]
+        if category_type == "build":
+            return self.build_errors.get(category_name) or []
+        elif category_type == "checkstyle":
+            return self.checkstyle_errors.get(category_name) or []
         return []
     
     def get_errors_by_categories(self, selected_categories: Dict[str, List[str]]) -> Dict[str, List[Dict[str, str]]]:
@@ -183,16 +578,22 @@ class JsonErrorRepository:
         }
         
         # Get build errors
-        if "build" in selected_categories:
-            for category in selected_categories["build"]:
-                if category in self.build_errors:
-                    selected_errors["build"].extend(self.build_errors[category])
+        build_categories = selected_categories.get("build")
+        if build_categories:
+            build_errors = self.build_errors
+            for category in build_categories:
+                category_errors = build_errors.get(category)
+                if category_errors:
+                    selected_errors["build"].extend(category_errors)
         
         # Get code quality errors
-        if "checkstyle" in selected_categories:
-            for category in selected_categories["checkstyle"]:
-                if category in self.checkstyle_errors:
-                    selected_errors["checkstyle"].extend(self.checkstyle_errors[category])
+        checkstyle_categories = selected_categories.get("checkstyle")
+        if checkstyle_categories:
+            checkstyle_errors = self.checkstyle_errors
+            for category in checkstyle_categories:
+                category_errors = checkstyle_errors.get(category)
+                if category_errors:
+                    selected_errors["checkstyle"].extend(category_errors)
         
         return selected_errors
     
@@ -207,17 +608,8 @@ class JsonErrorRepository:
         Returns:
             Error details dictionary or None if not found
         """
-        if error_type == "build":
-            for category in self.build_errors:
-                for error in self.build_errors[category]:
-                    if error.get("error_name") == error_name:
-                        return error
-        elif error_type == "checkstyle":
-            for category in self.checkstyle_errors:
-                for error in self.checkstyle_errors[category]:
-                    if error.get("check_name") == error_name:
-                        return error
-        return None
+        entry = self._lookup(error_type, error_name)
+        return entry[1] if entry else None
     
     def get_random_errors_by_categories(self, selected_categories: Dict[str, List[str]], 
                                   count: int = 4) -> List[Dict[str, Any]]:
@@ -235,41 +627,23 @@ class JsonErrorRepository:
         all_errors = []
         build_categories = selected_categories.get("build", [])
         checkstyle_categories = selected_categories.get("checkstyle", [])
+        if build_categories:
+            self._ensure_build_loaded()
+        if checkstyle_categories:
+            self._ensure_checkstyle_loaded()
         
         # Build errors
         for category in build_categories:
-            if category in self.build_errors:
-                for error in self.build_errors[category]:
-                    all_errors.append({
-                        "type": "build",
-                        "category": category,
-                        "name": error["error_name"],
-                        "description": error["description"],
-                        "implementation_guide": error.get("implementation_guide", "")
-                    })
+            all_errors.extend(self._build_flat.get(category, ()))
         
         # code quality errors
         for category in checkstyle_categories:
-            if category in self.checkstyle_errors:
-                for error in self.checkstyle_errors[category]:
-                    all_errors.append({
-                        "type": "checkstyle",
-                        "category": category,
-                        "name": error["check_name"],
-                        "description": error["description"],
-                        "implementation_guide": error.get("implementation_guide", "")
-                    })
-        
-        # Select random errors
-        if all_errors:
-            # If we have fewer errors than requested, return all
-            if len(all_errors) <= count:
-                return all_errors
-            
-            # Otherwise select random errors
-            return random.sample(all_errors, count)
+            all_errors.extend(self._checkstyle_flat.get(category, ()))
         
-        return []
+        # Select random errors; only the selected records are copied
+        if len(all_errors) > count:
+            all_errors = self._rng.sample(all_errors, count)
+        return [error._asdict() for error in all_errors]
     
     def get_errors_for_llm(self, 
                  selected_categories: Dict[str, List[str]] = None, 
@@ -297,15 +671,15 @@ class JsonErrorRepository:
         }
         adjusted_count = error_counts.get(difficulty.lower(), count)
         
-        # Enhanced debugging
-        print("\n========== GET_ERRORS_FOR_LLM ==========")
-        print(f"Difficulty: {difficulty}")
-        print(f"Original count: {count}, Adjusted count: {adjusted_count}")
+        # Debug output is only formatted when it will be emitted
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug(f"get_errors_for_llm: difficulty {difficulty}, count {count}, adjusted count {adjusted_count}")
         
         # If specific errors are provided, use those
         if specific_errors and len(specific_errors) > 0:
-            print("Selection Method: Using specific errors")
-            print(f"Number of specific errors: {len(specific_errors)}")
+            if debug:
+                logger.debug(f"Selection method: {len(specific_errors)} specific errors")
             
             # Format problem descriptions
             problem_descriptions = []
@@ -325,34 +699,30 @@ class JsonErrorRepository:
                     processed_error["implementation_guide"] = implementation_guide
                 
                 # Create problem description
-                if error_type.lower() == "build":
-                    problem_descriptions.append(f"Build Error - {name}: {description} (Category: {category})")
-                else:  # checkstyle
-                    problem_descriptions.append(f"Checkstyle Error - {name}: {description} (Category: {category})")
+                prefix = _BUILD_PROBLEM_PREFIX if error_type.lower() == "build" else _CHECKSTYLE_PROBLEM_PREFIX
+                problem_descriptions.append(f"{prefix}{name}: {description} (Category: {category})")
                 
                 selected_errors.append(processed_error)
             
             # If we don't have exactly the adjusted count, log a notice but proceed
             if len(selected_errors) != adjusted_count:
-                print(f"Note: Using {len(selected_errors)} specific errors instead of adjusted count {adjusted_count}")
+                if debug:
+                    logger.debug(f"Using {len(selected_errors)} specific errors instead of adjusted count {adjusted_count}")
             
             return selected_errors, problem_descriptions
         
         # Otherwise use category-based selection
         elif selected_categories:
-            print("Selection Method: Using category-based selection")
-            print(f"Selected Categories: {selected_categories}")
+            if debug:
+                logger.debug(f"Selection method: categories {selected_categories}")
             
             # Check if any categories are actually selected
             build_categories = selected_categories.get("build", [])
             checkstyle_categories = selected_categories.get("checkstyle", [])
             
-            print(f"Build Categories: {build_categories}")
-            print(f"Checkstyle Categories: {checkstyle_categories}")
-            
             if not build_categories and not checkstyle_categories:
                 # Use default categories if none specified
-                print("WARNING: No categories specified, using defaults")
+                logger.warning("No categories specified, using defaults")
                 selected_categories = {
                     "build": ["CompileTimeErrors", "RuntimeErrors", "LogicalErrors"],
                     "checkstyle": ["NamingConventionChecks", "WhitespaceAndFormattingChecks"]
@@ -360,74 +730,59 @@ class JsonErrorRepository:
             
             # Collect errors from each selected category
             all_errors = []
+            if selected_categories.get("build"):
+                self._ensure_build_loaded()
+            if selected_categories.get("checkstyle"):
+                self._ensure_checkstyle_loaded()
+            
+            # Selected categories holding errors, build errors first
+            pools = [
+                (error_type, category, records)
+                for error_type, flat in (("build", self._build_flat), ("checkstyle", self._checkstyle_flat))
+                for category in selected_categories.get(error_type, [])
+                for records in (flat.get(category),)
+                if records
+            ]
             
-            # Build errors - randomly select from each category
-            for category in selected_categories.get("build", []):
-                if category in self.build_errors:
-                    category_errors = self.build_errors[category]
-                    # For each selected category, randomly select 1-2 errors
-                    num_to_select = min(len(category_errors), random.randint(1, 2))
-                    if num_to_select > 0:
-                        selected_from_category = random.sample(category_errors, num_to_select)
-                        print(f"Selected {num_to_select} errors from build category '{category}'")
-                        for error in selected_from_category:
-                            all_errors.append({
-                                "type": "build",
-                                "category": category,
-                                "name": error["error_name"],
-                                "description": error["description"],
-                                "implementation_guide": error.get("implementation_guide", "")
-                            })
-            
-            # code quality errors - randomly select from each category
-            for category in selected_categories.get("checkstyle", []):
-                if category in self.checkstyle_errors:
-                    category_errors = self.checkstyle_errors[category]
-                    # For each selected category, randomly select 1-2 errors
-                    num_to_select = min(len(category_errors), random.randint(1, 2))
-                    if num_to_select > 0:
-                        selected_from_category = random.sample(category_errors, num_to_select)
-                        print(f"Selected {num_to_select} errors from checkstyle category '{category}'")
-                        for error in selected_from_category:
-                            all_errors.append({
-                                "type": "checkstyle",
-                                "category": category,
-                                "name": error["check_name"],
-                                "description": error["description"],
-                                "implementation_guide": error.get("implementation_guide", "")
-                            })
+            if pools:
+                # Randomly select 1-2 errors from each category, drawing the counts and
+                # the random keys for all categories at once; the errors with the
+                # smallest keys in a category are a sample without replacement
+                sizes = np.fromiter((len(records) for _, _, records in pools), dtype=np.intp, count=len(pools))
+                quotas = np.minimum(sizes, self._np_rng.integers(1, 3, size=len(pools)))
+                keys = self._np_rng.random(int(sizes.sum()))
+                offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+                for (error_type, category, records), offset, size, quota in zip(pools, offsets, sizes, quotas):
+                    picked = np.argpartition(keys[offset:offset + size], quota - 1)[:quota]
+                    if debug:
+                        logger.debug(f"Selected {quota} errors from {error_type} category '{category}'")
+                    all_errors.extend(records[i] for i in picked)
             
             # If we have more errors than needed, randomly select the required number
             if len(all_errors) > adjusted_count:
-                print(f"Too many errors ({len(all_errors)}), selecting {adjusted_count} randomly")
-                selected_errors = random.sample(all_errors, adjusted_count)
+                if debug:
+                    logger.debug(f"Too many errors ({len(all_errors)}), selecting {adjusted_count} randomly")
+                picked = self._np_rng.choice(len(all_errors), size=adjusted_count, replace=False)
+                selected_records = [all_errors[i] for i in picked]
             else:
-                print(f"Using all {len(all_errors)} errors from categories")
-                selected_errors = all_errors
+                if debug:
+                    logger.debug(f"Using all {len(all_errors)} errors from categories")
+                selected_records = all_errors
             
-            # Format problem descriptions
+            # Convert the selected errors and format their problem descriptions in one pass
+            selected_errors = []
             problem_descriptions = []
-            for error in selected_errors:
-                error_type = error.get("type", "Unknown")
-                name = error.get("name", "Unknown")
-                description = error.get("description", "")
-                category = error.get("category", "")
-                
-                if error_type.lower() == "build":
-                    problem_descriptions.append(f"Build Error - {name}: {description} (Category: {category})")
-                else:  # checkstyle
-                    problem_descriptions.append(f"Checkstyle Error - {name}: {description} (Category: {category})")
-            
-            # Print final selected errors
-            print("\n--- FINAL SELECTED ERRORS ---")
-            for i, error in enumerate(selected_errors, 1):
-                print(f"  {i}. {error.get('type', 'Unknown')} - {error.get('name', 'Unknown')} ({error.get('category', 'Unknown')})")
-            print("======================================")
+            for i, error in enumerate(selected_records, 1):
+                prefix = _BUILD_PROBLEM_PREFIX if error.type == "build" else _CHECKSTYLE_PROBLEM_PREFIX
+                problem_descriptions.append(f"{prefix}{error.name}: {error.description} (Category: {error.category})")
+                selected_errors.append(error._asdict())
+                if debug:
+                    logger.debug(f"Selected error {i}: {error.type} - {error.name} ({error.category})")
             
             return selected_errors, problem_descriptions
         
         # If no selection method was provided, return empty lists
-        print("WARNING: No selection method provided, returning empty error list")
+        logger.warning("No selection method provided, returning empty error list")
         return [], []
     
     def _get_implementation_guide(self, error_type: str, error_name: str, category: str) -> Optional[str]:
@@ -442,16 +797,9 @@ class JsonErrorRepository:
         Returns:
             Implementation guide string or None if not found
         """
-        if error_type == "build":
-            if category in self.build_errors:
-                for error in self.build_errors[category]:
-                    if error.get("error_name") == error_name:
-                        return error.get("implementation_guide")
-        elif error_type == "checkstyle":
-            if category in self.checkstyle_errors:
-                for error in self.checkstyle_errors[category]:
-                    if error.get("check_name") == error_name:
-                        return error.get("implementation_guide")
+        entry = self._lookup(error_type, error_name)
+        if entry and entry[0] == category:
+            return entry[1]["implementation_guide"]
         return None
 
     def search_errors(self, search_term: str) -> List[Dict[str, Any]]:
@@ -464,38 +812,79 @@ class JsonErrorRepository:
         Returns:
             List of matching errors with type and category information
         """
-        results = []
         search_term = search_term.lower()
+        self._ensure_build_loaded()
+        self._ensure_checkstyle_loaded()
         
-        # Search build errors
-        for category in self.build_errors:
-            for error in self.build_errors[category]:
-                name = error.get("error_name", "").lower()
-                description = error.get("description", "").lower()
-                
-                if search_term in name or search_term in description:
-                    results.append({
-                        "type": "build",
-                        "category": category,
-                        "name": error["error_name"],
-                        "description": error["description"]
-                    })
-        
-        # Search code quality errors
-        for category in self.checkstyle_errors:
-            for error in self.checkstyle_errors[category]:
-                name = error.get("check_name", "").lower()
-                description = error.get("description", "").lower()
-                
-                if search_term in name or search_term in description:
-                    results.append({
-                        "type": "checkstyle",
-                        "category": category,
-                        "name": error["check_name"],
-                        "description": error["description"]
-                    })
+        if search_term and len(self._build_search) + len(self._checkstyle_search) >= ARROW_SEARCH_MIN_ERRORS:
+            results = self._arrow_search(search_term)
+            if results is not None:
+                return results
+        
+        # Search build errors, then code quality errors
+        return [
+            dict(result)
+            for entries in (self._build_search, self._checkstyle_search)
+            for name, description, result in entries
+            if search_term in name or search_term in description
+        ]
+    
+    def _arrow_search(self, search_term: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Search the lowercase name and description columns with pyarrow kernels.
+        
+        Args:
+            search_term: Lowercase term to search for
+            
+        Returns:
+            List of matching errors, or None if pyarrow is not installed
+        """
+        modules = _pyarrow_modules()
+        if modules is None:
+            return None
+        pa, pc = modules
+        
+        if self._search_arrays is None:
+            entries = self._build_search + self._checkstyle_search
+            self._search_arrays = (
+                pa.array([name for name, _, _ in entries], type=pa.string()),
+                pa.array([description for _, description, _ in entries], type=pa.string()),
+                [result for _, _, result in entries]
+            )
+        names, descriptions, results = self._search_arrays
+        
+        mask = pc.or_(pc.match_substring(names, search_term), pc.match_substring(descriptions, search_term))
+        return [dict(results[i]) for i in pc.indices_nonzero(mask).to_pylist()]
+    
+    def search_errors_any(self, search_terms: Iterable[str]) -> List[Dict[str, Any]]:
+        """
+        Search for errors containing any of several search terms.
+        
+        All terms are matched in a single pass over each error instead of
+        one pass per term.
         
-        return results
+        Args:
+            search_terms: Terms to search for in error names and descriptions
+            
+        Returns:
+            List of matching errors with type and category information
+        """
+        terms = tuple(sorted({term.lower() for term in search_terms}))
+        if not terms:
+            return []
+        if "" in terms:
+            # An empty term matches everything, as in search_errors
+            return self.search_errors("")
+        
+        matches = _term_matcher(terms)
+        self._ensure_build_loaded()
+        self._ensure_checkstyle_loaded()
+        return [
+            dict(result)
+            for entries in (self._build_search, self._checkstyle_search)
+            for name, description, result in entries
+            if matches(name) or matches(description)
+        ]
     
     def get_error_by_name(self, error_type: str, error_name: str) -> Optional[Dict[str, Any]]:
         """
@@ -508,24 +897,32 @@ class JsonErrorRepository:
         Returns:
             Error dictionary with added type and category, or None if not found
         """
-        if error_type == "build":
-            for category, errors in self.build_errors.items():
-                for error in errors:
-                    if error.get("error_name") == error_name:
-                        return {
-                            "type": "build",
-                            "category": category,
-                            "name": error["error_name"],
-                            "description": error["description"]
-                        }
-        elif error_type == "checkstyle":
-            for category, errors in self.checkstyle_errors.items():
-                for error in errors:
-                    if error.get("check_name") == error_name:
-                        return {
-                            "type": "checkstyle",
-                            "category": category,
-                            "name": error["check_name"],
-                            "description": error["description"]
-                        }
-        return None
\ No newline at end of file
+        entry = self._lookup(error_type, error_name)
+        if entry is None:
+            return None
+        category, error = entry
+        return {
+            "type": error_type,
+            "category": category,
+            "name": error_name,
+            "description": error["description"]
+        }
+
+
+@lru_cache(maxsize=4)
+def get_repository(build_errors_path: str = "build_errors.json",
+                   checkstyle_errors_path: str = "checkstyle_error.json") -> JsonErrorRepository:
+    """
+    Get the shared error repository for a pair of error files.
+    
+    The files are read and parsed once per process; later calls return the
+    same instance, which callers must treat as read-only.
+    
+    Args:
+        build_errors_path: Path to the build errors JSON file
+        checkstyle_errors_path: Path to the code quality errors JSON file
+        
+    Returns:
+        JsonErrorRepository instance
+    """
+    return JsonErrorRepository(build_errors_path, checkstyle_errors_path)
@@ -7,22 +7,52 @@ by leveraging the modular components from the workflow package.
 
 __all__ = ['JavaCodeReviewGraph']
 
+import os
+import copy
 import logging
+import threading
 from typing import Dict, List, Any, Optional
 
 from state_schema import WorkflowState
+from utils.code_utils import CODE_GENERATION_PROMPT_PREFIX
+from utils.llm_cache import (
+    CACHE_TTL, CacheBackend, InMemoryCache, SQLiteCache, TieredCache,
+    SemanticReviewCache, make_cache_key
+)
 
 # Import workflow components
 from workflow.manager import WorkflowManager
 from workflow.conditions import WorkflowConditions
+from data.json_error_repository import JsonErrorRepository, get_repository
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-
+# Library module: the application configures logging handlers
 logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# Directory of the persistent LLM cache; set to an empty string to disable it
+CACHE_DIR = os.getenv("LLM_CACHE_DIR", ".peer_review_cache")
+
+# Reuse the analysis of a similar (not identical) review of the same code.
+# Off by default: embeddings barely separate reviews that differ in one detail,
+# such as a line number or a negated claim, so a hit may grade the wrong review.
+SEMANTIC_REVIEW_CACHE = os.getenv("SEMANTIC_REVIEW_CACHE", "false").lower() == "true"
+
+
+def _create_cache(namespace: str, ttl: Optional[float] = CACHE_TTL) -> CacheBackend:
+    """
+    Create an in-memory cache backed by the persistent cache if enabled.
+    
+    Args:
+        namespace: Namespace of the cached outputs
+        ttl: Seconds entries stay valid, or None for no expiry
+        
+    Returns:
+        Cache backend
+    """
+    if not CACHE_DIR:
+        return InMemoryCache(ttl=ttl)
+    return TieredCache(InMemoryCache(ttl=ttl), SQLiteCache(CACHE_DIR, namespace=namespace, ttl=ttl))
+
 
 class JavaCodeReviewGraph:
     """
@@ -33,24 +63,112 @@ class JavaCodeReviewGraph:
     delegating actual implementation to the workflow package components.
     """
     
+    __slots__ = (
+        'llm_manager', 'conditions', '_wm', '_error_repository',
+        '_review_cache', '_analysis_cache', '_categories_cache',
+        '_generate', '_regenerate', '_evaluate', '_review', '_analyze',
+        '_cond_regen', '_cond_cont'
+    )
+    
+    # Static code generation prompt prefix, exposed so callers can check prompt caching
+    cacheable_prefix = CODE_GENERATION_PROMPT_PREFIX
+    
+    # Caches shared by all sessions
+    _shared_analysis_cache = _create_cache("review_analysis")
+    _shared_review_cache = SemanticReviewCache(
+        threshold=float(os.getenv("REVIEW_CACHE_THRESHOLD", "0.93"))
+    ) if SEMANTIC_REVIEW_CACHE else None
+    
+    # Workflow managers shared by all facades whose LLM settings are equal
+    _wm_registry: Dict[str, WorkflowManager] = {}
+    _wm_registry_lock = threading.Lock()
+    
     def __init__(self, llm_manager=None):
         """
-        Initialize the graph with domain components.
+        Initialize the graph facade.
+        
+        The workflow manager (LLM clients, domain objects and graph) is
+        only constructed when a workflow node is first used.
         
         Args:
             llm_manager: Optional LLMManager for managing language models
         """
-        # Initialize the workflow manager with LLM manager
         self.llm_manager = llm_manager
-        self.workflow_manager = WorkflowManager(llm_manager)
+        self._wm: Optional[WorkflowManager] = None
+        self._error_repository: Optional[JsonErrorRepository] = None
         
-        # Set up references to workflow components for backward compatibility
-        self.workflow = self.workflow_manager.workflow
-        self.error_repository = self.workflow_manager.error_repository
+        # Node callables, bound by workflow_manager when it builds the manager
+        self._generate = self._regenerate = self._evaluate = self._review = self._analyze = None
         
-        # Get references to workflow nodes and conditions
-        self.workflow_nodes = self.workflow_manager.workflow_nodes
+        # Conditions are stateless, so bind them right away
         self.conditions = WorkflowConditions()
+        self._cond_regen = self.conditions.should_regenerate_or_review
+        self._cond_cont = self.conditions.should_continue_review
+        
+        # Error categories are fixed for the process lifetime
+        self._categories_cache: Optional[Dict[str, tuple]] = None
+        
+        # Cache of review analyses matched by similarity of the review text, if enabled
+        self._review_cache: Optional[SemanticReviewCache] = JavaCodeReviewGraph._shared_review_cache
+        
+        # Exact-match analyses that survive restarts
+        self._analysis_cache = JavaCodeReviewGraph._shared_analysis_cache
+    
+    @property
+    def workflow_manager(self) -> WorkflowManager:
+        """Workflow manager, constructed on first access."""
+        if self._wm is None:
+            self._wm = self._shared_workflow_manager()
+            
+            # Bind delegated callables once instead of resolving them per call
+            wn = self._wm.workflow_nodes
+            self._generate = wn.generate_code_node
+            self._regenerate = wn.regenerate_code_node
+            self._evaluate = wn.evaluate_code_node
+            self._review = wn.review_code_node
+            self._analyze = wn.analyze_review_node
+        return self._wm
+    
+    def _shared_workflow_manager(self) -> WorkflowManager:
+        """
+        Get the workflow manager registered for these LLM settings, creating it if needed.
+        
+        The app creates a new LLMManager on every rerun, so managers are keyed
+        by provider and model settings rather than by object. A manager whose
+        connection check failed is replaced, so the no-LLM fallback is retried.
+        
+        Returns:
+            Shared workflow manager
+        """
+        config_key = getattr(self.llm_manager, "config_key", None)
+        if config_key is None:
+            return WorkflowManager(self.llm_manager, error_repository=self.error_repository)
+        key = config_key()
+        with JavaCodeReviewGraph._wm_registry_lock:
+            wm = JavaCodeReviewGraph._wm_registry.get(key)
+            if wm is None or wm.llm_unavailable:
+                wm = WorkflowManager(self.llm_manager, error_repository=self.error_repository)
+                JavaCodeReviewGraph._wm_registry[key] = wm
+            elif self._error_repository is None:
+                self._error_repository = wm.error_repository
+        return wm
+    
+    @property
+    def workflow(self):
+        """LangGraph workflow built by the workflow manager."""
+        return self.workflow_manager.workflow
+    
+    @property
+    def workflow_nodes(self):
+        """Workflow node implementations."""
+        return self.workflow_manager.workflow_nodes
+    
+    @property
+    def error_repository(self) -> JsonErrorRepository:
+        """Error repository, loaded on first access without touching the LLMs."""
+        if self._error_repository is None:
+            self._error_repository = get_repository()
+        return self._error_repository
     
     def generate_code_node(self, state: WorkflowState) -> WorkflowState:
         """
@@ -62,8 +180,9 @@ class JavaCodeReviewGraph:
         Returns:
             Updated workflow state with generated code
         """
-        # Delegate to workflow nodes implementation
-        return self.workflow_nodes.generate_code_node(state)
+        # Delegate to workflow nodes implementation, bound when the manager is built
+        self.workflow_manager
+        return self._generate(state)
     
     def regenerate_code_node(self, state: WorkflowState) -> WorkflowState:
         """
@@ -75,8 +194,9 @@ class JavaCodeReviewGraph:
         Returns:
             Updated workflow state with regenerated code
         """
-        # Delegate to workflow nodes implementation
-        return self.workflow_nodes.regenerate_code_node(state)
+        # Delegate to workflow nodes implementation, bound when the manager is built
+        self.workflow_manager
+        return self._regenerate(state)
     
     def evaluate_code_node(self, state: WorkflowState) -> WorkflowState:
         """
@@ -88,8 +208,22 @@ class JavaCodeReviewGraph:
         Returns:
             Updated workflow state with evaluation results
         """
+        # Delegate to workflow nodes implementation, bound when the manager is built
+        self.workflow_manager
+        return self._evaluate(state)
+    
+    def evaluate_and_maybe_regenerate_node(self, state: WorkflowState) -> WorkflowState:
+        """
+        Evaluate code and, if errors are missing, apply corrected code from the same LLM call.
+        
+        Args:
+            state: Current workflow state
+            
+        Returns:
+            Updated workflow state with evaluation results and possibly corrected code
+        """
         # Delegate to workflow nodes implementation
-        return self.workflow_nodes.evaluate_code_node(state)
+        return self.workflow_nodes.evaluate_and_regenerate_node(state)
     
     def review_code_node(self, state: WorkflowState) -> WorkflowState:
         """
@@ -101,8 +235,9 @@ class JavaCodeReviewGraph:
         Returns:
             Updated workflow state
         """
-        # Delegate to workflow nodes implementation
-        return self.workflow_nodes.review_code_node(state)
+        # Delegate to workflow nodes implementation, bound when the manager is built
+        self.workflow_manager
+        return self._review(state)
     
     def analyze_review_node(self, state: WorkflowState) -> WorkflowState:
         """
@@ -114,8 +249,85 @@ class JavaCodeReviewGraph:
         Returns:
             Updated workflow state with review analysis
         """
-        # Delegate to workflow nodes implementation
-        return self.workflow_nodes.analyze_review_node(state)
+        # Delegate to workflow nodes implementation, bound when the manager is built
+        self.workflow_manager
+        return self._analyze(state)
+    
+    async def agenerate_code_node(self, state: WorkflowState) -> WorkflowState:
+        """
+        Asynchronously generate Java code with errors node.
+        
+        Args:
+            state: Current workflow state
+            
+        Returns:
+            Updated workflow state with generated code
+        """
+        return await self.workflow_nodes.agenerate_code_node(state)
+    
+    async def aregenerate_code_node(self, state: WorkflowState) -> WorkflowState:
+        """
+        Asynchronously regenerate code based on evaluation feedback.
+        
+        Args:
+            state: Current workflow state
+            
+        Returns:
+            Updated workflow state with regenerated code
+        """
+        return await self.workflow_nodes.aregenerate_code_node(state)
+    
+    async def aevaluate_code_node(self, state: WorkflowState) -> WorkflowState:
+        """
+        Asynchronously evaluate generated code to ensure it contains the requested errors.
+        
+        Args:
+            state: Current workflow state
+            
+        Returns:
+            Updated workflow state with evaluation results
+        """
+        return await self.workflow_nodes.aevaluate_code_node(state)
+    
+    async def aanalyze_review_node(self, state: WorkflowState) -> WorkflowState:
+        """
+        Asynchronously analyze student review node.
+        
+        Args:
+            state: Current workflow state
+            
+        Returns:
+            Updated workflow state with review analysis
+        """
+        return await self.workflow_nodes.aanalyze_review_node(state)
+    
+    async def arun(self, state: WorkflowState) -> WorkflowState:
+        """
+        Generate and evaluate code until it is ready for review, without blocking the event loop.
+        
+        Follows the generate -> evaluate -> regenerate edges of the graph, so
+        sessions of several students run concurrently on one event loop.
+        
+        Args:
+            state: Current workflow state
+            
+        Returns:
+            Workflow state ready for the student's review
+        """
+        state = await self.agenerate_code_node(state)
+        if state.error:
+            return state
+        
+        state = await self.aevaluate_code_node(state)
+        while not state.error and self._cond_regen(state) == "regenerate_code":
+            state = await self.aregenerate_code_node(state)
+            if state.error:
+                break
+            state = await self.aevaluate_code_node(state)
+        
+        if not state.error:
+            state = self.review_code_node(state)
+        return state
     
     def should_regenerate_or_review(self, state: WorkflowState) -> str:
         """
@@ -128,7 +340,7 @@ class JavaCodeReviewGraph:
             Next step name
         """
         # Delegate to workflow conditions implementation
-        return self.conditions.should_regenerate_or_review(state)
+        return self._cond_regen(state)
     
     def should_continue_review(self, state: WorkflowState) -> str:
         """
@@ -141,7 +353,7 @@ class JavaCodeReviewGraph:
             Next step name
         """
         # Delegate to workflow conditions implementation
-        return self.conditions.should_continue_review(state)
+        return self._cond_cont(state)
     
     def get_all_error_categories(self) -> Dict[str, List[str]]:
         """
@@ -150,8 +362,41 @@ class JavaCodeReviewGraph:
         Returns:
             Dictionary with 'build' and 'checkstyle' categories
         """
-        # Delegate to error repository - use the correct method name
-        return self.error_repository.get_all_categories()
+        if self._categories_cache is None:
+            # Delegate to error repository - use the correct method name
+            categories = self.error_repository.get_all_categories()
+            self._categories_cache = {
+                error_type: tuple(names) for error_type, names in categories.items()
+            }
+        
+        # Hand out fresh lists so callers cannot mutate the cache
+        return {error_type: list(names) for error_type, names in self._categories_cache.items()}
+    
+    def purge_cache(self, older_than_days: int) -> int:
+        """
+        Delete cached review analyses older than the given age.
+        
+        Args:
+            older_than_days: Minimum age in days of the entries to delete
+            
+        Returns:
+            Number of deleted persistent entries
+        """
+        older_than_seconds = older_than_days * 86400
+        deleted = 0
+        purge = getattr(self._analysis_cache, "purge", None)
+        if purge:
+            deleted = purge(older_than_seconds)
+        else:
+            self._analysis_cache.clear()
+        if self._review_cache is not None:
+            self._review_cache.clear()
+        logger.info(f"Purged {deleted} cached results older than {older_than_days} days")
+        return deleted
+    
+    def invalidate_categories(self) -> None:
+        """Drop the cached error categories so they are re-read on next access."""
+        self._categories_cache = None
     
     def submit_review(self, state: WorkflowState, student_review: str) -> WorkflowState:
         """
@@ -164,5 +409,45 @@ class JavaCodeReviewGraph:
         Returns:
             Updated workflow state with analysis
         """
+        context_hash = self._review_context_hash(state)
+        if context_hash:
+            analysis_key = make_cache_key({"context": context_hash, "review": student_review.strip()})
+            cached = self._analysis_cache.get(analysis_key)
+            if cached is None and self._review_cache is not None:
+                cached = self._review_cache.lookup(student_review, context_hash)
+            if cached is not None:
+                logger.info("Using cached analysis of the review")
+                return self.workflow_manager.submit_review(
+                    state, student_review, analysis=copy.deepcopy(cached)
+                )
+        
         # Delegate to workflow manager implementation
-        return self.workflow_manager.submit_review(state, student_review)
\ No newline at end of file
+        updated_state = self.workflow_manager.submit_review(state, student_review)
+        
+        # Only cache analyses that actually came back from the LLM
+        analysis = updated_state.latest_review.analysis if updated_state.latest_review else None
+        if context_hash and analysis and (analysis.get("identified_problems") or analysis.get("false_positives")):
+            if self._review_cache is not None:
+                self._review_cache.insert(student_review, context_hash, copy.deepcopy(analysis))
+            self._analysis_cache.set(analysis_key, copy.deepcopy(analysis))
+        
+        return updated_state
+    
+    def _review_context_hash(self, state: WorkflowState) -> Optional[str]:
+        """
+        Build the hash identifying what a review is analyzed against.
+        
+        Args:
+            state: Current workflow state
+            
+        Returns:
+            Hash of the code and known problems, or None if there is no code
+        """
+        if not state.code_snippet:
+            return None
+        evaluation_result = state.evaluation_result or {}
+        return make_cache_key({
+            "code": state.code_snippet.code,
+            "known_problems": evaluation_result.get("found_errors", []),
+            "original_error_count": state.original_error_count
+        })
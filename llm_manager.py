@@ -6,6 +6,7 @@ configuration, and management of LLM providers including Ollama and Groq.
 """
 
 import os
+import hashlib
 import requests
 import logging
 from typing import Dict, Any, Optional, Tuple
@@ -21,12 +22,11 @@ GROQ_AVAILABLE = True
 
 from langchain_core.language_models import BaseLanguageModel
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+from utils.llm_pool import LLMPool
+
+# Library module: the application configures logging handlers
 logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
 
 class LLMManager:
     """
@@ -134,6 +134,23 @@ class LLMManager:
         logger.info(f"Successfully switched to {self.provider} provider")
         return True    
     
+    def config_key(self) -> str:
+        """
+        Fingerprint of the settings the role models are created from.
+        
+        Managers with equal keys create equivalent models, so objects built
+        from them can be shared.
+        
+        Returns:
+            Hex digest of the provider, endpoint, credentials and role model settings
+        """
+        settings = [self.provider, self.ollama_base_url, self.default_model, self.groq_api_base,
+                    self.groq_default_model, self.groq_api_key, str(self.force_gpu), str(self.gpu_layers)]
+        for role in ("GENERATIVE", "REVIEW", "SUMMARY"):
+            for key in (f"{role}_MODEL", f"GROQ_{role}_MODEL", f"{role}_TEMPERATURE", f"{role}_MODEL_POOL"):
+                settings.append(os.getenv(key, ""))
+        return hashlib.sha256("\0".join(settings).encode("utf-8")).hexdigest()
+    
     def _format_size(self, size_in_bytes: int) -> str:
         """Format size in human-readable format."""
         if not isinstance(size_in_bytes, (int, float)):
@@ -356,13 +373,16 @@ class LLMManager:
                     if gpu_layers > 0:
                         ollama_params["num_gpu"] = gpu_layers
             
+            # A pooled deployment may point at its own Ollama server
+            base_url = ollama_params.pop("base_url", self.ollama_base_url)
+            
             # Log the parameters being used
             logger.info(f"Initializing model {model_name} with params: {ollama_params}")
             
             # Create the Ollama model 
             try:
                 llm = Ollama(
-                    base_url=self.ollama_base_url,
+                    base_url=base_url,
                     model=model_name,
                     temperature=temperature,
                     **ollama_params
@@ -371,7 +391,7 @@ class LLMManager:
                 # If the above fails due to unexpected parameters, try with minimal params
                 logger.warning(f"Error with full params: {str(e)}, trying minimal params")
                 llm = Ollama(
-                    base_url=self.ollama_base_url,
+                    base_url=base_url,
                     model=model_name,
                     temperature=temperature
                 )
@@ -469,10 +489,55 @@ class LLMManager:
                 else:
                     logger.warning("GPU not available, using CPU for inference")
         
+        # Several deployments of the role's model can be pooled for load balancing
+        pool_spec = os.getenv(f"{model_key}_POOL", "")
+        if pool_spec:
+            return self._initialize_model_pool(pool_spec, model_name, model_params)
+        
         # Initialize the model with the provider-specific settings
         logger.info(f"Initializing model {model_name} with params: {model_params}")
         return self.initialize_model(model_name, model_params)
     
+    def _initialize_model_pool(self, pool_spec: str, default_model: str,
+                               model_params: Dict[str, Any]) -> Optional[BaseLanguageModel]:
+        """
+        Initialize several deployments of a model and route between them.
+        
+        Args:
+            pool_spec: Comma-separated entries of the form "model" or, for
+                       Ollama, "model@base_url"; an empty model name means
+                       the role's default model
+            default_model: Model name used for entries without one
+            model_params: Model parameters shared by all deployments
+            
+        Returns:
+            LLMPool over the deployments that initialized, the single model if
+            only one did, or None if none did
+        """
+        models = []
+        for entry in pool_spec.split(","):
+            entry = entry.strip()
+            if not entry:
+                continue
+            name, _, base_url = entry.partition("@")
+            params = dict(model_params)
+            if base_url:
+                params["base_url"] = base_url
+            logger.info(f"Initializing pooled model {name or default_model} at {base_url or 'default endpoint'}")
+            model = self.initialize_model(name or default_model, params)
+            if model:
+                models.append(model)
+        
+        if not models:
+            logger.error(f"No model in pool could be initialized: {pool_spec}")
+            return None
+        if len(models) == 1:
+            return models[0]
+        
+        strategy = os.getenv("LLM_POOL_STRATEGY", "least_busy").lower()
+        logger.info(f"Routing between {len(models)} model deployments ({strategy})")
+        return LLMPool(models, strategy=strategy)
+    
     def _get_groq_default_params(self, model_name: str) -> Dict[str, Any]:
         """
         Get default parameters for a Groq model.
@@ -16,6 +16,8 @@ class CodeSnippet(BaseModel):
     clean_code: str = Field("", description="The Java code snippet without annotations")
     raw_errors: Dict[str, List[Dict[str, Any]]] = Field(default_factory=dict, description="Raw error data organized by type")
     expected_error_count: int = Field(0, description="Number of errors originally requested for code generation")
+    flat_requested_errors: List[Dict[str, Any]] = Field(default_factory=list, description="Build and checkstyle errors of raw_errors as one list")
+    candidate_evaluation: Optional[Dict[str, Any]] = Field(None, description="Evaluation already made while choosing between generation candidates")
 
 class ReviewAttempt(BaseModel):
     """Schema for a student review attempt"""
@@ -56,6 +58,7 @@ class WorkflowState(BaseModel):
     
     # Review data
     review_history: List[ReviewAttempt] = Field(default_factory=list, description="History of review attempts")
+    latest_review: Optional[ReviewAttempt] = Field(None, description="Last entry of review_history (same object), updated on submission")
     current_iteration: int = Field(1, description="Current iteration number")
     max_iterations: int = Field(3, description="Maximum number of iterations")
     
@@ -202,8 +202,8 @@ class ErrorSelectorUI:
                 print(f"Build Category: {category}")
                 # Get sample errors from this category if available
                 try:
-                    from data.json_error_repository import JsonErrorRepository
-                    repo = JsonErrorRepository()
+                    from data.json_error_repository import get_repository
+                    repo = get_repository()
                     errors = repo.get_category_errors("build", category)
                     if errors:
                         print(f"  Sample errors (max 3):")
@@ -218,8 +218,8 @@ class ErrorSelectorUI:
                 print(f"Checkstyle Category: {category}")
                 # Get sample errors from this category if available
                 try:
-                    from data.json_error_repository import JsonErrorRepository
-                    repo = JsonErrorRepository()
+                    from data.json_error_repository import get_repository
+                    repo = get_repository()
                     errors = repo.get_category_errors("checkstyle", category)
                     if errors:
                         print(f"  Sample errors (max 3):")
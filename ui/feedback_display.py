@@ -6,8 +6,7 @@ This module provides the FeedbackDisplayUI class for displaying feedback on stud
 
 import streamlit as st
 import logging
-import pandas as pd
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from typing import List, Dict, Any, Optional, Tuple, Callable
 
 # Configure logging
@@ -17,6 +16,42 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@st.cache_resource(max_entries=32)
+def _build_performance_figure(iterations: Tuple[int, ...], identified_counts: Tuple[int, ...],
+                              accuracy_percentages: Tuple[float, ...]) -> Figure:
+    """
+    Draw the progress chart of the review iterations.
+    
+    Cached on the chart values, so reruns with unchanged reviews reuse the figure.
+    
+    Args:
+        iterations: Iteration numbers
+        identified_counts: Issues found in each iteration
+        accuracy_percentages: Accuracy of each iteration
+        
+    Returns:
+        Matplotlib figure with issues found and accuracy on two y-axes
+    """
+    # Figure is built without pyplot so cached figures are not kept open by its figure manager
+    fig = Figure(figsize=(10, 4))
+    ax1 = fig.subplots()
+    
+    color = 'tab:blue'
+    ax1.set_xlabel('Iteration')
+    ax1.set_ylabel('Issues Found', color=color)
+    ax1.plot(iterations, identified_counts, marker='o', color=color)
+    ax1.tick_params(axis='y', labelcolor=color)
+    ax1.grid(True, linestyle='--', alpha=0.7)
+    
+    ax2 = ax1.twinx()  # Create a second y-axis
+    color = 'tab:red'
+    ax2.set_ylabel('Accuracy (%)', color=color)
+    ax2.plot(iterations, accuracy_percentages, marker='s', color=color)
+    ax2.tick_params(axis='y', labelcolor=color)
+    
+    fig.tight_layout()
+    return fig
+
 class FeedbackDisplayUI:
     """
     UI Component for displaying feedback on student reviews.
@@ -186,34 +221,13 @@ class FeedbackDisplayUI:
                 review_accuracy = (review_identified / original_error_count * 100) if original_error_count > 0 else 0
                 accuracy_percentages.append(review_accuracy)
                     
-            # Create a DataFrame for the chart
-            chart_data = pd.DataFrame({
-                "Iteration": iterations,
-                "Issues Found": identified_counts,
-                "Accuracy (%)": accuracy_percentages
-            })
-            
             # Display the chart with two y-axes
             st.subheader("Progress Across Iterations")
             
-            # Using matplotlib for more control
-            fig, ax1 = plt.subplots(figsize=(10, 4))
-            
-            color = 'tab:blue'
-            ax1.set_xlabel('Iteration')
-            ax1.set_ylabel('Issues Found', color=color)
-            ax1.plot(chart_data["Iteration"], chart_data["Issues Found"], marker='o', color=color)
-            ax1.tick_params(axis='y', labelcolor=color)
-            ax1.grid(True, linestyle='--', alpha=0.7)
-            
-            ax2 = ax1.twinx()  # Create a second y-axis
-            color = 'tab:red'
-            ax2.set_ylabel('Accuracy (%)', color=color)
-            ax2.plot(chart_data["Iteration"], chart_data["Accuracy (%)"], marker='s', color=color)
-            ax2.tick_params(axis='y', labelcolor=color)
-            
-            fig.tight_layout()
-            st.pyplot(fig)
+            # Using matplotlib for more control; the figure is only redrawn when the values change
+            st.pyplot(_build_performance_figure(
+                tuple(iterations), tuple(identified_counts), tuple(accuracy_percentages)
+            ))
     
     def _render_identified_issues(self, review_analysis: Dict[str, Any]):
         """Render identified issues section"""
@@ -225,15 +239,15 @@ class FeedbackDisplayUI:
             
         st.subheader(f"Correctly Identified Issues ({len(identified_problems)})")
         
-        for i, issue in enumerate(identified_problems, 1):
-            st.markdown(
-                f"""
-                <div style="border-left: 4px solid #4CAF50; padding: 10px; margin: 10px 0; border-radius: 4px;">
-                <strong>✓ {i}. {issue}</strong>
-                </div>
-                """, 
-                unsafe_allow_html=True
-            )
+        # One markdown element for all issues instead of one per issue
+        st.markdown(
+            "\n".join(
+                f'<div style="border-left: 4px solid #4CAF50; padding: 10px; margin: 10px 0; border-radius: 4px;">'
+                f'<strong>✓ {i}. {issue}</strong></div>'
+                for i, issue in enumerate(identified_problems, 1)
+            ),
+            unsafe_allow_html=True
+        )
     
     def _render_missed_issues(self, review_analysis: Dict[str, Any]):
         """Render missed issues section"""
@@ -245,14 +259,14 @@ class FeedbackDisplayUI:
             
         st.subheader(f"Issues You Missed ({len(missed_problems)})")
         
-        for i, issue in enumerate(missed_problems, 1):
-            st.markdown(
-                f"""
-                <div style="border-left: 4px solid #f44336; padding: 10px; margin: 10px 0; border-radius: 4px;">
-                <strong>✗ {i}. {issue}</strong>
-                </div>
-                """, 
-                unsafe_allow_html=True
-            )
+        # One markdown element for all issues instead of one per issue
+        st.markdown(
+            "\n".join(
+                f'<div style="border-left: 4px solid #f44336; padding: 10px; margin: 10px 0; border-radius: 4px;">'
+                f'<strong>✗ {i}. {issue}</strong></div>'
+                for i, issue in enumerate(missed_problems, 1)
+            ),
+            unsafe_allow_html=True
+        )
     
     
\ No newline at end of file
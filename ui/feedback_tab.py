@@ -9,13 +9,36 @@ import logging
 from typing import Dict, List, Any, Optional, Callable
 from utils.code_utils import generate_comparison_report
 
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# UI module imported by the app: the application configures logging handlers
 logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+def _review_history_rows(review_history: List[Any]) -> List[Dict[str, Any]]:
+    """
+    Convert review history to the format expected by FeedbackDisplayUI.
+    
+    The rows are kept in the session state and only rebuilt when a review
+    has been added, so reruns of the tab do not rebuild them.
+    
+    Args:
+        review_history: Review attempts of the workflow state
+        
+    Returns:
+        List of dicts with iteration_number, student_review and review_analysis
+    """
+    last_review = review_history[-1] if review_history else None
+    cached = st.session_state.get("_review_history_cache")
+    if (cached is not None and cached[0] is review_history
+            and cached[1] == len(review_history) and cached[2] is last_review):
+        return cached[3]
+    
+    rows = [{
+        "iteration_number": review.iteration_number,
+        "student_review": review.student_review,
+        "review_analysis": review.analysis
+    } for review in review_history]
+    st.session_state._review_history_cache = (review_history, len(review_history), last_review, rows)
+    return rows
 
 def render_feedback_tab(workflow, feedback_display_ui):
     """Render the feedback and analysis tab with enhanced visualization."""
@@ -41,20 +64,8 @@ def render_feedback_tab(workflow, feedback_display_ui):
         return
     
     # Get the latest review analysis and history
-    latest_review = None
-    review_history = []
-    
-    # Make sure we have review history
-    if state.review_history:
-        latest_review = state.review_history[-1]
-        
-        # Convert review history to the format expected by FeedbackDisplayUI
-        for review in state.review_history:
-            review_history.append({
-                "iteration_number": review.iteration_number,
-                "student_review": review.student_review,
-                "review_analysis": review.analysis
-            })
+    latest_review = state.review_history[-1] if state.review_history else None
+    review_history = _review_history_rows(state.review_history)
     
     # If we have review history but no comparison report, generate one
     if latest_review and latest_review.analysis and not state.comparison_report:
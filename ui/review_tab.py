@@ -163,15 +163,13 @@ def render_review_tab(workflow, code_display_ui):
     max_iterations = getattr(st.session_state.workflow_state, 'max_iterations', 3)
     
     # Get the latest review if available
-    latest_review = None
     targeted_guidance = None
     review_analysis = None
     
-    if hasattr(st.session_state.workflow_state, 'review_history') and st.session_state.workflow_state.review_history:
-        if len(st.session_state.workflow_state.review_history) > 0:
-            latest_review = st.session_state.workflow_state.review_history[-1]
-            targeted_guidance = getattr(latest_review, 'targeted_guidance', None)
-            review_analysis = getattr(latest_review, 'analysis', {})
+    latest_review = st.session_state.workflow_state.latest_review
+    if latest_review is not None:
+        targeted_guidance = getattr(latest_review, 'targeted_guidance', None)
+        review_analysis = getattr(latest_review, 'analysis', {})
     
     # Only allow submission if we're under the max iterations
     if current_iteration <= max_iterations:
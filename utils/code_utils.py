@@ -6,15 +6,31 @@ extracting code from responses, and handling error comments.
 """
 
 import re
-import random
-import os
+import json
+import sys
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+from dataclasses import dataclass
+from functools import cached_property, lru_cache
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple, Union
 from langchain_core.language_models import BaseLanguageModel
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Library module: the application configures logging handlers
 logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# Code blocks of LLM responses, compiled once instead of on every extraction
+_ANNOTATED_BLOCK = re.compile(r'```java-annotated\s*(.*?)\s*```', re.DOTALL)
+_CLEAN_BLOCK = re.compile(r'```java-clean\s*(.*?)\s*```', re.DOTALL)
+_JAVA_BLOCK = re.compile(r'```java\s*(.*?)\s*```', re.DOTALL)
+_ANY_BLOCK = re.compile(r'```\s*(.*?)\s*```', re.DOTALL)
+
+# Response cleanup patterns used by process_llm_response
+_BOLD = re.compile(r'\*\*(.+?)\*\*')
+_ESCAPED_NEWLINE = re.compile(r'(?<!\\)\\n')
+_DOUBLE_ESCAPED_NEWLINE = re.compile(r'\\\\n')
+_RESPONSE_METADATA = re.compile(r'response_metadata=\{.*\}')
+_ADDITIONAL_KWARGS = re.compile(r'additional_kwargs=\{.*\}')
 
 """
 Optimized prompting strategies for the Java Peer Review Training System.
@@ -46,6 +62,42 @@ def add_line_numbers(code: str) -> str:
     
     return "\n".join(numbered_lines)
 
+def count_lines(text: str) -> int:
+    """
+    Count the lines of a text without splitting it into a list.
+    
+    Args:
+        text: Text to count lines of
+        
+    Returns:
+        Number of lines, ignoring a trailing newline
+    """
+    return text.count("\n") + (1 if text and not text.endswith("\n") else 0)
+
+# Request-independent part of the code generation prompt. Keeping it
+# byte-identical across calls lets providers reuse their prefix cache.
+CODE_GENERATION_PROMPT_PREFIX = """You are an expert Java programming instructor creating educational code with specific deliberate errors for students to practice code review skills.
+
+        ERROR IMPLEMENTATION REQUIREMENTS:
+        - Implement EXACTLY the number of errors stated in the task - this is CRITICAL (no more, no fewer)
+        - Only implement the SPECIFIC errors listed in the task
+        - Each error must be an actual Java error, not just a comment
+        - In the annotated version, mark each error with a comment: // ERROR: [TYPE] - [NAME] - [Brief explanation]
+        - NEVER add comments like "// added to fix" or "// this is incorrect" - the errors are meant to remain as errors!
+        - Ensure errors are findable through code review (not just runtime errors)
+
+        OUTPUT FORMAT:
+        1. First, provide the ANNOTATED VERSION with error comments:
+        ```java-annotated
+        // Your code with error annotations
+        ```
+
+        2. Then, provide the CLEAN VERSION without any error comments:
+        ```java-clean
+        // The same code with the same errors but no error annotations
+        ```
+        """
+
 def create_code_generation_prompt(code_length: str, difficulty_level: str, selected_errors: list, domain: str = None, include_error_annotations: bool = True) -> str:
     """
     Create a concise prompt for generating Java code with intentional errors.
@@ -126,9 +178,9 @@ def create_code_generation_prompt(code_length: str, difficulty_level: str, selec
     
     domain_str = domain or "general"
     
-    # Create a focused prompt with clear role definition and verification steps
-    prompt = f"""You are an expert Java programming instructor creating educational code with specific deliberate errors for students to practice code review skills.
-
+    # Static instructions go first so providers can reuse the cached prefix;
+    # everything that varies per request follows it
+    prompt = CODE_GENERATION_PROMPT_PREFIX + f"""
         MAIN TASK:
         Generate a {code_length} Java program for a {domain_str} system that contains EXACTLY {error_count} intentional errors for a code review exercise.
 
@@ -140,14 +192,6 @@ def create_code_generation_prompt(code_length: str, difficulty_level: str, selec
 
         {difficulty_instructions}
 
-        ERROR IMPLEMENTATION REQUIREMENTS:
-        - Implement EXACTLY {error_count} errors - this is CRITICAL (no more, no fewer)
-        - Only implement the SPECIFIC errors listed below
-        - Each error must be an actual Java error, not just a comment
-        - In the annotated version, mark each error with a comment: // ERROR: [TYPE] - [NAME] - [Brief explanation]
-        - NEVER add comments like "// added to fix" or "// this is incorrect" - the errors are meant to remain as errors!
-        - Ensure errors are findable through code review (not just runtime errors)
-
         EXACTLY {error_count} ERRORS TO IMPLEMENT:
 
         {error_instructions}
@@ -161,53 +205,14 @@ def create_code_generation_prompt(code_length: str, difficulty_level: str, selec
         - [ ] The clean version has the same errors but without the comments
         - [ ] Both versions would compile (except for deliberate compilation errors)
 
-        OUTPUT FORMAT:
-        1. First, provide the ANNOTATED VERSION with error comments:
-        ```java-annotated
-        // Your code with error annotations
-        ```
-
-        2. Then, provide the CLEAN VERSION without any error comments:
-        ```java-clean
-        // The same code with the same errors but no error annotations
-        ```
-
         IMPORTANT: Verify you have implemented EXACTLY {error_count} errors before completing.
         """
     
     return prompt
 
-def create_evaluation_prompt(code: str, requested_errors: list) -> str:
-    """
-    Create a clear and concise prompt for evaluating whether code contains required errors.
-    Improved with detailed evaluation criteria and structured output format.
-    """
-    # Count the exact number of requested errors
-    error_count = len(requested_errors)
-    
-    # Format requested errors clearly
-    error_list = []
-    for i, error in enumerate(requested_errors, 1):
-        error_type = error.get("type", "").upper()
-        name = error.get("name", "")
-        description = error.get("description", "")
-        error_list.append(f"{i}. {error_type} - {name}: {description}")
-    
-    error_instructions = "\n".join(error_list)
-    
-    # Create focused evaluation prompt with clear role definition
-    prompt = f"""As a Java code quality expert, your task is to analyze Java code to determine if it correctly implements specific requested errors.
-
-            MAIN TASK:
-            Evaluate if the provided Java code correctly implements EXACTLY {error_count} specific errors that were requested.
-
-            CODE TO EVALUATE:
-            ```java
-            {code}
-            ```
-
-            THE {error_count} SPECIFIC ERRORS THAT SHOULD BE PRESENT:
-            {error_instructions}
+# Request-independent rubric of the evaluation prompt. It comes first so that
+# repeated evaluations share a cacheable prefix with the provider.
+EVALUATION_RUBRIC = """As a Java code quality expert, your task is to analyze Java code to determine if it correctly implements specific requested errors.
 
             EVALUATION INSTRUCTIONS:
             1. Examine the code line by line, identifying each error that matches the requested list
@@ -217,46 +222,167 @@ def create_evaluation_prompt(code: str, requested_errors: list) -> str:
             - A brief code segment showing the error
             - A concise explanation of why it matches the requested error
             3. Check if any requested errors are missing from the code
-            4. For valid implementation, the code must contain EXACTLY {error_count} errors - no more, no fewer
+            4. For valid implementation, the code must contain EXACTLY the number of requested errors - no more, no fewer
 
             RESPONSE FORMAT:
             Your evaluation must be returned in this JSON format:
 
             ```json
-            {{
+            {
             "found_errors": [
-                {{
+                {
                 "error_type": "BUILD",  
                 "error_name": "NullPointerException",
                 "line_number": 42,
                 "code_segment": "String str = null; int length = str.length();",
                 "explanation": "This code will cause a NullPointerException because it calls length() on a null String"
-                }}
+                }
                 // List all implemented errors that match the requested list
             ],
             "missing_errors": [
-                {{
+                {
                 "error_type": "CHECKSTYLE",
                 "error_name": "MemberName",
                 "explanation": "The code doesn't contain any variable names that violate member naming conventions"
-                }}
+                }
                 // List all requested errors that aren't implemented
             ],
             "valid": true,  // Set to true ONLY if ALL requested errors are implemented, no more and no fewer
-            "feedback": "The code successfully implements all {error_count} requested errors."  // Provide brief overall assessment
-            }}
+            "feedback": "The code successfully implements all requested errors."  // Provide brief overall assessment
+            }
             ```
 
             VERIFICATION CHECKLIST:
             - Confirm that each found error truly matches the corresponding requested error
-            - Verify that the total count of found errors is EXACTLY {error_count} for validity
+            - Verify that the total count of found errors EXACTLY matches the number of requested errors for validity
             - Double-check any errors you believe are missing to ensure they're truly absent
             - Ensure your JSON response is properly formatted for processing
 
             IMPORTANT: Focus solely on the specified error types and names, not general code quality issues.
             """
+
+# Rubric plus the separator before the request part, joined once at import
+_EVALUATION_PROMPT_HEAD = EVALUATION_RUBRIC + "\n            "
+
+def _evaluation_request(code: str, requested_errors: list) -> str:
+    """
+    Create the request-specific part of the evaluation prompt.
     
-    return prompt
+    Args:
+        code: The Java code to evaluate
+        requested_errors: List of errors that should be present in the code
+        
+    Returns:
+        Task description with the code and the requested errors
+    """
+    # Count the exact number of requested errors
+    error_count = len(requested_errors)
+    
+    # Format requested errors clearly
+    error_instructions = "\n".join(
+        f"{i}. {error.get('type', '').upper()} - {error.get('name', '')}: {error.get('description', '')}"
+        for i, error in enumerate(requested_errors, 1)
+    )
+    
+    return f"""MAIN TASK:
+            Evaluate if the provided Java code correctly implements EXACTLY {error_count} specific errors that were requested.
+
+            CODE TO EVALUATE:
+            ```java
+            {code}
+            ```
+
+            THE {error_count} SPECIFIC ERRORS THAT SHOULD BE PRESENT:
+            {error_instructions}
+            """
+
+def create_evaluation_prompt(code: str, requested_errors: list) -> str:
+    """
+    Create a clear and concise prompt for evaluating whether code contains required errors.
+    Improved with detailed evaluation criteria and structured output format.
+    """
+    return _EVALUATION_PROMPT_HEAD + _evaluation_request(code, requested_errors)
+
+def create_evaluation_messages(code: str, requested_errors: list) -> List[BaseMessage]:
+    """
+    Create the evaluation prompt as chat messages.
+    
+    The static rubric is the system message and the code with its requested
+    errors is the human message, so every evaluation starts with the same
+    cacheable prefix.
+    
+    Args:
+        code: The Java code to evaluate
+        requested_errors: List of errors that should be present in the code
+        
+    Returns:
+        System and human messages for the evaluation
+    """
+    return [
+        SystemMessage(content=EVALUATION_RUBRIC),
+        HumanMessage(content=_evaluation_request(code, requested_errors))
+    ]
+
+# Correction instructions appended by create_evaluate_and_fix_prompt; only the domain varies
+_CORRECTION_STEP_TEMPLATE = """
+            CORRECTION STEP:
+            After the JSON evaluation, act on your result:
+            - If the code is valid, write the single line: STATUS: OK
+            - Otherwise, rewrite the code for the {domain} application so that it contains EXACTLY the requested errors,
+              keeping the errors that are already implemented and adding the missing ones.
+              Provide the ANNOTATED VERSION first, marking each error with // ERROR: [TYPE] - [NAME] - [Brief explanation]:
+            ```java-annotated
+            // Corrected code with error annotations
+            ```
+              Then provide the CLEAN VERSION with the same errors but no error annotations:
+            ```java-clean
+            // The same corrected code without annotations
+            ```
+            """
+
+def create_evaluate_and_fix_prompt(code: str, requested_errors: list, domain: str = None) -> str:
+    """
+    Create a prompt that evaluates code and, if needed, fixes it in the same response.
+    
+    Args:
+        code: The Java code to evaluate
+        requested_errors: List of errors that should be present in the code
+        domain: Domain context of the code
+        
+    Returns:
+        Combined evaluation and correction prompt
+    """
+    return "".join((
+        _EVALUATION_PROMPT_HEAD,
+        _evaluation_request(code, requested_errors),
+        _CORRECTION_STEP_TEMPLATE.format(domain=domain or "general")
+    ))
+
+# Request-independent part of the regeneration prompt, shared byte for byte
+# by every regeneration attempt so providers can reuse its prefix cache.
+REGENERATION_PROMPT_PREFIX = """You are an educational Java error creator who intentionally introduces specific errors in code for teaching purposes.
+
+        VERY IMPORTANT INSTRUCTIONS:
+        1. Focus on implementing EXACTLY the requested errors
+        2. NEVER add comments like "// added to fix", "// fixed", or "// corrected" - these errors are meant to remain as errors!
+        3. Do not change the domain or structure of the code
+        4. Errors must be actual Java errors, not just comments about errors
+        5. Use EXACTLY the same domain as the original code and maintain its structure
+        6. For each error you add, include a comment in the format: // ERROR: [TYPE] - [NAME] - [Brief explanation]
+        7. Do NOT try to improve or fix the code - it should contain intentional bugs for educational purposes
+        8. The whole purpose is to create flawed code that students will learn to identify problems in
+
+        PROVIDE TWO VERSIONS OF THE CODE:
+        1. First, provide the ANNOTATED VERSION with error comments, marked with:
+        ```java-annotated
+        // Your code with intentional errors and error annotations
+        ```
+
+        2. Then, provide the CLEAN VERSION without any error comments, marked with:
+        ```java-clean
+        // The same code with the same intentional errors but no error comments
+        ```
+        """
 
 def create_regeneration_prompt(code: str, domain: str, missing_errors: list, found_errors: list, requested_errors: list) -> str:
     """
@@ -266,43 +392,49 @@ def create_regeneration_prompt(code: str, domain: str, missing_errors: list, fou
     # Total requested errors count
     total_requested = len(requested_errors)
     
+    # Index requested errors by key once instead of rescanning them per missing error
+    requested_by_key = {}
+    for error in requested_errors:
+        requested_by_key.setdefault(f"{error.get('type', '').upper()} - {error.get('name', '')}", error)
+    
     # Create detailed instructions for missing errors
     missing_instructions = []
     for error_key in missing_errors:
         # Find the full error details
-        for error in requested_errors:
+        error = requested_by_key.get(error_key)
+        
+        # Also check for partial matches if exact match fails
+        if error is None and error_key:
+            error_key_lower = error_key.lower()
+            for candidate in requested_errors:
+                candidate_type = candidate.get("type", "").upper()
+                candidate_name = candidate.get("name", "")
+                # Try to match on error name alone, then on error type alone
+                if ((candidate_name and candidate_name.lower() in error_key_lower) or
+                        (candidate_type and candidate_type.lower() in error_key_lower)):
+                    error = candidate
+                    break
+        
+        if error is not None:
             error_type = error.get("type", "").upper()
             name = error.get("name", "")
-            key_match = f"{error_type} - {name}" == error_key
-            
-            # Also check for partial matches if exact match fails
-            if not key_match and error_key:
-                # Try to match on error name alone
-                if name and name.lower() in error_key.lower():
-                    key_match = True
-                # Try to match on error type alone
-                elif error_type and error_type.lower() in error_key.lower():
-                    key_match = True
+            guide = error.get("implementation_guide", "")
+            description = error.get("description", "")
             
-            if key_match:
-                guide = error.get("implementation_guide", "")
-                description = error.get("description", "")
-                
-                instruction = f"{error_type} - {name}"
-                if description:
-                    instruction += f": {description}"
-                if guide:
-                    instruction += f"\nImplementation: {guide}"
-                missing_instructions.append(instruction)
-                break
+            instruction = f"{error_type} - {name}"
+            if description:
+                instruction += f": {description}"
+            if guide:
+                instruction += f"\nImplementation: {guide}"
+            missing_instructions.append(instruction)
     
     # Format missing and found errors
     missing_text = "\n".join(f"- {instr}" for instr in missing_instructions)
     found_text = "\n".join(f"- {err}" for err in found_errors)
     
-    # Create improved prompt with clearer instructions and error verification steps
-    prompt = f"""You are an educational Java error creator who intentionally introduces specific errors in code for teaching purposes.
-
+    # Static instructions go first so repeated regeneration attempts share the
+    # cached prefix; the counts, errors and code of this attempt follow it
+    prompt = REGENERATION_PROMPT_PREFIX + f"""
         TASK:
         Modify this Java code to have EXACTLY {total_requested} errors - no more, no fewer.
         The code must contain ONLY the specific errors requested below.
@@ -315,33 +447,12 @@ def create_regeneration_prompt(code: str, domain: str, missing_errors: list, fou
         EXISTING ERRORS TO KEEP - Do not modify these errors:
         {found_text if found_text else "No correctly implemented errors found."}
 
-        VERY IMPORTANT INSTRUCTIONS:
-        1. Focus on implementing EXACTLY the requested errors
-        2. NEVER add comments like "// added to fix", "// fixed", or "// corrected" - these errors are meant to remain as errors!
-        3. Do not change the domain or structure of the code
-        4. Errors must be actual Java errors, not just comments about errors
-        5. Use EXACTLY the same {domain} domain and maintain the original code structure
-        6. For each error you add, include a comment in the format: // ERROR: [TYPE] - [NAME] - [Brief explanation]
-        7. Do NOT try to improve or fix the code - it should contain intentional bugs for educational purposes
-        8. The whole purpose is to create flawed code that students will learn to identify problems in
-
         VERIFICATION STEPS (DO THIS BEFORE SUBMITTING):
         1. Count the total number of errors in your code, confirm it's EXACTLY {total_requested}
         2. Verify each missing error from the list is now implemented
         3. Confirm all existing errors that should be kept are still present and unchanged
         4. Ensure any extra errors have been removed
 
-        PROVIDE TWO VERSIONS OF THE CODE:
-        1. First, provide the ANNOTATED VERSION with error comments, marked with:
-        ```java-annotated
-        // Your code with intentional errors and error annotations
-        ```
-
-        2. Then, provide the CLEAN VERSION without any error comments, marked with:
-        ```java-clean
-        // The same code with the same intentional errors but no error comments
-        ```
-
         ORIGINAL CODE:
         ```java
         {code}
@@ -350,36 +461,14 @@ def create_regeneration_prompt(code: str, domain: str, missing_errors: list, fou
     
     return prompt
 
-def create_review_analysis_prompt(code: str, known_problems: list, student_review: str) -> str:
-    """
-    Create an optimized prompt for analyzing student code reviews.
-    Enhanced with educational assessment focus and better structured output requirements.
-    """
-    # Count known problems
-    problem_count = len(known_problems)
-    
-    # Format known problems clearly
-    problems_text = "\n".join(f"- {problem}" for problem in known_problems)
-    
-    # Create focused analysis prompt with educational assessment role
-    prompt = f"""You are an educational assessment specialist analyzing a student's Java code review skills.
+# Request-independent part of the review analysis prompt. It comes first, then
+# the code and its known issues (shared by every review of the same code), and
+# the student's review last, so repeated analyses share the longest prefix.
+REVIEW_ANALYSIS_INSTRUCTIONS = """You are an educational assessment specialist analyzing a student's Java code review skills.
 
                 MAIN TASK:
                 Analyze the student's code review against a set of known issues to evaluate their code review effectiveness.
 
-                CODE BEING REVIEWED:
-                ```java
-                {code}
-                ```
-
-                {problem_count} KNOWN ISSUES IN THE CODE:
-                {problems_text}
-
-                STUDENT'S REVIEW SUBMISSION:
-                ```
-                {student_review}
-                ```
-
                 ANALYSIS INSTRUCTIONS:
                 1. Carefully read both the code and the student's review
                 2. Identify which of the known issues the student correctly found
@@ -392,37 +481,37 @@ def create_review_analysis_prompt(code: str, known_problems: list, student_revie
                 Provide your analysis in JSON format with these components:
 
                 ```json
-                {{
+                {
                 "identified_problems": [
-                    {{
+                    {
                     "problem": "SPECIFIC KNOWN ISSUE TEXT",
                     "student_comment": "STUDENT'S RELEVANT COMMENT",
                     "accuracy": 0.9,
                     "feedback": "Brief feedback on this identification"
-                    }}
+                    }
                     // Include all correctly identified issues
                 ],
                 "missed_problems": [
-                    {{
+                    {
                     "problem": "SPECIFIC KNOWN ISSUE TEXT",
                     "hint": "A helpful educational hint for finding this type of issue"
-                    }}
+                    }
                     // Include all missed issues
                 ],
                 "false_positives": [
-                    {{
+                    {
                     "student_comment": "STUDENT'S INCORRECT COMMENT",
                     "explanation": "Why this isn't actually an issue"
-                    }}
+                    }
                     // Include any incorrect identifications
                 ],
                 "identified_count": 3,  // Number of correctly identified issues
-                "total_problems": {problem_count},  // Total number of known issues
+                "total_problems": 5,  // Total number of known issues
                 "identified_percentage": 60.0,  // Percentage of issues correctly identified
                 "review_quality_score": 7.5,  // Score from 1-10 rating review quality
                 "review_sufficient": true,  // true if >= 60% of issues identified
                 "feedback": "Overall assessment with specific improvement suggestions"
-                }}
+                }
                 ```
 
                 EVALUATION CRITERIA:
@@ -439,8 +528,133 @@ def create_review_analysis_prompt(code: str, known_problems: list, student_revie
                 - Provide educational feedback that helps the student improve their code review skills
                 - If the student uses different terminology but correctly identifies an issue, count it as correct
                 """
+
+@dataclass(frozen=True)
+class KnownProblems:
+    """
+    Known problems of a code snippet, normalized once and shared by every
+    student reviewing it.
     
-    return prompt
+    Behaves as a read-only sequence of problem strings, so it can be passed
+    wherever a list of known problems is expected.
+    """
+    items: Tuple[str, ...]
+    
+    @classmethod
+    def of(cls, problems: Union["KnownProblems", Iterable[Any]]) -> "KnownProblems":
+        """
+        Normalize known problems, reusing an existing KnownProblems as is.
+        
+        Args:
+            problems: KnownProblems or an iterable of problems
+            
+        Returns:
+            KnownProblems with interned problem strings
+        """
+        if isinstance(problems, cls):
+            return problems
+        return cls(tuple(sys.intern(str(problem)) for problem in problems))
+    
+    @cached_property
+    def formatted(self) -> str:
+        """Problems as a bulleted list for prompts."""
+        return "\n".join(f"- {problem}" for problem in self.items)
+    
+    def __len__(self) -> int:
+        return len(self.items)
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.items)
+    
+    def __getitem__(self, index):
+        return self.items[index]
+
+@lru_cache(maxsize=64)
+def _review_analysis_prefix(code: str, known_problems: KnownProblems) -> str:
+    """
+    Build the part of the review analysis prompt shared by all reviews of a code snippet.
+    
+    Args:
+        code: The code being reviewed
+        known_problems: Known problems in the code
+        
+    Returns:
+        Instructions, code and known issues
+    """
+    problems_text = known_problems.formatted
+    
+    return REVIEW_ANALYSIS_INSTRUCTIONS + f"""
+                CODE BEING REVIEWED:
+                ```java
+                {code}
+                ```
+
+                {len(known_problems)} KNOWN ISSUES IN THE CODE:
+                {problems_text}
+"""
+
+def create_review_analysis_prompt_parts(code: str, known_problems: list, student_review: str) -> Tuple[str, str]:
+    """
+    Create the review analysis prompt as a shared prefix and a per-review suffix.
+    
+    The prefix only depends on the code and its known problems, so it is built
+    once per snippet and stays byte-identical for every student reviewing it.
+    
+    Args:
+        code: The code being reviewed
+        known_problems: Known problems in the code, as a list or KnownProblems
+        student_review: The student's review
+        
+    Returns:
+        Tuple of (prefix, suffix)
+    """
+    prefix = _review_analysis_prefix(code, KnownProblems.of(known_problems))
+    suffix = f"""
+                STUDENT'S REVIEW SUBMISSION:
+                ```
+                {student_review}
+                ```
+                """
+    return prefix, suffix
+
+def create_batched_review_analysis_prompt(code: str, known_problems: list, student_reviews: list) -> str:
+    """
+    Create one prompt analyzing several student reviews of the same code.
+    
+    Args:
+        code: The code being reviewed
+        known_problems: Known problems in the code
+        student_reviews: The students' reviews
+        
+    Returns:
+        Batched review analysis prompt
+    """
+    prefix = _review_analysis_prefix(code, KnownProblems.of(known_problems))
+    reviews_text = "\n".join(
+        f"""
+                REVIEW {index}:
+                ```
+                {review}
+                ```"""
+        for index, review in enumerate(student_reviews)
+    )
+    return prefix + f"""
+                {len(student_reviews)} STUDENT REVIEW SUBMISSIONS, ANALYZE EACH ONE INDEPENDENTLY:
+                {reviews_text}
+
+                BATCH RESPONSE FORMAT:
+                Return a single JSON object of the form {{"analyses": [...]}} holding one analysis per review,
+                in the format described above, each with an added "review_index" field giving the review number.
+                """
+
+def create_review_analysis_prompt(code: str, known_problems: list, student_review: str) -> str:
+    """
+    Create an optimized prompt for analyzing student code reviews.
+    Enhanced with educational assessment focus and better structured output requirements.
+    """
+    # Static instructions first, the student's review last
+    prefix, suffix = create_review_analysis_prompt_parts(code, known_problems, student_review)
+    return prefix + suffix
 
 def create_feedback_prompt(code: str, known_problems: list, review_analysis: dict) -> str:
     """
@@ -511,6 +725,52 @@ def create_feedback_prompt(code: str, known_problems: list, review_analysis: dic
     
     return prompt
 
+@lru_cache(maxsize=128)
+def _extract_code_blocks(response_text: str) -> Tuple[str, str]:
+    """
+    Extract the annotated and clean code blocks from response text.
+    
+    Cached because the same response is extracted more than once, e.g. when
+    a generation candidate is chosen or a cached response is reused.
+    
+    Args:
+        response_text: Text of the LLM response
+        
+    Returns:
+        Tuple of (annotated_code, clean_code)
+    """
+    # Extract annotated version with java-annotated tag
+    annotated_match = _ANNOTATED_BLOCK.search(response_text)
+    annotated_code = annotated_match.group(1) if annotated_match else ""
+    
+    # Extract clean version with java-clean tag
+    clean_match = _CLEAN_BLOCK.search(response_text)
+    clean_code = clean_match.group(1) if clean_match else ""
+    
+    # Fallbacks if specific tags aren't found
+    if not annotated_code:
+        # Try to find any java code block for annotated version
+        java_match = _JAVA_BLOCK.search(response_text)
+        if java_match:
+            annotated_code = java_match.group(1)
+        else:
+            # Last resort: look for any code block
+            any_matches = _ANY_BLOCK.findall(response_text)
+            if any_matches:
+                # Use the largest code block
+                annotated_code = max(any_matches, key=len)
+    
+    # For Groq responses: If we found annotated but no clean code, create clean code by removing error comments
+    if annotated_code and not clean_code:
+        # Remove lines with error comments
+        clean_lines = []
+        for line in annotated_code.splitlines():
+            if "// ERROR:" not in line:
+                clean_lines.append(line)
+        clean_code = "\n".join(clean_lines)
+    
+    return annotated_code, clean_code
+
 def extract_both_code_versions(response) -> Tuple[str, str]:
     """
     Extract both annotated and clean code versions from LLM response.
@@ -547,39 +807,7 @@ def extract_both_code_versions(response) -> Tuple[str, str]:
            (response_text.startswith("'") and response_text.endswith("'")):
             response_text = response_text[1:-1]
     
-    # Extract annotated version with java-annotated tag
-    annotated_pattern = r'```java-annotated\s*(.*?)\s*```'
-    annotated_matches = re.findall(annotated_pattern, response_text, re.DOTALL)
-    annotated_code = annotated_matches[0] if annotated_matches else ""
-    
-    # Extract clean version with java-clean tag
-    clean_pattern = r'```java-clean\s*(.*?)\s*```'
-    clean_matches = re.findall(clean_pattern, response_text, re.DOTALL)
-    clean_code = clean_matches[0] if clean_matches else ""
-    
-    # Fallbacks if specific tags aren't found
-    if not annotated_code:
-        # Try to find any java code block for annotated version
-        java_pattern = r'```java\s*(.*?)\s*```'
-        java_matches = re.findall(java_pattern, response_text, re.DOTALL)
-        if java_matches:
-            annotated_code = java_matches[0]
-        else:
-            # Last resort: look for any code block
-            any_code_pattern = r'```\s*(.*?)\s*```'
-            any_matches = re.findall(any_code_pattern, response_text, re.DOTALL)
-            if any_matches:
-                # Use the largest code block
-                annotated_code = max(any_matches, key=len)
-    
-    # For Groq responses: If we found annotated but no clean code, create clean code by removing error comments
-    if annotated_code and not clean_code:
-        # Remove lines with error comments
-        clean_lines = []
-        for line in annotated_code.splitlines():
-            if "// ERROR:" not in line:
-                clean_lines.append(line)
-        clean_code = "\n".join(clean_lines)
+    annotated_code, clean_code = _extract_code_blocks(response_text)
     
     # Log detailed information if extraction failed
     if not annotated_code:
@@ -841,10 +1069,10 @@ def generate_comparison_report_fallback(evaluation_errors: List[str], review_ana
         # Get identified issues from first attempt
         first_review = review_history[0].get("review_analysis", {})
         first_identified = first_review.get("identified_problems", [])
-        first_identified_str = [str(p) if not isinstance(p, str) else p for p in first_identified]
+        first_identified_set = {str(p) if not isinstance(p, str) else p for p in first_identified}
         
         # Find newly identified issues in the latest attempt
-        new_findings = [p for p in identified_str if p not in first_identified_str]
+        new_findings = [p for p in identified_str if p not in first_identified_set]
         
         if new_findings:
             report += "## New Issues Found\n\n"
@@ -857,6 +1085,43 @@ def generate_comparison_report_fallback(evaluation_errors: List[str], review_ana
     
     return report
 
+def iter_json_spans(text: str):
+    """
+    Yield balanced top-level {...} spans of text in a single linear scan.
+    
+    Braces inside JSON strings are ignored, so the scan cannot be thrown off
+    by code segments quoted in the response.
+    
+    Args:
+        text: Text to scan
+        
+    Yields:
+        Candidate JSON object strings in order of appearance
+    """
+    depth = 0
+    start = -1
+    in_string = False
+    escape = False
+    for i, char in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif char == '\\':
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            # Strings only matter inside an object; quotes in prose are ignored
+            in_string = depth > 0
+        elif char == '{':
+            if depth == 0:
+                start = i
+            depth += 1
+        elif char == '}' and depth > 0:
+            depth -= 1
+            if depth == 0:
+                yield text[start:i + 1]
+
 def process_llm_response(response):
     """
     Process LLM response to handle different formats from different providers
@@ -884,6 +1149,10 @@ def process_llm_response(response):
             # Assume it's already a string
             content = str(response)
         
+        # Structured output (JSON mode / tool calls) is serialized as JSON, not cleaned as text
+        if isinstance(content, (dict, list)):
+            return json.dumps(content, ensure_ascii=False)
+        
         # Fix common formatting issues:
         
         # 1. Remove any 'content=' prefix if present (common in Groq debug output)
@@ -901,15 +1170,15 @@ def process_llm_response(response):
             content = content[1:-1]
         
         # 4. Fix markdown formatting issues
-        content = re.sub(r'\*\*(.+?)\*\*', r'**\1**', content)  # Fix bold formatting
+        content = _BOLD.sub(r'**\1**', content)  # Fix bold formatting
         
         # 5. Clean up any raw escape sequences for newlines
-        content = re.sub(r'(?<!\\)\\n', '\n', content)
-        content = re.sub(r'\\\\n', '\\n', content)  # Preserve intentional \n in code
+        content = _ESCAPED_NEWLINE.sub('\n', content)
+        content = _DOUBLE_ESCAPED_NEWLINE.sub('\\n', content)  # Preserve intentional \n in code
         
         # 6. Fix any metadata that might have leaked into the content
-        content = re.sub(r'response_metadata=\{.*\}', '', content)
-        content = re.sub(r'additional_kwargs=\{.*\}', '', content)
+        content = _RESPONSE_METADATA.sub('', content)
+        content = _ADDITIONAL_KWARGS.sub('', content)
         
         return content
     except Exception as e:
@@ -954,6 +1223,18 @@ def get_error_count_from_state(state: Any, difficulty_level: str = "medium") ->
                 return max(category_count, 2)  # Ensure at least 2 errors
     
     # Finally fall back to difficulty-based default if all else fails
+    return get_error_count_for_difficulty(difficulty_level)
+
+def get_error_count_for_difficulty(difficulty_level: str = "medium") -> int:
+    """
+    Get the default number of errors for a difficulty level.
+    
+    Args:
+        difficulty_level: Difficulty level (easy, medium, hard)
+        
+    Returns:
+        Number of errors to use
+    """
     difficulty_map = {
         "easy": 2,
         "medium": 4,
@@ -0,0 +1,116 @@
+"""
+LLM Request Batching for Java Peer Review Training System.
+
+This module provides the BatchingLLMClient class which coalesces
+asynchronous calls issued at about the same time (e.g. by several
+students' sessions) into one batched model call.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class BatchingLLMClient:
+    """
+    Wraps a language model so concurrent ainvoke calls share batched requests.
+
+    Calls made within a short window are collected and sent together
+    through the model's abatch method. Every other attribute (invoke,
+    stream, temperature, ...) is read from the wrapped model, so the
+    client can be passed wherever a single model is.
+
+    This only pays off when the model's abatch hits a provider batch
+    endpoint. The Ollama and Groq models (and LLMPool) implement abatch as
+    concurrent ainvoke calls, so for them the window only adds latency.
+    """
+
+    def __init__(self, llm: Any, window: float = 0.05, max_batch_size: int = 16,
+                 max_concurrency: Optional[int] = None):
+        """
+        Initialize the batching client.
+
+        Args:
+            llm: Language model to send the batched calls to
+            window: Seconds to wait for more calls after the first one of a batch
+            max_batch_size: Maximum number of calls sent in one batch
+            max_concurrency: Optional cap on requests abatch runs at once
+        """
+        self.llm = llm
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.max_concurrency = max_concurrency
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes the client itself does not define
+        if name.startswith("__") or name == "llm":
+            raise AttributeError(name)
+        return getattr(self.llm, name)
+
+    async def ainvoke(self, input: Any, config: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Any:
+        """
+        Queue a call for the next batch and wait for its response.
+
+        Calls with a config or extra arguments cannot share a batch and are
+        sent on their own.
+
+        Args:
+            input: Prompt or messages
+            config: Optional runnable config
+            **kwargs: Extra model call arguments
+
+        Returns:
+            Model response
+        """
+        if config or kwargs:
+            return await self.llm.ainvoke(input, config, **kwargs)
+
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Queues and tasks belong to one event loop
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = None
+
+        future = loop.create_future()
+        self._queue.put_nowait((input, future))
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._run_batches())
+        return await future
+
+    async def _run_batches(self) -> None:
+        """Send queued calls in batches until the queue is empty."""
+        queue = self._queue
+        while not queue.empty():
+            batch = [queue.get_nowait()]
+            await asyncio.sleep(self.window)
+            while len(batch) < self.max_batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            await self._send(batch)
+
+    async def _send(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        """
+        Send one batch and resolve the futures of its calls.
+
+        Args:
+            batch: Pairs of (input, future) of the batched calls
+        """
+        config = {"max_concurrency": self.max_concurrency} if self.max_concurrency else None
+        logger.debug(f"Sending batch of {len(batch)} LLM calls")
+        try:
+            responses = await self.llm.abatch([item for item, _ in batch], config, return_exceptions=True)
+        except Exception as e:
+            responses = [e] * len(batch)
+
+        for (_, future), response in zip(batch, responses):
+            if future.done():
+                continue
+            if isinstance(response, Exception):
+                future.set_exception(response)
+            else:
+                future.set_result(response)
@@ -0,0 +1,407 @@
+"""
+LLM Response Cache for Java Peer Review Training System.
+
+This module provides small cache backends used to skip repeated LLM
+round-trips when the same request is issued more than once.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from contextlib import closing
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Seconds cached LLM outputs stay valid; 0 keeps them until evicted or purged
+CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "0")) or None
+
+
+def make_cache_key(payload: Dict[str, Any]) -> str:
+    """
+    Compute a stable fingerprint for a cache payload.
+
+    Args:
+        payload: JSON-serializable dictionary describing the request
+
+    Returns:
+        Hex digest identifying the payload
+    """
+    serialized = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.blake2b(serialized.encode("utf-8"), digest_size=20).hexdigest()
+
+
+class CacheBackend(ABC):
+    """
+    Interface for key/value stores holding cached LLM outputs.
+
+    Values must be JSON-serializable so that persistent backends
+    can store them as well as in-memory ones.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Look up a cached value.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached value or None on a miss
+        """
+
+    @abstractmethod
+    def set(self, key: str, value: Any) -> None:
+        """
+        Store a value in the cache.
+
+        Args:
+            key: Cache key
+            value: Value to store
+        """
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove all cached entries."""
+
+
+class InMemoryCache(CacheBackend):
+    """
+    Thread-safe in-memory LRU cache with optional expiry.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: Optional[float] = None):
+        """
+        Initialize the in-memory cache.
+
+        Args:
+            maxsize: Maximum number of entries kept before evicting the oldest
+            ttl: Optional number of seconds after which entries expire
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+                del self._data[key]
+                entry = None
+            if entry is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size of the cache."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._data)
+        }
+
+
+class SQLiteCache(CacheBackend):
+    """
+    Persistent cache stored in a SQLite database.
+
+    Survives process restarts and can be shared by several worker
+    processes. Entries are partitioned by namespace so one database
+    file can hold different kinds of cached outputs.
+    """
+
+    def __init__(self, cache_dir: str, namespace: str = "default", ttl: Optional[float] = None):
+        """
+        Initialize the SQLite cache. The database is created on first use.
+
+        Args:
+            cache_dir: Directory holding the cache database
+            namespace: Namespace separating this cache's entries from others
+            ttl: Optional number of seconds after which entries are ignored
+        """
+        self.path = os.path.join(cache_dir, "llm_cache.sqlite3")
+        self.namespace = namespace
+        self.ttl = ttl
+        self._initialized = False
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Open a connection, creating the database schema if needed.
+
+        Returns:
+            SQLite connection
+        """
+        if not self._initialized:
+            with self._lock:
+                if not self._initialized:
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                    with closing(sqlite3.connect(self.path, timeout=30)) as conn, conn:
+                        conn.execute(
+                            "CREATE TABLE IF NOT EXISTS llm_cache ("
+                            "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                            "created_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+                        )
+                    self._initialized = True
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            with closing(self._connect()) as conn:
+                row = conn.execute(
+                    "SELECT value FROM llm_cache WHERE namespace = ? AND key = ? AND created_at > ?",
+                    (self.namespace, key, time.time() - self.ttl if self.ttl else 0.0)
+                ).fetchone()
+            return json.loads(row[0]) if row else None
+        except (sqlite3.Error, OSError, ValueError) as e:
+            logger.error(f"Error reading from disk cache: {str(e)}")
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (namespace, key, value, created_at) VALUES (?, ?, ?, ?)",
+                    (self.namespace, key, json.dumps(value, default=str), time.time())
+                )
+        except (sqlite3.Error, OSError, TypeError) as e:
+            logger.error(f"Error writing to disk cache: {str(e)}")
+
+    def clear(self) -> None:
+        self.purge(0)
+
+    def purge(self, older_than_seconds: float) -> int:
+        """
+        Delete entries older than the given age.
+
+        Args:
+            older_than_seconds: Minimum age of the entries to delete
+
+        Returns:
+            Number of deleted entries
+        """
+        try:
+            with closing(self._connect()) as conn, conn:
+                cursor = conn.execute(
+                    "DELETE FROM llm_cache WHERE namespace = ? AND created_at <= ?",
+                    (self.namespace, time.time() - older_than_seconds)
+                )
+                return cursor.rowcount
+        except (sqlite3.Error, OSError) as e:
+            logger.error(f"Error purging disk cache: {str(e)}")
+            return 0
+
+
+class TieredCache(CacheBackend):
+    """
+    Two-level cache: a fast in-memory tier in front of a persistent tier.
+
+    Hits in the persistent tier are promoted to the memory tier.
+    """
+
+    def __init__(self, memory: CacheBackend, persistent: CacheBackend):
+        """
+        Initialize the tiered cache.
+
+        Args:
+            memory: Fast first-level cache
+            persistent: Slower cache that survives restarts
+        """
+        self.memory = memory
+        self.persistent = persistent
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is None:
+            value = self.persistent.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self.memory.set(key, value)
+        self.persistent.set(key, value)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        self.persistent.clear()
+
+    def purge(self, older_than_seconds: float) -> int:
+        """
+        Delete old persistent entries and reset the memory tier.
+
+        Args:
+            older_than_seconds: Minimum age of the entries to delete
+
+        Returns:
+            Number of deleted persistent entries
+        """
+        self.memory.clear()
+        purge = getattr(self.persistent, "purge", None)
+        return purge(older_than_seconds) if purge else 0
+
+
+class SemanticReviewCache:
+    """
+    Cache of review analyses matched by embedding similarity.
+
+    Entries are partitioned by a context hash (code snippet and known
+    problems) so that a review is only ever matched against reviews of
+    the same code. Similarity against all entries of a context is
+    computed with a single matrix-vector product. The least recently used
+    contexts are evicted once max_contexts is reached.
+
+    The embedding model is loaded when the cache is created. Without one
+    (no embed_fn and sentence-transformers not installed) the cache stays
+    empty: cruder similarity measures confuse reviews that differ in one
+    detail, such as a line number.
+    """
+
+    def __init__(self, threshold: float = 0.93, embed_fn: Optional[Callable[[str], np.ndarray]] = None,
+                 model_name: str = "sentence-transformers/all-MiniLM-L6-v2", max_entries: int = 256,
+                 max_contexts: int = 256):
+        """
+        Initialize the semantic review cache.
+
+        Args:
+            threshold: Minimum cosine similarity for a cache hit
+            embed_fn: Optional function mapping text to an embedding vector
+            model_name: Sentence-transformers model used when no embed_fn is given
+            max_entries: Maximum number of reviews kept per context
+            max_contexts: Maximum number of contexts kept
+        """
+        self.threshold = threshold
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.max_contexts = max_contexts
+        # context hash -> (embedding matrix, analyses), least recently used first
+        self._contexts: "OrderedDict[str, Tuple[np.ndarray, List[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        
+        # Load the model up front so no review submission waits for a download
+        with self._lock:
+            self._embed_fn = embed_fn or self._load_default_embedder()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether an embedding model is available."""
+        return self._embed_fn is not None
+
+    def _embed(self, text: str) -> np.ndarray:
+        """
+        Embed text as a unit-length float32 vector.
+
+        Args:
+            text: Text to embed
+
+        Returns:
+            Normalized embedding vector
+        """
+        vector = np.asarray(self._embed_fn(text), dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _load_default_embedder(self) -> Optional[Callable[[str], np.ndarray]]:
+        """
+        Load the sentence-transformers model.
+
+        Returns:
+            Embedding function, or None if the model is unavailable
+        """
+        try:
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer(self.model_name)
+            logger.info(f"Loaded embedding model for review cache: {self.model_name}")
+            return model.encode
+        except Exception as e:
+            logger.warning(f"Embedding model unavailable ({str(e)}), semantic review cache disabled")
+            return None
+
+    def lookup(self, review: str, context_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Find the analysis of a sufficiently similar review.
+
+        Args:
+            review: Student review text
+            context_hash: Hash of the code and known problems being reviewed
+
+        Returns:
+            Cached analysis or None on a miss
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._contexts.get(context_hash)
+            if entry is None:
+                return None
+            self._contexts.move_to_end(context_hash)
+            matrix, results = entry
+        similarities = matrix @ self._embed(review)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            return None
+        logger.debug(f"Semantic review cache hit (similarity {similarities[best]:.3f})")
+        return results[best]
+
+    def insert(self, review: str, context_hash: str, analysis: Dict[str, Any]) -> None:
+        """
+        Store the analysis of a review.
+
+        Args:
+            review: Student review text
+            context_hash: Hash of the code and known problems being reviewed
+            analysis: Analysis produced for the review
+        """
+        if not self.enabled:
+            return
+        vector = self._embed(review)[np.newaxis, :]
+        with self._lock:
+            entry = self._contexts.pop(context_hash, None)
+            if entry is None:
+                matrix, results = vector, [analysis]
+            else:
+                # New list so lookups holding the previous one are unaffected
+                matrix, results = np.vstack([entry[0], vector]), entry[1] + [analysis]
+            if len(results) > self.max_entries:
+                matrix, results = matrix[1:], results[1:]
+            self._contexts[context_hash] = (matrix, results)
+            while len(self._contexts) > self.max_contexts:
+                self._contexts.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all cached reviews."""
+        with self._lock:
+            self._contexts.clear()
@@ -10,17 +10,16 @@ import json
 import datetime
 import logging
 import re
+import zipfile
+import tempfile
 from typing import List, Any, Dict, Optional
 from pathlib import Path
 
 from utils.code_utils import process_llm_response
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Library module: the application configures logging handlers
 logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
 
 class LLMInteractionLogger:
     """
@@ -327,10 +326,6 @@ class LLMInteractionLogger:
         Returns:
             Path to the exported ZIP file
         """
-        import zipfile
-        import tempfile
-        import shutil
-        
         # Use the specified directory or a temporary one
         if export_dir is None:
             export_dir = tempfile.mkdtemp()
@@ -0,0 +1,362 @@
+"""
+LLM Pool for Java Peer Review Training System.
+
+This module provides the LLMPool class which spreads calls over several
+identical model deployments, retrying with backoff and failing over to
+another deployment when one is rate limited or unavailable.
+"""
+
+import time
+import random
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Markers of provider rate-limit errors (e.g. Groq HTTP 429)
+_RATE_LIMIT_MARKERS = ("429", "rate limit", "rate_limit", "too many requests")
+
+
+def _is_rate_limit(error: Exception) -> bool:
+    """
+    Check whether an exception signals that the deployment is rate limited.
+
+    Args:
+        error: Exception raised by a model call
+
+    Returns:
+        True if the error is a rate-limit response
+    """
+    if "ratelimit" in type(error).__name__.lower():
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in _RATE_LIMIT_MARKERS)
+
+
+class LLMPool:
+    """
+    Routes LLM calls across a list of interchangeable models.
+
+    Exposes the invoke/ainvoke/stream/astream/batch/abatch methods used by the
+    domain classes, so a pool can be passed wherever a single model is.
+    Other attributes (temperature, model_name, ...) are read from the
+    first model in the pool.
+    """
+
+    def __init__(self, models: Sequence[Any], strategy: str = "least_busy", max_retries: int = 2,
+                 backoff: float = 0.5, cooldown: float = 30.0):
+        """
+        Initialize the pool.
+
+        Args:
+            models: Interchangeable language models to route between
+            strategy: "least_busy" or "round_robin"
+            max_retries: Extra rounds over the pool after every model has failed
+            backoff: Base delay in seconds between rounds, doubled each round
+            cooldown: Seconds a rate-limited model is skipped while others are available
+        """
+        if not models:
+            raise ValueError("LLMPool requires at least one model")
+        if strategy not in ("least_busy", "round_robin"):
+            raise ValueError(f"Unknown routing strategy: {strategy}")
+        self.models = list(models)
+        self.strategy = strategy
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self._in_flight = [0] * len(self.models)
+        self._cooling_until = [0.0] * len(self.models)
+        self._next = 0
+        self._lock = threading.Lock()
+
+    @property
+    def primary(self) -> Any:
+        """First model of the pool, used to describe the pool as a whole."""
+        return self.models[0]
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes the pool itself does not define
+        if name.startswith("__") or name == "models":
+            raise AttributeError(name)
+        return getattr(self.models[0], name)
+
+    def __len__(self) -> int:
+        return len(self.models)
+
+    def map(self, fn: Callable[[Any], Any]) -> "LLMPool":
+        """
+        Build a pool with the same routing settings over transformed models.
+
+        Args:
+            fn: Function applied to every model
+
+        Returns:
+            New pool
+        """
+        return LLMPool([fn(model) for model in self.models], strategy=self.strategy,
+                       max_retries=self.max_retries, backoff=self.backoff, cooldown=self.cooldown)
+
+    def bind(self, **kwargs: Any) -> "LLMPool":
+        """Bind call arguments to every model of the pool."""
+        return self.map(lambda model: model.bind(**kwargs))
+
+    def model_copy(self, update: Optional[Dict[str, Any]] = None) -> "LLMPool":
+        """Copy every model of the pool with updated fields."""
+        return self.map(lambda model: (getattr(model, "model_copy", None) or model.copy)(update=update))
+
+    copy = model_copy
+
+    def _candidates(self) -> List[int]:
+        """
+        Order the models by routing preference.
+
+        Returns:
+            Model indices, models cooling down after a rate limit last
+        """
+        with self._lock:
+            start = self._next
+            self._next = (self._next + 1) % len(self.models)
+            indices = [(start + i) % len(self.models) for i in range(len(self.models))]
+            if self.strategy == "least_busy":
+                indices.sort(key=lambda i: self._in_flight[i])
+            now = time.monotonic()
+            return sorted(indices, key=lambda i: self._cooling_until[i] > now)
+
+    def _acquire(self, index: int) -> None:
+        with self._lock:
+            self._in_flight[index] += 1
+
+    def _release(self, index: int, error: Optional[Exception] = None) -> None:
+        with self._lock:
+            self._in_flight[index] -= 1
+            if error is not None and _is_rate_limit(error):
+                self._cooling_until[index] = time.monotonic() + self.cooldown
+        if error is not None:
+            logger.warning(f"LLM pool member {index} failed: {str(error)}")
+
+    def _delay(self, attempt: int) -> float:
+        """Backoff delay before the given retry round, with jitter."""
+        return self.backoff * (2 ** attempt) * (0.5 + random.random())
+
+    def _attempts(self) -> Iterator[Tuple[int, int]]:
+        """
+        Yield (round, model index) pairs in the order they should be tried.
+
+        Yields:
+            Round number and model index
+        """
+        for attempt in range(self.max_retries + 1):
+            for index in self._candidates():
+                yield attempt, index
+
+    def invoke(self, input: Any, config: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Any:
+        """
+        Call a model of the pool, failing over and retrying on errors.
+
+        Args:
+            input: Prompt or messages
+            config: Optional runnable config
+            **kwargs: Extra model call arguments
+
+        Returns:
+            Model response
+        """
+        last_error = None
+        current_round = 0
+        for attempt, index in self._attempts():
+            if attempt != current_round:
+                current_round = attempt
+                time.sleep(self._delay(attempt - 1))
+            self._acquire(index)
+            try:
+                result = self.models[index].invoke(input, config, **kwargs)
+            except Exception as e:
+                self._release(index, e)
+                last_error = e
+                continue
+            self._release(index)
+            return result
+        raise last_error
+
+    async def ainvoke(self, input: Any, config: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Any:
+        """
+        Asynchronously call a model of the pool, failing over and retrying on errors.
+
+        Args:
+            input: Prompt or messages
+            config: Optional runnable config
+            **kwargs: Extra model call arguments
+
+        Returns:
+            Model response
+        """
+        last_error = None
+        current_round = 0
+        for attempt, index in self._attempts():
+            if attempt != current_round:
+                current_round = attempt
+                await asyncio.sleep(self._delay(attempt - 1))
+            self._acquire(index)
+            try:
+                result = await self.models[index].ainvoke(input, config, **kwargs)
+            except Exception as e:
+                self._release(index, e)
+                last_error = e
+                continue
+            self._release(index)
+            return result
+        raise last_error
+
+    def stream(self, input: Any, config: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Iterator[Any]:
+        """
+        Stream from a model of the pool.
+
+        Fails over only until the first chunk arrives; later errors are
+        raised so callers never receive a mix of two responses.
+
+        Args:
+            input: Prompt or messages
+            config: Optional runnable config
+            **kwargs: Extra model call arguments
+
+        Yields:
+            Response chunks
+        """
+        last_error = None
+        current_round = 0
+        for attempt, index in self._attempts():
+            if attempt != current_round:
+                current_round = attempt
+                time.sleep(self._delay(attempt - 1))
+            started = False
+            error = None
+            self._acquire(index)
+            try:
+                for chunk in self.models[index].stream(input, config, **kwargs):
+                    started = True
+                    yield chunk
+            except Exception as e:
+                error = e
+                if started:
+                    raise
+                last_error = e
+                continue
+            finally:
+                # Also runs when the consumer stops early (GeneratorExit)
+                self._release(index, error)
+            return
+        raise last_error
+
+    async def astream(self, input: Any, config: Optional[Dict[str, Any]] = None, **kwargs: Any) -> AsyncIterator[Any]:
+        """
+        Asynchronously stream from a model of the pool.
+
+        Args:
+            input: Prompt or messages
+            config: Optional runnable config
+            **kwargs: Extra model call arguments
+
+        Yields:
+            Response chunks
+        """
+        last_error = None
+        current_round = 0
+        for attempt, index in self._attempts():
+            if attempt != current_round:
+                current_round = attempt
+                await asyncio.sleep(self._delay(attempt - 1))
+            started = False
+            error = None
+            self._acquire(index)
+            try:
+                async for chunk in self.models[index].astream(input, config, **kwargs):
+                    started = True
+                    yield chunk
+            except Exception as e:
+                error = e
+                if started:
+                    raise
+                last_error = e
+                continue
+            finally:
+                # Also runs when the consumer stops early (GeneratorExit)
+                self._release(index, error)
+            return
+        raise last_error
+
+    def batch_as_completed(self, inputs: Sequence[Any], config: Optional[Dict[str, Any]] = None,
+                           *, return_exceptions: bool = False, **kwargs: Any) -> Iterator[Tuple[int, Any]]:
+        """
+        Run several calls concurrently across the pool, yielding them as they finish.
+
+        Args:
+            inputs: Prompts or message lists
+            config: Optional runnable config; max_concurrency caps parallel calls
+            return_exceptions: Yield exceptions instead of raising them
+            **kwargs: Extra model call arguments
+
+        Yields:
+            Tuples of (input index, response)
+        """
+        if not inputs:
+            return
+        max_workers = (config or {}).get("max_concurrency") or len(inputs)
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(inputs))) as executor:
+            futures = {executor.submit(self.invoke, item, None, **kwargs): i for i, item in enumerate(inputs)}
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result()
+                except Exception as e:
+                    if not return_exceptions:
+                        raise
+                    yield futures[future], e
+
+    def batch(self, inputs: Sequence[Any], config: Optional[Dict[str, Any]] = None,
+              *, return_exceptions: bool = False, **kwargs: Any) -> List[Any]:
+        """
+        Run several calls concurrently across the pool.
+
+        Args:
+            inputs: Prompts or message lists
+            config: Optional runnable config; max_concurrency caps parallel calls
+            return_exceptions: Return exceptions in place of failed responses
+            **kwargs: Extra model call arguments
+
+        Returns:
+            Responses in input order
+        """
+        results = [None] * len(inputs)
+        for i, result in self.batch_as_completed(inputs, config, return_exceptions=return_exceptions, **kwargs):
+            results[i] = result
+        return results
+
+    async def abatch(self, inputs: Sequence[Any], config: Optional[Dict[str, Any]] = None,
+                     *, return_exceptions: bool = False, **kwargs: Any) -> List[Any]:
+        """
+        Asynchronously run several calls concurrently across the pool.
+
+        Every input goes through ainvoke, so each call is routed, retried
+        and failed over on its own.
+
+        Args:
+            inputs: Prompts or message lists
+            config: Optional runnable config; max_concurrency caps parallel calls
+            return_exceptions: Return exceptions in place of failed responses
+            **kwargs: Extra model call arguments
+
+        Returns:
+            Responses in input order
+        """
+        max_concurrency = (config or {}).get("max_concurrency")
+        semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+        async def call(item: Any) -> Any:
+            if semaphore is None:
+                return await self.ainvoke(item, None, **kwargs)
+            async with semaphore:
+                return await self.ainvoke(item, None, **kwargs)
+
+        return list(await asyncio.gather(*(call(item) for item in inputs), return_exceptions=return_exceptions))
@@ -0,0 +1,28 @@
+"""
+Logging setup for Java Peer Review Training System.
+
+Library modules only create their loggers; the application calls
+configure_logging once at startup to decide where records go.
+"""
+
+import logging
+
+# Format used by the application's log output
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+def configure_logging(level: int = logging.INFO) -> None:
+    """
+    Send log records to stderr with the application's format.
+
+    Calling it again only updates the level, so handlers are never duplicated.
+
+    Args:
+        level: Minimum level of the records to output
+    """
+    root = logging.getLogger()
+    root.setLevel(level)
+    if root.handlers:
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    root.addHandler(handler)
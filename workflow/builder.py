@@ -6,6 +6,9 @@ the LangGraph workflow graph with appropriate nodes and edges.
 """
 
 import logging
+import threading
+from typing import Callable, Optional
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
 
 from state_schema import WorkflowState
@@ -15,6 +18,24 @@ from workflow.conditions import WorkflowConditions
 # Configure logging
 logger = logging.getLogger(__name__)
 
+
+def _node(nodes: WorkflowNodes, name: str, async_name: Optional[str] = None) -> Callable:
+    """
+    Build a graph node from WorkflowNodes methods.
+    
+    Args:
+        nodes: Workflow nodes the graph runs
+        name: Name of the node method
+        async_name: Optional name of its coroutine variant
+        
+    Returns:
+        Bound node method, or a runnable with both variants
+    """
+    call = getattr(nodes, name)
+    if async_name is None:
+        return call
+    return RunnableLambda(call, afunc=getattr(nodes, async_name), name=name)
+
 class GraphBuilder:
     """
     Builder for the Java Code Review workflow graph.
@@ -23,17 +44,37 @@ class GraphBuilder:
     nodes and edges, including conditional edges.
     """
     
-    def __init__(self, workflow_nodes: WorkflowNodes):
+    def __init__(self, workflow_nodes: WorkflowNodes, fused_eval_regen: bool = False):
         """
         Initialize the graph builder with workflow nodes.
         
         Args:
             workflow_nodes: WorkflowNodes instance containing node handlers
+            fused_eval_regen: Whether evaluation and regeneration share one LLM call
         """
         self.workflow_nodes = workflow_nodes
+        self.fused_eval_regen = fused_eval_regen
         self.conditions = WorkflowConditions()
+        self._graph: Optional[StateGraph] = None
+        self._graph_lock = threading.Lock()
     
     def build_graph(self) -> StateGraph:
+        """
+        Get the LangGraph workflow.
+        
+        The graph's nodes are bound to this builder's workflow nodes, so it
+        is self-contained; it is built once per builder and reused, and the
+        workflow manager holding the builder is itself shared between sessions.
+        
+        Returns:
+            StateGraph: The constructed workflow graph
+        """
+        with self._graph_lock:
+            if self._graph is None:
+                self._graph = self._construct_graph()
+        return self._graph
+    
+    def _construct_graph(self) -> StateGraph:
         """
         Build the complete LangGraph workflow.
         
@@ -67,12 +108,19 @@ class GraphBuilder:
         Args:
             workflow: StateGraph to add nodes to
         """
-        # Define main workflow nodes
-        workflow.add_node("generate_code", self.workflow_nodes.generate_code_node)
-        workflow.add_node("evaluate_code", self.workflow_nodes.evaluate_code_node)
-        workflow.add_node("regenerate_code", self.workflow_nodes.regenerate_code_node)
-        workflow.add_node("review_code", self.workflow_nodes.review_code_node)
-        workflow.add_node("analyze_review", self.workflow_nodes.analyze_review_node)
+        nodes = self.workflow_nodes
+        
+        # Define main workflow nodes; LLM-bound nodes carry a coroutine variant
+        # that the compiled graph awaits when it is run with ainvoke
+        workflow.add_node("generate_code", _node(nodes, "generate_code_node", "agenerate_code_node"))
+        if self.fused_eval_regen:
+            # A single node evaluates the code and applies corrections
+            workflow.add_node("evaluate_code", _node(nodes, "evaluate_and_regenerate_node"))
+        else:
+            workflow.add_node("evaluate_code", _node(nodes, "evaluate_code_node", "aevaluate_code_node"))
+            workflow.add_node("regenerate_code", _node(nodes, "regenerate_code_node", "aregenerate_code_node"))
+        workflow.add_node("review_code", _node(nodes, "review_code_node"))
+        workflow.add_node("analyze_review", _node(nodes, "analyze_review_node", "aanalyze_review_node"))
         
         logger.debug("Added all nodes to workflow graph")
     
@@ -85,7 +133,8 @@ class GraphBuilder:
         """
         # Add direct edges between nodes
         workflow.add_edge("generate_code", "evaluate_code")
-        workflow.add_edge("regenerate_code", "evaluate_code")
+        if not self.fused_eval_regen:
+            workflow.add_edge("regenerate_code", "evaluate_code")
         workflow.add_edge("review_code", "analyze_review")
         workflow.add_edge("generate_summary", END)
         
@@ -103,7 +152,8 @@ class GraphBuilder:
             "evaluate_code",
             self.conditions.should_regenerate_or_review,
             {
-                "regenerate_code": "regenerate_code",
+                # The fused node re-evaluates its own corrected code
+                "regenerate_code": "evaluate_code" if self.fused_eval_regen else "regenerate_code",
                 "review_code": "review_code"
             }
         )
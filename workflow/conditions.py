@@ -20,6 +20,9 @@ class WorkflowConditions:
     the next step in the workflow based on the current state.
     """
     
+    # Stateless: instances carry no attributes
+    __slots__ = ()
+    
     @staticmethod
     def should_regenerate_or_review(state: WorkflowState) -> str:
         """
@@ -33,9 +36,10 @@ class WorkflowConditions:
             "regenerate_code" if we need to regenerate code based on evaluation feedback
             "review_code" if the code is valid or we've reached max attempts
         """
-        logger.debug(f"Deciding workflow path with state: step={state.current_step}, "
-                f"valid={state.evaluation_result and state.evaluation_result.get('valid', False)}, "
-                f"attempts={getattr(state, 'evaluation_attempts', 0)}/{getattr(state, 'max_evaluation_attempts', 3)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Deciding workflow path with state: step={state.current_step}, "
+                    f"valid={state.evaluation_result and state.evaluation_result.get('valid', False)}, "
+                    f"attempts={getattr(state, 'evaluation_attempts', 0)}/{getattr(state, 'max_evaluation_attempts', 3)}")
         
         # Check if current step is explicitly set to regenerate
         if state.current_step == "regenerate":
@@ -60,11 +64,13 @@ class WorkflowConditions:
         # If we need regeneration and haven't reached max attempts, regenerate
         if needs_regeneration and current_attempts < max_attempts:
             reason = "missing errors" if has_missing_errors else "extra errors"
-            logger.info(f"Path decision: regenerate_code (found {reason})")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(f"Path decision: regenerate_code (found {reason})")
             return "regenerate_code"
         
         # If we've reached max attempts or don't need regeneration, move to review
-        logger.info(f"Path decision: review_code (attempts: {current_attempts}/{max_attempts})")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"Path decision: review_code (attempts: {current_attempts}/{max_attempts})")
         return "review_code"
     
     @staticmethod
@@ -81,12 +87,14 @@ class WorkflowConditions:
             "continue_review" if more review iterations are needed
             "generate_summary" if the review is sufficient or max iterations reached
         """
-        logger.debug(f"Deciding review path with state: iteration={state.current_iteration}/{state.max_iterations}, "
-                   f"sufficient={state.review_sufficient}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Deciding review path with state: iteration={state.current_iteration}/{state.max_iterations}, "
+                       f"sufficient={state.review_sufficient}")
         
         # Check if we've reached max iterations
         if state.current_iteration > state.max_iterations:
-            logger.info(f"Review path decision: generate_summary (max iterations reached: {state.current_iteration})")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(f"Review path decision: generate_summary (max iterations reached: {state.current_iteration})")
             return "generate_summary"
         
         # Check if the review is sufficient
@@ -95,5 +103,6 @@ class WorkflowConditions:
             return "generate_summary"
         
         # Otherwise, continue reviewing
-        logger.info(f"Review path decision: continue_review (iteration {state.current_iteration}, not sufficient)")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"Review path decision: continue_review (iteration {state.current_iteration}, not sufficient)")
         return "continue_review"
\ No newline at end of file
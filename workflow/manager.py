@@ -6,13 +6,14 @@ all components of the workflow system.
 """
 
 import logging
+from functools import cached_property
 from typing import Dict, Any, List, Optional, Tuple
 import os
 
 from langgraph.graph import StateGraph
 from state_schema import WorkflowState, ReviewAttempt
 
-from data.json_error_repository import JsonErrorRepository
+from data.json_error_repository import JsonErrorRepository, get_repository
 
 from core.code_generator import CodeGenerator
 from core.student_response_evaluator import StudentResponseEvaluator
@@ -23,6 +24,7 @@ from workflow.node import WorkflowNodes
 from workflow.conditions import WorkflowConditions
 from workflow.builder import GraphBuilder
 
+from utils.llm_batch import BatchingLLMClient
 from utils.llm_logger import LLMInteractionLogger
 from utils.code_utils import generate_comparison_report
 
@@ -35,31 +37,34 @@ class WorkflowManager:
     This class integrates all components of the workflow system and provides
     a high-level API for interacting with the workflow.
     """
-    def __init__(self, llm_manager):
+    def __init__(self, llm_manager, error_repository: Optional[JsonErrorRepository] = None):
         """
         Initialize the workflow manager with the LLM manager.
         
+        The LLM connection check, the models and the domain objects that use
+        them are only set up when they are first needed.
+        
         Args:
             llm_manager: Manager for LLM models
+            error_repository: Optional already loaded error repository
         """
         self.llm_manager = llm_manager
         self.llm_logger = LLMInteractionLogger()
         
         # Initialize repositories
-        self.error_repository = JsonErrorRepository()
-        
-        # Initialize domain objects
-        self._initialize_domain_objects()
+        self.error_repository = error_repository or get_repository()
         
-        # Create workflow nodes and conditions
-        self.workflow_nodes = self._create_workflow_nodes()
+        # Conditions are stateless and need no LLM
         self.conditions = WorkflowConditions()
-        
-        # Build workflow graph
-        self.workflow = self._build_workflow_graph()
     
-    def _initialize_domain_objects(self) -> None:
-        """Initialize domain objects with appropriate LLMs."""
+    @cached_property
+    def _models(self) -> Dict[str, Any]:
+        """
+        Check the LLM connection and initialize the model of each role.
+        
+        Returns:
+            Models by role; all None if the connection failed
+        """
         logger.info("Initializing domain objects for workflow")
         
         # Determine provider and check connection
@@ -77,30 +82,71 @@ class WorkflowManager:
         else:
             logger.warning(f"Unknown provider: {provider}")
         
-        if connection_status:
-            # Initialize models for different functions
-            generative_model = self._initialize_model_for_role("GENERATIVE")
-            review_model = self._initialize_model_for_role("REVIEW")
-            summary_model = self._initialize_model_for_role("SUMMARY")
-            
-            # Initialize domain objects with models
-            self.code_generator = CodeGenerator(generative_model, self.llm_logger)
-            self.code_evaluation = CodeEvaluationAgent(generative_model, self.llm_logger)
-            self.evaluator = StudentResponseEvaluator(review_model, llm_logger=self.llm_logger)
-            self.feedback_manager = FeedbackManager(self.evaluator)
-            
-            # Store feedback models for generating final feedback
-            self.summary_model = summary_model
-            
-            logger.info("Domain objects initialized with LLM models")
-        else:
+        if not connection_status:
             # Initialize without LLMs if connection fails
             logger.warning(f"LLM connection failed. Initializing without LLMs.")
-            self.code_generator = CodeGenerator(llm_logger=self.llm_logger)
-            self.code_evaluation = CodeEvaluationAgent(llm_logger=self.llm_logger)
-            self.evaluator = StudentResponseEvaluator(llm_logger=self.llm_logger)
-            self.feedback_manager = FeedbackManager(self.evaluator)
-            self.summary_model = None
+            return {"GENERATIVE": None, "REVIEW": None, "SUMMARY": None}
+        
+        # Initialize models for different functions
+        models = {role: self._initialize_model_for_role(role) for role in ("GENERATIVE", "REVIEW", "SUMMARY")}
+        logger.info("Domain objects initialized with LLM models")
+        return models
+    
+    @property
+    def llm_unavailable(self) -> bool:
+        """True once the connection check has failed and the manager runs without LLMs."""
+        models = self.__dict__.get("_models")
+        return models is not None and all(model is None for model in models.values())
+    
+    @cached_property
+    def code_generator(self) -> CodeGenerator:
+        """Code generator, created on first use."""
+        return CodeGenerator(self._models["GENERATIVE"], self.llm_logger)
+    
+    @cached_property
+    def code_evaluation(self) -> CodeEvaluationAgent:
+        """Code evaluation agent, created on first use."""
+        return CodeEvaluationAgent(self._batched(self._models["GENERATIVE"]), self.llm_logger)
+    
+    @cached_property
+    def evaluator(self) -> StudentResponseEvaluator:
+        """Student response evaluator, created on first use."""
+        return StudentResponseEvaluator(self._models["REVIEW"], llm_logger=self.llm_logger)
+    
+    @property
+    def summary_model(self):
+        """Model generating the final feedback, or None without an LLM connection."""
+        return self._models["SUMMARY"]
+    
+    @cached_property
+    def workflow_nodes(self) -> WorkflowNodes:
+        """Workflow nodes, created with the domain objects on first use."""
+        return self._create_workflow_nodes()
+    
+    @cached_property
+    def workflow(self) -> StateGraph:
+        """Workflow graph, built on first use."""
+        return self._build_workflow_graph()
+    
+    @staticmethod
+    def _batched(llm):
+        """
+        Wrap a model so concurrent async calls are sent in batches, if enabled.
+        
+        Only worth enabling for a model whose abatch uses a provider batch
+        endpoint; otherwise the batching window just delays each call.
+        
+        Args:
+            llm: Language model or None
+            
+        Returns:
+            BatchingLLMClient when LLM_BATCH_WINDOW_MS is set, otherwise the model itself
+        """
+        window_ms = float(os.getenv("LLM_BATCH_WINDOW_MS", "0"))
+        if llm is None or window_ms <= 0:
+            return llm
+        max_concurrency = int(os.getenv("LLM_BATCH_MAX_CONCURRENCY", "0")) or None
+        return BatchingLLMClient(llm, window=window_ms / 1000, max_concurrency=max_concurrency)
     
     def _initialize_model_for_role(self, role: str):
         """
@@ -139,12 +185,13 @@ class WorkflowManager:
             self.code_generator,
             self.code_evaluation,
             self.error_repository,
-            self.llm_logger
+            self.llm_logger,
+            parallel_evaluation=os.getenv("PARALLEL_EVALUATION", "false").lower() == "true",
+            evaluator=self.evaluator,  # Needed for analyze_review_node
+            # Candidates multiply generation calls, so more than one must be requested explicitly
+            generation_candidates=int(os.getenv("GENERATION_CANDIDATES", "1"))
         )
         
-        # Attach evaluator to nodes (needed for analyze_review_node)
-        nodes.evaluator = self.evaluator
-        
         return nodes
     
     def _build_workflow_graph(self) -> StateGraph:
@@ -156,7 +203,8 @@ class WorkflowManager:
             StateGraph: The constructed workflow graph
         """
         logger.info("Building workflow graph")
-        self.graph_builder = GraphBuilder(self.workflow_nodes)
+        fused_eval_regen = os.getenv("FUSED_EVAL_REGEN", "false").lower() == "true"
+        self.graph_builder = GraphBuilder(self.workflow_nodes, fused_eval_regen=fused_eval_regen)
         return self.graph_builder.build_graph()
     
     def get_all_error_categories(self) -> Dict[str, List[str]]:
@@ -166,15 +214,19 @@ class WorkflowManager:
         Returns:
             Dictionary with 'build' and 'checkstyle' categories
         """
-        return self.error_repository.get_all_categories()
+        # The repository shares read-only tuples; hand out fresh lists as documented
+        categories = self.error_repository.get_all_categories()
+        return {error_type: list(names) for error_type, names in categories.items()}
     
-    def submit_review(self, state: WorkflowState, student_review: str) -> WorkflowState:
+    def submit_review(self, state: WorkflowState, student_review: str,
+                      analysis: Optional[Dict[str, Any]] = None) -> WorkflowState:
         """
         Submit a student review and update the state.
         
         Args:
             state: Current workflow state
             student_review: The student's review text
+            analysis: Optional previously computed analysis to reuse instead of calling the LLM
             
         Returns:
             Updated workflow state with analysis
@@ -191,9 +243,10 @@ class WorkflowManager:
         
         # Add to review history
         state.review_history.append(review_attempt)
+        state.latest_review = review_attempt
         
         # Run the state through the analyze_review node
-        updated_state = self.workflow_nodes.analyze_review_node(state)
+        updated_state = self.workflow_nodes.analyze_review_node(state, analysis=analysis)
         
         # Check if this is the last iteration or review is sufficient
         if (updated_state.current_iteration > updated_state.max_iterations or 
@@ -211,12 +264,10 @@ class WorkflowManager:
             state: Current workflow state
         """
         # Check if we have review history
-        if not state.review_history:
+        latest_review = state.latest_review
+        if latest_review is None:
             logger.warning("No review history found for generating feedback")
             return
-            
-        # Get latest review
-        latest_review = state.review_history[-1]
         
         # Generate comparison report if not already generated
         if not state.comparison_report and state.evaluation_result:
@@ -268,16 +319,18 @@ class WorkflowManager:
         if not state.review_summary and self.summary_model and state.code_snippet:
             try:
                 logger.info("Generating review summary with LLM")
-                # Prepare the feedback manager with the current state
-                self.feedback_manager.code_snippet = state.code_snippet.code
+                # Prepare a feedback manager for this state; the workflow manager is
+                # shared between sessions, so it must not hold per-session data
+                feedback_manager = FeedbackManager(self.evaluator)
+                feedback_manager.code_snippet = state.code_snippet.code
                 if state.evaluation_result:
-                    self.feedback_manager.known_problems = state.evaluation_result.get('found_errors', [])
-                self.feedback_manager.review_history = []
+                    feedback_manager.known_problems = state.evaluation_result.get('found_errors', [])
+                feedback_manager.review_history = []
                 
                 # Get the original error count
                 original_error_count = state.original_error_count
                 if original_error_count > 0:
-                    self.feedback_manager.original_error_count = original_error_count
+                    feedback_manager.original_error_count = original_error_count
                 
                 # Add review history to feedback manager
                 for review in state.review_history:
@@ -290,7 +343,7 @@ class WorkflowManager:
                         review.analysis["identified_percentage"] = (identified_count / original_error_count) * 100
                         review.analysis["accuracy_percentage"] = (identified_count / original_error_count) * 100
                     
-                    self.feedback_manager.review_history.append(
+                    feedback_manager.review_history.append(
                         FeedbackManager.ReviewIteration(
                             iteration_number=review.iteration_number,
                             student_review=review.student_review,
@@ -300,7 +353,7 @@ class WorkflowManager:
                     )
                 
                 # Generate the final feedback
-                state.review_summary = self.feedback_manager.generate_final_feedback(
+                state.review_summary = feedback_manager.generate_final_feedback(
                     llm=self.summary_model,
                     include_resources=True,
                     include_visualizations=True
@@ -5,17 +5,65 @@ This module contains the node implementations for the LangGraph workflow,
 separating node logic from graph construction for better maintainability.
 """
 
+import asyncio
 import logging
-import re
+from collections import defaultdict
+from functools import lru_cache
 from typing import Dict, Any, List, Tuple, Optional
 
 from state_schema import WorkflowState, CodeSnippet
-from utils.code_utils import extract_both_code_versions, create_regeneration_prompt, get_error_count_from_state
+from utils.code_utils import extract_both_code_versions, create_regeneration_prompt
+from utils.code_utils import get_error_count_for_difficulty as _raw_count
 import random
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Default error count per difficulty level; only a handful of levels exist
+_count = lru_cache(maxsize=8)(_raw_count)
+
+# Domains used when the code generator does not provide its own
+_DEFAULT_DOMAINS = (
+    "user_management", "file_processing", "data_validation",
+    "calculation", "inventory_system", "notification_service",
+    "logging", "banking", "e-commerce", "student_management"
+)
+
+# Opening fence of the clean code version, which the model writes last
+_CLEAN_FENCE = "```java-clean"
+
+
+def _clean_block_closed(text: str) -> bool:
+    """
+    Check whether a response already holds the complete clean code block.
+    
+    Args:
+        text: Response text received so far
+        
+    Returns:
+        True once the java-clean block has its closing fence
+    """
+    start = text.find(_CLEAN_FENCE)
+    return start >= 0 and text.find("```", start + len(_CLEAN_FENCE)) >= 0
+
+
+def _partition_by_type(errors: List[Dict[str, Any]], fold_case: bool = False) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Split errors into build and checkstyle lists in a single pass.
+    
+    Args:
+        errors: Errors with a "type" field
+        fold_case: Whether the type is compared case-insensitively
+        
+    Returns:
+        Dictionary with 'build' and 'checkstyle' error lists
+    """
+    buckets = defaultdict(list)
+    for error in errors:
+        error_type = error.get("type", "")
+        buckets[error_type.lower() if fold_case else error_type].append(error)
+    return {"build": buckets["build"], "checkstyle": buckets["checkstyle"]}
+
 class WorkflowNodes:
     """
     Node implementations for the Java Code Review workflow.
@@ -24,7 +72,13 @@ class WorkflowNodes:
     in the LangGraph workflow, extracted for better separation of concerns.
     """
     
-    def __init__(self, code_generator, code_evaluation, error_repository, llm_logger):
+    __slots__ = (
+        'code_generator', 'code_evaluation', 'error_repository', 'llm_logger',
+        'parallel_evaluation', 'evaluator', 'generation_candidates', '_generate_improved_prompt'
+    )
+    
+    def __init__(self, code_generator, code_evaluation, error_repository, llm_logger,
+                 parallel_evaluation: bool = False, evaluator=None, generation_candidates: int = 1):
         """
         Initialize workflow nodes with required components.
         
@@ -33,11 +87,19 @@ class WorkflowNodes:
             code_evaluation: Component for evaluating generated code quality
             error_repository: Repository for accessing Java error data
             llm_logger: Logger for tracking LLM interactions
+            parallel_evaluation: Whether each requested error is evaluated by its own concurrent LLM call
+            evaluator: Student response evaluator used by analyze_review_node
+            generation_candidates: Number of codes generated at once, keeping the first that passes evaluation
         """
         self.code_generator = code_generator
         self.code_evaluation = code_evaluation
         self.error_repository = error_repository
         self.llm_logger = llm_logger
+        self.parallel_evaluation = parallel_evaluation
+        self.evaluator = evaluator
+        self.generation_candidates = max(1, generation_candidates)
+        # Bound once: evaluation agents without it get the generic regeneration prompt
+        self._generate_improved_prompt = getattr(code_evaluation, 'generate_improved_prompt', None)
     
     def generate_code_node(self, state: WorkflowState) -> WorkflowState:
         """
@@ -50,121 +112,305 @@ class WorkflowNodes:
         Returns:
             Updated workflow state with generated code
         """
+        # Guard the error selection and LLM call; storing the result does not raise
         try:
-            # Get parameters from state
-            code_length = state.code_length
-            difficulty_level = state.difficulty_level
-            selected_error_categories = state.selected_error_categories
-            selected_specific_errors = state.selected_specific_errors
-            
-            # Reset state for a fresh generation
-            state.evaluation_attempts = 0
-            state.evaluation_result = None
-            state.code_generation_feedback = None
+            selection = self._prepare_generation(state)
+            if selection is None:
+                return state
+            selected_errors, original_error_count = selection
+            
+            evaluation = None
+            if self.generation_candidates > 1:
+                response, evaluation = self._generate_candidates(state, selected_errors)
+            else:
+                # Generate code with selected errors - ensure clear expectations for the LLM
+                # Explicitly include the count in the prompt to emphasize the requirement
+                response = self.code_generator._generate_with_llm(
+                    code_length=state.code_length,
+                    difficulty_level=state.difficulty_level,
+                    selected_errors=selected_errors,
+                    domain=state.domain  # Use domain from state
+                )
+                    
+        except Exception as e:           
+            logger.error("Error generating code: %s", e, exc_info=True)
+            state.error = f"Error generating code: {str(e)}"
+            return state
+        
+        return self._apply_generation(state, response, selected_errors, original_error_count, evaluation)
+    
+    async def agenerate_code_node(self, state: WorkflowState) -> WorkflowState:
+        """
+        Asynchronously generate Java code with errors based on selected parameters.
+        
+        Args:
+            state: Current workflow state
+            
+        Returns:
+            Updated workflow state with generated code
+        """
+        try:
+            selection = self._prepare_generation(state)
+            if selection is None:
+                return state
+            selected_errors, original_error_count = selection
+            
+            evaluation = None
+            if self.generation_candidates > 1:
+                response, evaluation = await self._agenerate_candidates(state, selected_errors)
+            else:
+                response = await self.code_generator._agenerate_with_llm(
+                    code_length=state.code_length,
+                    difficulty_level=state.difficulty_level,
+                    selected_errors=selected_errors,
+                    domain=state.domain
+                )
+            
+        except Exception as e:
+            logger.error("Error generating code: %s", e, exc_info=True)
+            state.error = f"Error generating code: {str(e)}"
+            return state
+        
+        return self._apply_generation(state, response, selected_errors, original_error_count, evaluation)
+    
+    def _prepare_generation(self, state: WorkflowState) -> Optional[Tuple[List[Dict[str, Any]], int]]:
+        """
+        Reset the state for a fresh generation and select the errors to inject.
+        
+        Args:
+            state: Current workflow state
+            
+        Returns:
+            Tuple of (selected errors, original error count), or None if the
+            selection is invalid (state.error is set)
+        """
+        # Get parameters from state
+        difficulty_level = state.difficulty_level
+        selected_error_categories = state.selected_error_categories
+        selected_specific_errors = state.selected_specific_errors
+        
+        # Reset state for a fresh generation
+        state.evaluation_attempts = 0
+        state.evaluation_result = None
+        state.code_generation_feedback = None
 
-             # Randomly select a domain if not already set
-            if not state.domain:
-                # Use the domains from code_generator if available
-                if hasattr(self.code_generator, 'domains') and self.code_generator.domains:
-                    state.domain = random.choice(self.code_generator.domains)
-                else:
-                    # Default domains if not available in code_generator
-                    domains = [
-                        "user_management", "file_processing", "data_validation", 
-                        "calculation", "inventory_system", "notification_service",
-                        "logging", "banking", "e-commerce", "student_management"
-                    ]
-                    state.domain = random.choice(domains)
+         # Randomly select a domain if not already set
+        if not state.domain:
+            # Use the domains from code_generator if available
+            if self.code_generator.domains:
+                state.domain = random.choice(self.code_generator.domains)
+            else:
+                # Default domains if not available in code_generator
+                state.domain = random.choice(_DEFAULT_DOMAINS)
+            
+            logger.info("Selected domain for code generation: %s", state.domain)            
+        
+        # Determine whether we're using specific errors or categories
+        using_specific_errors = len(selected_specific_errors) > 0
+        
+        # Get appropriate errors based on selection mode
+        if using_specific_errors:
+            # Using specific errors mode - IMPORTANT: Use the exact selected errors without modification
+            if not selected_specific_errors:
+                state.error = "No specific errors selected. Please select at least one error before generating code."
+                return None
                 
-                logger.info(f"Selected domain for code generation: {state.domain}")            
+            logger.info("Using specific errors mode with %s errors", len(selected_specific_errors))
+            # Use the selected errors directly without applying count filtering
+            selected_errors = selected_specific_errors
+            # Store the original requested error count
+            original_error_count = len(selected_errors)
+        else:
+            # Using category-based selection mode
+            if not selected_error_categories or (
+                not selected_error_categories.get("build", []) and 
+                not selected_error_categories.get("checkstyle", [])
+            ):
+                state.error = "No error categories selected. Please select at least one error category before generating code."
+                return None
+                        
+            logger.info("Using category-based mode with categories: %s", selected_error_categories)
             
-            # Determine whether we're using specific errors or categories
-            using_specific_errors = len(selected_specific_errors) > 0
+            # Get exact number based on difficulty
+            required_error_count = _count(difficulty_level)
             
-            # Get appropriate errors based on selection mode
-            if using_specific_errors:
-                # Using specific errors mode - IMPORTANT: Use the exact selected errors without modification
-                if not selected_specific_errors:
-                    state.error = "No specific errors selected. Please select at least one error before generating code."
-                    return state
-                    
-                logger.info(f"Using specific errors mode with {len(selected_specific_errors)} errors")
-                # Use the selected errors directly without applying count filtering
-                selected_errors = selected_specific_errors
-                # Store the original requested error count
+            selected_errors, _ = self.error_repository.get_errors_for_llm(
+                selected_categories=selected_error_categories,
+                count=required_error_count,
+                difficulty=difficulty_level
+            )
+            
+            # Make sure we have the right number of errors
+            if len(selected_errors) < required_error_count:
+                logger.warning("Got fewer errors (%s) than requested (%s)", len(selected_errors), required_error_count)
+                # Don't modify the count in this case - use what we have
                 original_error_count = len(selected_errors)
+            elif len(selected_errors) > required_error_count:
+                logger.warning("Got more errors (%s) than requested (%s)", len(selected_errors), required_error_count)
+                # Trim to exactly the required count
+                selected_errors = selected_errors[:required_error_count]
+                original_error_count = required_error_count
             else:
-                # Using category-based selection mode
-                if not selected_error_categories or (
-                    not selected_error_categories.get("build", []) and 
-                    not selected_error_categories.get("checkstyle", [])
-                ):
-                    state.error = "No error categories selected. Please select at least one error category before generating code."
-                    return state
-                            
-                logger.info(f"Using category-based mode with categories: {selected_error_categories}")
-                
-                # Get exact number based on difficulty
-                required_error_count = get_error_count_from_state(difficulty_level)
-                
-                selected_errors, _ = self.error_repository.get_errors_for_llm(
-                    selected_categories=selected_error_categories,
-                    count=required_error_count,
-                    difficulty=difficulty_level
-                )
-                
-                # Make sure we have the right number of errors
-                if len(selected_errors) < required_error_count:
-                    logger.warning(f"Got fewer errors ({len(selected_errors)}) than requested ({required_error_count})")
-                    # Don't modify the count in this case - use what we have
-                    original_error_count = len(selected_errors)
-                elif len(selected_errors) > required_error_count:
-                    logger.warning(f"Got more errors ({len(selected_errors)}) than requested ({required_error_count})")
-                    # Trim to exactly the required count
-                    selected_errors = selected_errors[:required_error_count]
-                    original_error_count = required_error_count
-                else:
-                    original_error_count = required_error_count
+                original_error_count = required_error_count
+        
+        # Log detailed information about selected errors for debugging
+        self._log_selected_errors(selected_errors)
+        logger.info("Final error count for generation: %s", len(selected_errors))
+        
+        return selected_errors, original_error_count
+    
+    def _generate_candidates(self, state: WorkflowState,
+                             selected_errors: List[Dict[str, Any]]) -> Tuple[Any, Optional[Dict[str, Any]]]:
+        """
+        Generate and evaluate several candidate codes at once.
+        
+        Candidates run on the async path so the ones still generating or
+        evaluating are cancelled once a candidate has been chosen. Must not
+        be called from a running event loop; use agenerate_code_node there.
+        
+        Args:
+            state: Current workflow state
+            selected_errors: Errors the code must contain
             
-            # Log detailed information about selected errors for debugging
-            self._log_selected_errors(selected_errors)
-            logger.info(f"Final error count for generation: {len(selected_errors)}")
+        Returns:
+            Tuple of (response, evaluation) of the chosen candidate
+        """
+        return asyncio.run(self._agenerate_candidates(state, selected_errors))
+    
+    async def _agenerate_candidates(self, state: WorkflowState,
+                                    selected_errors: List[Dict[str, Any]]) -> Tuple[Any, Optional[Dict[str, Any]]]:
+        """
+        Asynchronously generate and evaluate several candidate codes at once.
+        
+        Candidates are sampled at different temperatures; the first one whose
+        evaluation finds every requested error is kept and the others are
+        cancelled. If none passes, the candidate with the fewest missing errors is kept.
+        
+        Args:
+            state: Current workflow state
+            selected_errors: Errors the code must contain
             
-            # Generate code with selected errors - ensure clear expectations for the LLM
-            # Explicitly include the count in the prompt to emphasize the requirement
-            response = self.code_generator._generate_with_llm(
-                code_length=code_length,
-                difficulty_level=difficulty_level,
+        Returns:
+            Tuple of (response, evaluation) of the chosen candidate
+        """
+        requested_errors = self._flatten_errors(selected_errors)
+        
+        async def run(generator) -> Tuple[Any, Any]:
+            response = await generator._agenerate_with_llm(
+                code_length=state.code_length,
+                difficulty_level=state.difficulty_level,
                 selected_errors=selected_errors,
-                domain=state.domain  # Use domain from state
+                domain=state.domain
             )
+            annotated_code, _ = extract_both_code_versions(response)
+            return response, await self.code_evaluation.aevaluate_code(annotated_code, requested_errors)
+        
+        best = None
+        tasks = [asyncio.ensure_future(run(generator)) for generator in self._candidate_generators()]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    candidate = await next_done
+                except Exception as e:
+                    logger.warning("Generation candidate failed: %s", e)
+                    continue
+                best = self._better_candidate(best, candidate)
+                if self._missing_count(best[1]) == 0:
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Wait for the cancellations so no abandoned candidate keeps calling the LLM
+            await asyncio.gather(*tasks, return_exceptions=True)
+        
+        return self._chosen_candidate(best)
+    
+    def _candidate_generators(self) -> List[Any]:
+        """
+        Get one code generator per candidate, each sampling at its own temperature.
+        
+        Returns:
+            List of code generators
+        """
+        return [self.code_generator.with_temperature(round(0.7 + 0.1 * i, 1))
+                for i in range(self.generation_candidates)]
+    
+    @staticmethod
+    def _flatten_errors(selected_errors: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Build and checkstyle errors in the order evaluate_code_node requests them."""
+        raw_errors = _partition_by_type(selected_errors, fold_case=True)
+        return raw_errors["build"] + raw_errors["checkstyle"]
+    
+    @staticmethod
+    def _missing_count(evaluation: Any) -> float:
+        """Number of missing errors of an evaluation; unusable evaluations count as worst."""
+        if not isinstance(evaluation, dict):
+            return float("inf")
+        return len(evaluation.get("missing_errors", []))
+    
+    def _better_candidate(self, best: Optional[Tuple[Any, Any]], candidate: Tuple[Any, Any]) -> Tuple[Any, Any]:
+        """Keep the earlier candidate unless the new one misses fewer errors."""
+        if best is None or self._missing_count(candidate[1]) < self._missing_count(best[1]):
+            return candidate
+        return best
+    
+    @staticmethod
+    def _chosen_candidate(best: Optional[Tuple[Any, Any]]) -> Tuple[Any, Optional[Dict[str, Any]]]:
+        """
+        Unpack the chosen candidate.
+        
+        Args:
+            best: Chosen (response, evaluation) pair, or None if every candidate failed
+            
+        Returns:
+            Tuple of (response, evaluation); the evaluation is None if it is unusable
+        """
+        if best is None:
+            raise RuntimeError("All generation candidates failed")
+        response, evaluation = best
+        if not isinstance(evaluation, dict):
+            return response, None
+        logger.info("Chose generation candidate missing %s errors", len(evaluation.get('missing_errors', [])))
+        return response, evaluation
+    
+    def _apply_generation(self, state: WorkflowState, response: Any,
+                          selected_errors: List[Dict[str, Any]], original_error_count: int,
+                          candidate_evaluation: Optional[Dict[str, Any]] = None) -> WorkflowState:
+        """
+        Store the generated code in the state.
+        
+        Args:
+            state: Current workflow state
+            response: LLM response holding the generated code
+            selected_errors: Errors the code was asked to contain
+            original_error_count: Number of requested errors
+            candidate_evaluation: Evaluation already made for this code, if any
+            
+        Returns:
+            Updated workflow state with generated code
+        """
+        # Extract both annotated and clean versions
+        annotated_code, clean_code = extract_both_code_versions(response)
 
-            # Extract both annotated and clean versions
-            annotated_code, clean_code = extract_both_code_versions(response)
+        raw_errors = _partition_by_type(selected_errors, fold_case=True)
 
-            # Create code snippet object
-            code_snippet = CodeSnippet(
-                code=annotated_code,  # Store annotated version with error comments
-                clean_code=clean_code,  # Store clean version without error comments
-                raw_errors={
-                    "build": [e for e in selected_errors if e["type"].lower() == "build"],
-                    "checkstyle": [e for e in selected_errors if e["type"].lower() == "checkstyle"]
-                },
-                expected_error_count=original_error_count  # Store the original error count in the code snippet
-            )
-                                    
-            # Update state with the original error count for consistency
-            state.original_error_count = original_error_count
-            
-            # Update state
-            state.code_snippet = code_snippet
-            state.current_step = "evaluate"  # Set to evaluate instead of review to ensure proper workflow
-            return state
-                    
-        except Exception as e:           
-            logger.error(f"Error generating code: {str(e)}", exc_info=True)
-            state.error = f"Error generating code: {str(e)}"
-            return state
+        # Create code snippet object
+        code_snippet = CodeSnippet(
+            code=annotated_code,  # Store annotated version with error comments
+            clean_code=clean_code,  # Store clean version without error comments
+            raw_errors=raw_errors,
+            expected_error_count=original_error_count,  # Store the original error count in the code snippet
+            flat_requested_errors=raw_errors["build"] + raw_errors["checkstyle"],
+            candidate_evaluation=candidate_evaluation
+        )
+                                
+        # Update state with the original error count for consistency
+        state.original_error_count = original_error_count
+        
+        # Update state
+        state.code_snippet = code_snippet
+        state.current_step = "evaluate"  # Set to evaluate instead of review to ensure proper workflow
+        return state
 
     def regenerate_code_node(self, state: WorkflowState) -> WorkflowState:
         """
@@ -177,208 +423,433 @@ class WorkflowNodes:
             Updated workflow state with regenerated code
         """
         try:
-            logger.info(f"Starting enhanced code regeneration (Attempt {state.evaluation_attempts})")
-            
-            # Use the code generation feedback to generate improved code
-            feedback_prompt = state.code_generation_feedback
+            logger.info("Starting enhanced code regeneration (Attempt %s)", state.evaluation_attempts)
             
             # Generate code with feedback prompt
-            if hasattr(self.code_generator, 'llm') and self.code_generator.llm:
-                # Log the regeneration prompt before sending to LLM
-                metadata = {
-                    "code_length": state.code_length,
-                    "difficulty_level": state.difficulty_level,
-                    "domain":  state.domain,
-                    "selected_errors": state.selected_error_categories,
-                    "attempt": state.evaluation_attempts,
-                    "max_attempts": state.max_evaluation_attempts
-                }
-                
-                # Log the prompt before it's sent to the LLM
-                self.llm_logger.log_regeneration_prompt(feedback_prompt, metadata)
-                
-                # Generate the code
-                response = self.code_generator.llm.invoke(feedback_prompt)
-                
-                # Log the full regeneration with response
-                self.llm_logger.log_code_regeneration(feedback_prompt, response, metadata)
-                
-                # Process the response
-                annotated_code, clean_code = extract_both_code_versions(response)                
-                
-                # Get requested errors from state
-                requested_errors = self._extract_requested_errors(state)
+            if self.code_generator.llm:
+                # Use the code generation feedback to generate improved code
+                feedback_prompt, metadata = self._regeneration_request(state)
                 
-                # Create updated code snippet
-                state.code_snippet = CodeSnippet(
-                    code=annotated_code,
-                    clean_code=clean_code,
-                    raw_errors={
-                        "build": [e for e in requested_errors if e.get("type") == "build"],
-                        "checkstyle": [e for e in requested_errors if e.get("type") == "checkstyle"]
-                    }
-                )
-                
-                # Move to evaluation step again
-                state.current_step = "evaluate"
-                logger.info(f"Code regenerated successfully on attempt {state.evaluation_attempts}")
+                # Generate the code, stopping once the clean version is complete
+                response = self._stream_regeneration(feedback_prompt)
                 
-                return state
+                return self._apply_regeneration(state, feedback_prompt, response, metadata)
             else:
                 # If no LLM available, fall back to standard generation
                 logger.warning("No LLM available for regeneration. Falling back to standard generation.")
                 return self.generate_code_node(state)
             
         except Exception as e:                 
-            logger.error(f"Error regenerating code: {str(e)}", exc_info=True)
+            logger.error("Error regenerating code: %s", e, exc_info=True)
             state.error = f"Error regenerating code: {str(e)}"
             return state
-        
-    def evaluate_code_node(self, state: WorkflowState) -> WorkflowState:
+    
+    async def aregenerate_code_node(self, state: WorkflowState) -> WorkflowState:
         """
-        Evaluate generated code to ensure it contains the requested errors.
+        Asynchronously regenerate code based on evaluation feedback.
         
         Args:
             state: Current workflow state
             
         Returns:
-            Updated workflow state with evaluation results
+            Updated workflow state with regenerated code
         """
         try:
-            logger.info("Starting code evaluation node")
+            logger.info("Starting enhanced code regeneration (Attempt %s)", state.evaluation_attempts)
             
-            # Validate code snippet
-            if not state.code_snippet:
-                state.error = "No code snippet available for evaluation"
-                return state
-                    
-            # Get the code with annotations
-            code = state.code_snippet.code
+            if self.code_generator.llm:
+                feedback_prompt, metadata = self._regeneration_request(state, log_prompt=False)
+                # Write the prompt log in a thread while the model is generating
+                _, response = await asyncio.gather(
+                    asyncio.to_thread(self.llm_logger.log_regeneration_prompt, feedback_prompt, metadata),
+                    self._astream_regeneration(feedback_prompt)
+                )
+                return self._apply_regeneration(state, feedback_prompt, response, metadata)
+            else:
+                logger.warning("No LLM available for regeneration. Falling back to standard generation.")
+                return await self.agenerate_code_node(state)
             
-            # Get requested errors from state
-            requested_errors = self._extract_requested_errors(state)
-            requested_count = len(requested_errors)
-            
-            # Ensure we're using the original error count for consistency
-            original_error_count = state.original_error_count
-            if original_error_count == 0 and hasattr(state.code_snippet, 'expected_error_count'):
-                # If not set in state, try to get it from code snippet
-                original_error_count = state.code_snippet.expected_error_count
-                # Update state with this count
-                state.original_error_count = original_error_count
-                
-            # If we still don't have it, use the requested count
-            if original_error_count == 0:
-                original_error_count = requested_count
-                state.original_error_count = original_error_count
-                
-            logger.info(f"Evaluating code for {original_error_count} expected errors")
+        except Exception as e:
+            logger.error("Error regenerating code: %s", e, exc_info=True)
+            state.error = f"Error regenerating code: {str(e)}"
+            return state
+    
+    def _stream_regeneration(self, prompt: str) -> Any:
+        """
+        Stream a regeneration response, stopping once the clean code block has closed.
+        
+        Anything the model writes after the second code version is never
+        generated, so the code reaches evaluation earlier.
+        
+        Args:
+            prompt: Regeneration prompt
             
-            # Evaluate the code
-            raw_evaluation_result = self.code_evaluation.evaluate_code(
-                code, requested_errors
-            )
+        Returns:
+            Response text, or the invoke() response if streaming is unavailable
+        """
+        llm = self.code_generator.llm
+        parts = []
+        try:
+            for chunk in llm.stream(prompt):
+                content = chunk.content if hasattr(chunk, "content") else chunk
+                if isinstance(content, str):
+                    parts.append(content)
+                    if "`" in content and _clean_block_closed("".join(parts)):
+                        logger.debug("Clean code block complete, closing regeneration stream early")
+                        break
+        except Exception as e:
+            # Nothing received yet: the model may simply not support streaming
+            if not parts:
+                logger.warning("Streaming regeneration failed (%s), falling back to invoke", e)
+                return llm.invoke(prompt)
+            raise
+        return "".join(parts)
+    
+    async def _astream_regeneration(self, prompt: str) -> Any:
+        """
+        Asynchronously stream a regeneration response, stopping once the clean code block has closed.
+        
+        Args:
+            prompt: Regeneration prompt
             
-            # IMPORTANT: Ensure evaluation_result is a dictionary
-            if not isinstance(raw_evaluation_result, dict):
-                logger.error(f"Expected dict for evaluation_result, got {type(raw_evaluation_result)}")
-                # Create a default dictionary with the necessary structure
-                evaluation_result = {
-                    "found_errors": [],
-                    "missing_errors": [f"{error.get('type', '').upper()} - {error.get('name', '')}" 
-                                    for error in requested_errors],
-                    "valid": False,
-                    "feedback": f"Error in evaluation. Please ensure the code contains all {original_error_count} requested errors.",
-                    "original_error_count": original_error_count  # Add original count for consistency
-                }
-            else:
-                evaluation_result = raw_evaluation_result
-                # Add the original error count to the evaluation result
-                evaluation_result["original_error_count"] = original_error_count
-
-                # IMPORTANT: Explicitly set valid flag based on missing and extra errors
-                missing_errors = evaluation_result.get('missing_errors', [])
-                
-                # Only valid if no missing errors and no extra errors
-                has_missing = len(missing_errors) > 0               
-                evaluation_result['valid'] = not (has_missing)
-                
-                # Log explicit validation status
-                logger.info(f"Code validation: valid={evaluation_result['valid']}, " 
-                        f"missing={len(missing_errors)}")
-                
-            # Update state with evaluation results
-            state.evaluation_result = evaluation_result
-            state.evaluation_attempts += 1
+        Returns:
+            Response text, or the ainvoke() response if streaming is unavailable
+        """
+        llm = self.code_generator.llm
+        parts = []
+        try:
+            async for chunk in llm.astream(prompt):
+                content = chunk.content if hasattr(chunk, "content") else chunk
+                if isinstance(content, str):
+                    parts.append(content)
+                    if "`" in content and _clean_block_closed("".join(parts)):
+                        logger.debug("Clean code block complete, closing regeneration stream early")
+                        break
+        except Exception as e:
+            if not parts:
+                logger.warning("Streaming regeneration failed (%s), falling back to ainvoke", e)
+                return await llm.ainvoke(prompt)
+            raise
+        return "".join(parts)
+    
+    def _regeneration_request(self, state: WorkflowState, log_prompt: bool = True) -> Tuple[str, Dict[str, Any]]:
+        """
+        Get the regeneration prompt and log it before it is sent to the LLM.
+        
+        Args:
+            state: Current workflow state
+            log_prompt: Whether the prompt is logged here; callers that log it themselves pass False
             
-            # Log evaluation results
-            found_count = len(evaluation_result.get('found_errors', []))
-            missing_count = len(evaluation_result.get('missing_errors', []))
-            logger.info(f"Code evaluation complete: {found_count}/{original_error_count} errors implemented, {missing_count} missing")
+        Returns:
+            Tuple of (prompt, logging metadata)
+        """
+        feedback_prompt = state.code_generation_feedback
+        metadata = {
+            "code_length": state.code_length,
+            "difficulty_level": state.difficulty_level,
+            "domain":  state.domain,
+            "selected_errors": state.selected_error_categories,
+            "attempt": state.evaluation_attempts,
+            "max_attempts": state.max_evaluation_attempts
+        }
+        
+        # Log the prompt before it's sent to the LLM
+        if log_prompt:
+            self.llm_logger.log_regeneration_prompt(feedback_prompt, metadata)
+        return feedback_prompt, metadata
+    
+    def _apply_regeneration(self, state: WorkflowState, feedback_prompt: str, response: Any,
+                            metadata: Dict[str, Any]) -> WorkflowState:
+        """
+        Log the regeneration and store the regenerated code in the state.
+        
+        Args:
+            state: Current workflow state
+            feedback_prompt: Prompt sent to the LLM
+            response: LLM response holding the regenerated code
+            metadata: Logging metadata of the request
             
+        Returns:
+            Updated workflow state with regenerated code
+        """
+        # Log the full regeneration with response
+        self.llm_logger.log_code_regeneration(feedback_prompt, response, metadata)
+        
+        # Process the response
+        annotated_code, clean_code = extract_both_code_versions(response)                
+        
+        # Get requested errors from state
+        requested_errors = self._requested_errors(state)
+        raw_errors = _partition_by_type(requested_errors)
+        
+        # Create updated code snippet
+        state.code_snippet = CodeSnippet(
+            code=annotated_code,
+            clean_code=clean_code,
+            raw_errors=raw_errors,
+            flat_requested_errors=raw_errors["build"] + raw_errors["checkstyle"]
+        )
+        
+        # Move to evaluation step again
+        state.current_step = "evaluate"
+        logger.info("Code regenerated successfully on attempt %s", state.evaluation_attempts)
+        
+        return state
+        
+    def evaluate_code_node(self, state: WorkflowState,
+                           raw_evaluation: Optional[Dict[str, Any]] = None) -> WorkflowState:
+        """
+        Evaluate generated code to ensure it contains the requested errors.
+        
+        Args:
+            state: Current workflow state
+            raw_evaluation: Optional evaluation already obtained from the LLM
             
-            feedback = None
+        Returns:
+            Updated workflow state with evaluation results
+        """
+        logger.info("Starting code evaluation node")
+        
+        # Validate code snippet
+        if not state.code_snippet:
+            state.error = "No code snippet available for evaluation"
+            return state
+                
+        # Get the code with annotations
+        code = state.code_snippet.code
+        
+        # Get requested errors from state
+        requested_errors = self._requested_errors(state)
+        requested_count = len(requested_errors)
+        
+        # Ensure we're using the original error count for consistency
+        original_error_count = state.original_error_count
+        if original_error_count == 0:
+            # If not set in state, try to get it from code snippet
+            original_error_count = state.code_snippet.expected_error_count
+            # Update state with this count
+            state.original_error_count = original_error_count
             
-            # If we have missing errors or extra errors, we need to regenerate the code
-            needs_regeneration = missing_count > 0
+        # If we still don't have it, use the requested count
+        if original_error_count == 0:
+            original_error_count = requested_count
+            state.original_error_count = original_error_count
             
-            # If we have extra errors, use the updated regeneration function that handles extras
-            if missing_count > 0:
-                logger.warning(f"Missing {missing_count} out of {original_error_count} requested errors")
-                
-                # Use standard regeneration prompt but enhance it for clarity
-                if hasattr(self.code_evaluation, 'generate_improved_prompt'):
-                    feedback = self.code_evaluation.generate_improved_prompt(
-                        code, requested_errors, evaluation_result
+        logger.info("Evaluating code for %s expected errors", original_error_count)
+        
+        # Evaluate the code unless the evaluation was supplied or made while choosing a candidate
+        candidate_evaluation = self._take_candidate_evaluation(state)
+        raw_evaluation_result = raw_evaluation if raw_evaluation is not None else candidate_evaluation
+        if raw_evaluation_result is None:
+            # Only the LLM call is guarded; evaluations come back normalized for the bookkeeping below
+            try:
+                if self.parallel_evaluation and len(requested_errors) > 1:
+                    # Fan out one call per error and fan the results back in
+                    raw_evaluation_result = self.code_evaluation.evaluate_errors_parallel(
+                        code, requested_errors
                     )
                 else:
-                  
-                    # Use the regeneration prompt with emphasis on adding missing errors
-                    feedback = create_regeneration_prompt(
-                        code=code,
-                        domain=state.domain,
-                        missing_errors=evaluation_result.get('missing_errors', []),
-                        found_errors=evaluation_result.get('found_errors', []),
-                        requested_errors=requested_errors
+                    raw_evaluation_result = self.code_evaluation.evaluate_code(
+                        code, requested_errors
                     )
+            except Exception as e:
+                logger.error("Error evaluating code: %s", e, exc_info=True)
+                state.error = f"Error evaluating code: {str(e)}"
+                return state
+        
+        # IMPORTANT: Ensure evaluation_result is a dictionary
+        if not isinstance(raw_evaluation_result, dict):
+            logger.error("Expected dict for evaluation_result, got %s", type(raw_evaluation_result))
+            # Create a default dictionary with the necessary structure
+            evaluation_result = {
+                "found_errors": [],
+                "missing_errors": [f"{error.get('type', '').upper()} - {error.get('name', '')}" 
+                                for error in requested_errors],
+                "valid": False,
+                "feedback": f"Error in evaluation. Please ensure the code contains all {original_error_count} requested errors.",
+                "original_error_count": original_error_count  # Add original count for consistency
+            }
+        else:
+            evaluation_result = raw_evaluation_result
+            # Add the original error count to the evaluation result
+            evaluation_result["original_error_count"] = original_error_count
+
+            # IMPORTANT: Explicitly set valid flag based on missing and extra errors
+            missing_errors = evaluation_result.get('missing_errors', [])
+            
+            # Only valid if no missing errors and no extra errors
+            has_missing = len(missing_errors) > 0               
+            evaluation_result['valid'] = not (has_missing)
+            
+            # Log explicit validation status
+            logger.info("Code validation: valid=%s, missing=%s",
+                        evaluation_result['valid'], len(missing_errors))
+            
+        # Update state with evaluation results
+        state.evaluation_result = evaluation_result
+        state.evaluation_attempts += 1
+        
+        # Log evaluation results
+        found_count = len(evaluation_result.get('found_errors', []))
+        missing_count = len(evaluation_result.get('missing_errors', []))
+        logger.info("Code evaluation complete: %s/%s errors implemented, %s missing", found_count, original_error_count, missing_count)
+        
+        
+        feedback = None
+        
+        # If we have missing errors or extra errors, we need to regenerate the code
+        needs_regeneration = missing_count > 0
+        
+        # If we have extra errors, use the updated regeneration function that handles extras
+        if missing_count > 0:
+            logger.warning("Missing %s out of %s requested errors", missing_count, original_error_count)
+            
+            # Use standard regeneration prompt but enhance it for clarity
+            if self._generate_improved_prompt is not None:
+                feedback = self._generate_improved_prompt(
+                    code, requested_errors, evaluation_result
+                )
             else:
-                # No missing or extra errors - we're good!
-                logger.info(f"All {original_error_count} requested errors implemented correctly")
-                             
+              
+                # Use the regeneration prompt with emphasis on adding missing errors
                 feedback = create_regeneration_prompt(
                     code=code,
                     domain=state.domain,
-                    missing_errors=[],
+                    missing_errors=evaluation_result.get('missing_errors', []),
                     found_errors=evaluation_result.get('found_errors', []),
-                    requested_errors=requested_errors                    
+                    requested_errors=requested_errors
                 )
-                    
-            state.code_generation_feedback = feedback
-          
-            # IMPROVED DECISION LOGIC: Prioritize fixing missing errors over max attempts
-            # If evaluation passed (all errors implemented with exact count)
-            if evaluation_result.get("valid", False):
-                state.current_step = "review"
-                logger.info("All errors successfully implemented, proceeding to review")
-            elif needs_regeneration and state.evaluation_attempts < state.max_evaluation_attempts:
-                # If we have missing errors or extra errors and haven't reached max attempts, regenerate
-                state.current_step = "regenerate"
-                if missing_count > 0:
-                    logger.info(f"Found {missing_count} missing errors, proceeding to regeneration")
+        else:
+            # No missing or extra errors - we're good!
+            logger.info("All %s requested errors implemented correctly", original_error_count)
+                         
+            feedback = create_regeneration_prompt(
+                code=code,
+                domain=state.domain,
+                missing_errors=[],
+                found_errors=evaluation_result.get('found_errors', []),
+                requested_errors=requested_errors                    
+            )
+                
+        state.code_generation_feedback = feedback
+      
+        # IMPROVED DECISION LOGIC: Prioritize fixing missing errors over max attempts
+        # If evaluation passed (all errors implemented with exact count)
+        if evaluation_result.get("valid", False):
+            state.current_step = "review"
+            logger.info("All errors successfully implemented, proceeding to review")
+        elif needs_regeneration and state.evaluation_attempts < state.max_evaluation_attempts:
+            # If we have missing errors or extra errors and haven't reached max attempts, regenerate
+            state.current_step = "regenerate"
+            if missing_count > 0:
+                logger.info("Found %s missing errors, proceeding to regeneration", missing_count)
+        else:
+            # Otherwise, we've either reached max attempts or have no more missing errors
+            state.current_step = "review"
+            if state.evaluation_attempts >= state.max_evaluation_attempts:
+                logger.warning("Reached maximum evaluation attempts (%s). Proceeding to review.", state.max_evaluation_attempts)
             else:
-                # Otherwise, we've either reached max attempts or have no more missing errors
-                state.current_step = "review"
-                if state.evaluation_attempts >= state.max_evaluation_attempts:
-                    logger.warning(f"Reached maximum evaluation attempts ({state.max_evaluation_attempts}). Proceeding to review.")
-                else:
-                    logger.info("No missing errors to fix, proceeding to review")
+                logger.info("No missing errors to fix, proceeding to review")
+        
+        return state
+
+    async def aevaluate_code_node(self, state: WorkflowState) -> WorkflowState:
+        """
+        Asynchronously evaluate generated code to ensure it contains the requested errors.
+        
+        Args:
+            state: Current workflow state
             
+        Returns:
+            Updated workflow state with evaluation results
+        """
+        if not state.code_snippet:
+            state.error = "No code snippet available for evaluation"
+            return state
+        
+        raw_evaluation = self._take_candidate_evaluation(state)
+        if raw_evaluation is not None:
+            return self.evaluate_code_node(state, raw_evaluation=raw_evaluation)
+        
+        try:
+            code = state.code_snippet.code
+            requested_errors = self._requested_errors(state)
+            if self.parallel_evaluation and len(requested_errors) > 1:
+                raw_evaluation = await self.code_evaluation.aevaluate_errors_parallel(code, requested_errors)
+            else:
+                raw_evaluation = await self.code_evaluation.aevaluate_code(code, requested_errors)
+        except Exception as e:
+            logger.error("Error evaluating code: %s", e, exc_info=True)
+            state.error = f"Error evaluating code: {str(e)}"
             return state
+        
+        # Reuse the standard evaluation bookkeeping with the awaited result
+        return self.evaluate_code_node(state, raw_evaluation=raw_evaluation)
+
+    @staticmethod
+    def _take_candidate_evaluation(state: WorkflowState) -> Optional[Dict[str, Any]]:
+        """
+        Take the evaluation made while choosing between generation candidates.
+        
+        It is cleared so it is used only for the first evaluation of the code.
+        
+        Args:
+            state: Current workflow state with a code snippet
             
+        Returns:
+            Evaluation of the current code, or None if it still has to be evaluated
+        """
+        evaluation = state.code_snippet.candidate_evaluation
+        state.code_snippet.candidate_evaluation = None
+        return evaluation
+
+    def evaluate_and_regenerate_node(self, state: WorkflowState) -> WorkflowState:
+        """
+        Evaluate code and apply the corrected code from the same LLM response.
+        
+        When the evaluation finds missing errors, the corrected code replaces
+        the snippet and current_step stays "regenerate" so the new code is
+        evaluated on the next pass through this node.
+        
+        Args:
+            state: Current workflow state
+            
+        Returns:
+            Updated workflow state with evaluation results and, if needed, corrected code
+        """
+        if not state.code_snippet:
+            state.error = "No code snippet available for evaluation"
+            return state
+        
+        try:
+            requested_errors = self._requested_errors(state)
+            raw_evaluation, annotated_code, clean_code = self.code_evaluation.evaluate_and_fix(
+                state.code_snippet.code, requested_errors, state.domain
+            )
         except Exception as e:
-            logger.error(f"Error evaluating code: {str(e)}", exc_info=True)
+            logger.error("Error evaluating code: %s", e, exc_info=True)
             state.error = f"Error evaluating code: {str(e)}"
             return state
+        
+        # Reuse the standard evaluation bookkeeping with the fused result
+        state = self.evaluate_code_node(state, raw_evaluation=raw_evaluation)
+        if state.current_step != "regenerate":
+            return state
+        
+        if annotated_code:
+            state.code_snippet = CodeSnippet(
+                code=annotated_code,
+                clean_code=clean_code or "",
+                raw_errors=state.code_snippet.raw_errors,
+                expected_error_count=state.code_snippet.expected_error_count,
+                flat_requested_errors=state.code_snippet.flat_requested_errors
+            )
+            logger.info("Applied corrected code from fused evaluation on attempt %s", state.evaluation_attempts)
+            return state
+        
+        # The model did not return corrected code, so regenerate separately
+        logger.info("Fused evaluation returned no corrected code, falling back to regeneration")
+        return self.regenerate_code_node(state)
 
     def review_code_node(self, state: WorkflowState) -> WorkflowState:
         """
@@ -394,103 +865,203 @@ class WorkflowNodes:
         state.current_step = "review"
         return state
     
-    def analyze_review_node(self, state: WorkflowState) -> WorkflowState:
+    def analyze_review_node(self, state: WorkflowState,
+                            analysis: Optional[Dict[str, Any]] = None) -> WorkflowState:
         """
         Analyze student review and provide feedback.
         
         Args:
             state: Current workflow state
+            analysis: Optional previously computed analysis to reuse instead of calling the LLM
             
         Returns:
             Updated workflow state with review analysis
         """
+        inputs = self._review_inputs(state)
+        if inputs is None:
+            return state
+        evaluator, latest_review, code_snippet, known_problems = inputs
+        
+        # Only the evaluator's LLM calls are guarded
         try:
-            # Validate review history
-            if not state.review_history:
-                state.error = "No review submitted to analyze"
-                return state
-                    
-            latest_review = state.review_history[-1]
-            student_review = latest_review.student_review
-            
-            # Validate code snippet
-            if not state.code_snippet:
-                state.error = "No code snippet available"
-                return state
-                    
-            code_snippet = state.code_snippet.code
-            
-            # Use evaluation result to extract problem information
-            # But modify to use the original error count for consistent metrics
-            known_problems = []
-            original_error_count = state.original_error_count
-            
-            if state.evaluation_result and 'found_errors' in state.evaluation_result:
-                known_problems = state.evaluation_result.get('found_errors', [])
-            
-            # Get the student response evaluator from the evaluator attribute
-            evaluator = getattr(self, "evaluator", None)
-            if not evaluator:
-                state.error = "Student response evaluator not initialized"
-                return state
-            
-            # Use the standard evaluation method
-            analysis = evaluator.evaluate_review(
-                code_snippet=code_snippet,
-                known_problems=known_problems,
-                student_review=student_review
-            )
-            
-            # IMPORTANT: Update the analysis with the original error count
-            # This ensures consistent metrics in the UI
-            if original_error_count > 0:
-                # Store the found problem count and original count
-                found_problems_count = len(known_problems)
-                identified_count = analysis.get("identified_count", 0)
-                
-                # IMPORTANT FIX: Override total_problems to use original_error_count
-                analysis["total_problems"] = original_error_count
-                analysis["original_error_count"] = original_error_count
-                
-                # Recalculate percentages based on original count
-                analysis["identified_percentage"] = (identified_count / original_error_count) * 100
-                analysis["accuracy_percentage"] = (identified_count / original_error_count) * 100
-                
-                logger.info(f"Updated review analysis: {identified_count}/{original_error_count} " +
-                        f"({analysis['identified_percentage']:.1f}%) [Found problems: {found_problems_count}]")
-            
-            # Update the review with analysis
-            latest_review.analysis = analysis
-            
-            # Check if the review is sufficient
-            review_sufficient = analysis.get("review_sufficient", False)
-            state.review_sufficient = review_sufficient
+            # Use the standard evaluation method unless an analysis was supplied
+            if analysis is None:
+                analysis = evaluator.evaluate_review(
+                    code_snippet=code_snippet,
+                    known_problems=known_problems,
+                    student_review=latest_review.student_review
+                )
             
             # Generate targeted guidance if needed
-            if not review_sufficient and state.current_iteration < state.max_iterations:
-                targeted_guidance = evaluator.generate_targeted_guidance(
+            if self._record_review_analysis(state, latest_review, known_problems, analysis):
+                latest_review.targeted_guidance = evaluator.generate_targeted_guidance(
                     code_snippet=code_snippet,
                     known_problems=known_problems,
-                    student_review=student_review,
+                    student_review=latest_review.student_review,
                     review_analysis=analysis,
                     iteration_count=state.current_iteration,
                     max_iterations=state.max_iterations
                 )
-                latest_review.targeted_guidance = targeted_guidance
-            
-            # Increment iteration count
-            state.current_iteration += 1
-            
-            # Update state
-            state.current_step = "analyze"
+        
+        except Exception as e:
+            logger.error("Error analyzing review: %s", e, exc_info=True)
+            state.error = f"Error analyzing review: {str(e)}"
+            return state
+        
+        return self._finish_review_iteration(state)
+    
+    async def aanalyze_review_node(self, state: WorkflowState,
+                                   analysis: Optional[Dict[str, Any]] = None) -> WorkflowState:
+        """
+        Asynchronously analyze student review and provide feedback.
+        
+        Args:
+            state: Current workflow state
+            analysis: Optional previously computed analysis to reuse instead of calling the LLM
             
+        Returns:
+            Updated workflow state with review analysis
+        """
+        inputs = self._review_inputs(state)
+        if inputs is None:
             return state
+        evaluator, latest_review, code_snippet, known_problems = inputs
+        
+        try:
+            if analysis is None:
+                analysis = await evaluator.aevaluate_review(
+                    code_snippet=code_snippet,
+                    known_problems=known_problems,
+                    student_review=latest_review.student_review
+                )
+            
+            if self._record_review_analysis(state, latest_review, known_problems, analysis):
+                latest_review.targeted_guidance = await evaluator.agenerate_targeted_guidance(
+                    code_snippet=code_snippet,
+                    known_problems=known_problems,
+                    student_review=latest_review.student_review,
+                    review_analysis=analysis,
+                    iteration_count=state.current_iteration,
+                    max_iterations=state.max_iterations
+                )
         
         except Exception as e:
-            logger.error(f"Error analyzing review: {str(e)}", exc_info=True)
+            logger.error("Error analyzing review: %s", e, exc_info=True)
             state.error = f"Error analyzing review: {str(e)}"
             return state
+        
+        return self._finish_review_iteration(state)
+    
+    def _review_inputs(self, state: WorkflowState) -> Optional[Tuple[Any, Any, str, List[str]]]:
+        """
+        Collect what is needed to analyze the latest review.
+        
+        Args:
+            state: Current workflow state
+            
+        Returns:
+            Tuple of (evaluator, latest review, code, known problems), or None
+            if the review cannot be analyzed (state.error is set)
+        """
+        # Validate review history
+        latest_review = state.latest_review
+        if latest_review is None:
+            state.error = "No review submitted to analyze"
+            return None
+        
+        # Validate code snippet
+        if not state.code_snippet:
+            state.error = "No code snippet available"
+            return None
+        
+        # Use evaluation result to extract problem information
+        known_problems = []
+        if state.evaluation_result and 'found_errors' in state.evaluation_result:
+            known_problems = state.evaluation_result.get('found_errors', [])
+        
+        # Get the student response evaluator from the evaluator attribute
+        evaluator = self.evaluator
+        if not evaluator:
+            state.error = "Student response evaluator not initialized"
+            return None
+        
+        return evaluator, latest_review, state.code_snippet.code, known_problems
+    
+    def _record_review_analysis(self, state: WorkflowState, latest_review: Any,
+                                known_problems: List[str], analysis: Dict[str, Any]) -> bool:
+        """
+        Store the analysis of the latest review in the state.
+        
+        Args:
+            state: Current workflow state
+            latest_review: Review attempt being analyzed
+            known_problems: Problems found in the code
+            analysis: Analysis of the review
+            
+        Returns:
+            True if the student should receive targeted guidance
+        """
+        # IMPORTANT: Update the analysis with the original error count
+        # This ensures consistent metrics in the UI
+        original_error_count = state.original_error_count
+        if original_error_count > 0:
+            # Store the found problem count and original count
+            found_problems_count = len(known_problems)
+            identified_count = analysis.get("identified_count", 0)
+            
+            # IMPORTANT FIX: Override total_problems to use original_error_count
+            analysis["total_problems"] = original_error_count
+            analysis["original_error_count"] = original_error_count
+            
+            # Recalculate percentages based on original count
+            analysis["identified_percentage"] = (identified_count / original_error_count) * 100
+            analysis["accuracy_percentage"] = (identified_count / original_error_count) * 100
+            
+            logger.info("Updated review analysis: %s/%s (%.1f%%) [Found problems: %s]",
+                        identified_count, original_error_count, analysis['identified_percentage'], found_problems_count)
+        
+        # Update the review with analysis
+        latest_review.analysis = analysis
+        
+        # Check if the review is sufficient
+        review_sufficient = analysis.get("review_sufficient", False)
+        state.review_sufficient = review_sufficient
+        
+        return not review_sufficient and state.current_iteration < state.max_iterations
+    
+    def _finish_review_iteration(self, state: WorkflowState) -> WorkflowState:
+        """
+        Advance the state past an analyzed review.
+        
+        Args:
+            state: Current workflow state
+            
+        Returns:
+            Updated workflow state
+        """
+        # Increment iteration count
+        state.current_iteration += 1
+        
+        # Update state
+        state.current_step = "analyze"
+        
+        return state
        
+    def _requested_errors(self, state: WorkflowState) -> List[Dict[str, Any]]:
+        """
+        Get the requested errors, using the list stored on the code snippet when present.
+        
+        Args:
+            state: Current workflow state
+            
+        Returns:
+            List of requested errors
+        """
+        code_snippet = state.code_snippet
+        if code_snippet is not None and code_snippet.flat_requested_errors:
+            return code_snippet.flat_requested_errors
+        return self._extract_requested_errors(state)
+    
     def _extract_requested_errors(self, state: WorkflowState) -> List[Dict[str, Any]]:
         """
         Extract requested errors from the state with improved error handling and type safety.
@@ -504,80 +1075,72 @@ class WorkflowNodes:
         requested_errors = []
         
         # First check if code_snippet exists
-        if not hasattr(state, 'code_snippet') or state.code_snippet is None:
+        if state.code_snippet is None:
             logger.warning("No code snippet in state for extracting requested errors")
             return requested_errors
         
-        # Check if raw_errors exists and is a dictionary
-        if hasattr(state.code_snippet, "raw_errors"):
-            raw_errors = state.code_snippet.raw_errors
-            
-            # Type check for raw_errors
-            if not isinstance(raw_errors, dict):
-                logger.warning(f"Expected dict for raw_errors, got {type(raw_errors)}")
-                return requested_errors
-            
-            # Extract errors from each type
-            for error_type, errors in raw_errors.items():
-                # Type check for errors list
-                if not isinstance(errors, list):
-                    logger.warning(f"Expected list for errors of type {error_type}, got {type(errors)}")
+        # Check that raw_errors is a dictionary
+        raw_errors = state.code_snippet.raw_errors
+        if not isinstance(raw_errors, dict):
+            logger.warning("Expected dict for raw_errors, got %s", type(raw_errors))
+            return requested_errors
+        
+        # Extract errors from each type
+        for error_type, errors in raw_errors.items():
+            # Type check for errors list
+            if not isinstance(errors, list):
+                logger.warning("Expected list for errors of type %s, got %s", error_type, type(errors))
+                continue
+                
+            # Type check each error and add to requested_errors
+            for error in errors:
+                if not isinstance(error, dict):
+                    logger.warning("Expected dict for error, got %s", type(error))
                     continue
-                    
-                # Type check each error and add to requested_errors
-                for error in errors:
-                    if not isinstance(error, dict):
-                        logger.warning(f"Expected dict for error, got {type(error)}")
-                        continue
-                    
-                    # Make sure the error has required fields
-                    if "type" not in error:
-                        error["type"] = error_type  # Use the key as type if not specified
-                    
-                    if "name" not in error and "error_name" in error:
-                        error["name"] = error["error_name"]  # Use error_name as name if available
-                    
-                    if "name" not in error and "check_name" in error:
-                        error["name"] = error["check_name"]  # Use check_name as name if available
-                    
-                    # Only add the error if it has a name
-                    if "name" in error:
-                        requested_errors.append(error)
-        
-        # Alternative method: Check selected_specific_errors
-        elif hasattr(state, 'selected_specific_errors') and state.selected_specific_errors:
-            # Check if it's a list
-            if isinstance(state.selected_specific_errors, list):
-                # Filter out non-dict entries
-                for error in state.selected_specific_errors:
-                    if isinstance(error, dict) and "name" in error and "type" in error:
-                        requested_errors.append(error)
-        
-        # If we still don't have any errors, check selected_error_categories
-        if not requested_errors and hasattr(state, 'selected_error_categories'):
-            # Check if it's a dict
-            if isinstance(state.selected_error_categories, dict):
-                # This doesn't give us specific errors, but we can log that we found categories
-                logger.info("Found selected_error_categories but no specific errors")
-        
-        logger.info(f"Extracted {len(requested_errors)} requested errors")
+                
+                # Make sure the error has required fields
+                if "type" not in error:
+                    error["type"] = error_type  # Use the key as type if not specified
+                
+                if "name" not in error and "error_name" in error:
+                    error["name"] = error["error_name"]  # Use error_name as name if available
+                
+                if "name" not in error and "check_name" in error:
+                    error["name"] = error["check_name"]  # Use check_name as name if available
+                
+                # Only add the error if it has a name
+                if "name" in error:
+                    requested_errors.append(error)
+        
+        # If we still don't have any errors, note the categories
+        if not requested_errors and isinstance(state.selected_error_categories, dict):
+            # This doesn't give us specific errors, but we can log that we found categories
+            logger.info("Found selected_error_categories but no specific errors")
+        
+        logger.info("Extracted %s requested errors", len(requested_errors))
         return requested_errors
         
     def _log_selected_errors(self, selected_errors: List[Dict[str, Any]]) -> None:
         """
         Log detailed information about selected errors for debugging.
         
+        Nothing is formatted unless debug logging is enabled.
+        
         Args:
             selected_errors: List of selected errors
         """
-        if selected_errors:
-            logger.debug("\n--- DETAILED ERROR LISTING ---")
-            for i, error in enumerate(selected_errors, 1):
-                logger.debug(f"  {i}. Type: {error.get('type', 'Unknown')}")
-                logger.debug(f"     Name: {error.get('name', 'Unknown')}")
-                logger.debug(f"     Category: {error.get('category', 'Unknown')}")
-                logger.debug(f"     Description: {error.get('description', 'Unknown')}")
-                if 'implementation_guide' in error:
-                    guide = error.get('implementation_guide', '')
-                    logger.debug(f"     Implementation Guide: {guide[:100]}..." 
-                        if len(guide) > 100 else guide)
\ No newline at end of file
+        if not selected_errors or not logger.isEnabledFor(logging.DEBUG):
+            return
+        
+        logger.debug("--- DETAILED ERROR LISTING ---")
+        for i, error in enumerate(selected_errors, 1):
+            get = error.get
+            error_type = get('type', 'Unknown')
+            name = get('name', 'Unknown')
+            category = get('category', 'Unknown')
+            description = get('description', 'Unknown')
+            logger.debug("  %d. Type: %s, Name: %s, Category: %s", i, error_type, name, category)
+            logger.debug("     Description: %s", description)
+            guide = get('implementation_guide')
+            if guide:
+                logger.debug("     Implementation Guide: %.100s%s", guide, "..." if len(guide) > 100 else "")